@@ -0,0 +1,995 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenAI endpoints used by the lab scripts.
+
+Emulates assistants, threads, messages, runs (polled and streamed), run
+steps, files (including downloads), vector stores, vector-store files,
+file batches, chat completions and Batch API jobs well enough for scripts
+01–03 to run end to end without an API key. Latency,
+failure rates and streaming speed are configurable, so benchmark numbers
+are reproducible on CI and air-gapped machines. With --rpm-limit /
+--tpm-limit it enforces per-minute limits and reports them in x-ratelimit-*
+headers the way the API does.
+
+Standard library only. Point the scripts at it with:
+
+    python benchmarks/mock_server.py --port 8080 &
+    OPENAI_API_KEY=mock OPENAI_BASE_URL=http://127.0.0.1:8080/v1 python scripts/01_responses_api.py
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+
+@dataclass
+class MockConfig:
+    """Knobs for the simulated API (all times in seconds)."""
+    latency: float = 0.02                 # added to every request
+    latency_jitter: float = 0.01          # uniform extra latency
+    failure_rate: float = 0.0             # share of requests answered with HTTP 500
+    rate_limit_rate: float = 0.0          # share of requests answered with HTTP 429
+    run_latency: float = 0.8              # queued -> completed
+    run_latency_jitter: float = 0.2
+    run_failure_rate: float = 0.0         # share of runs that end "failed"
+    file_processing_latency: float = 0.3  # vector store file ingestion
+    stream_tokens_per_second: float = 200.0
+    reply_tokens: int = 60
+    json_error_rate: float = 0.0          # share of JSON-mode replies that break the LectureSummary schema
+    poll_after_ms: Optional[int] = None   # sent as openai-poll-after-ms to steer SDK polling
+    batch_latency: float = 2.0            # Batch API job: validating -> completed, plus ...
+    batch_request_latency: float = 0.01   # ... this much per request line
+    rpm_limit: int = 0                    # requests per minute (0: unlimited, no x-ratelimit headers)
+    tpm_limit: int = 0                    # tokens per minute of model calls (0: unlimited)
+    seed: Optional[int] = None
+
+
+FILLER = ("the algorithm compares the pattern with the text and uses the prefix table to skip "
+          "characters that are already known to match so each character is examined a bounded "
+          "number of times which keeps the search linear in the length of the input").split()
+
+
+def new_id(prefix: str) -> str:
+    return f"{prefix}{uuid.uuid4().hex[:24]}"
+
+
+def now() -> int:
+    return int(time.time())
+
+
+class ApiError(Exception):
+    def __init__(self, status: int, message: str, code: str = "invalid_request_error"):
+        super().__init__(message)
+        self.status = status
+        self.body = {"error": {"message": message, "type": code, "param": None, "code": None}}
+
+
+def format_duration(seconds: float) -> str:
+    """The API's reset format: '20ms', '1.5s', '6m0s'."""
+    if seconds < 1:
+        return f"{int(seconds * 1000)}ms"
+    minutes, seconds = divmod(seconds, 60)
+    return f"{int(minutes)}m{seconds:.0f}s" if minutes else f"{seconds:.3g}s"
+
+
+class MockRateLimits:
+    """Per-minute request and token buckets, refilled continuously like the real limits."""
+
+    MODEL_PATHS = ("/runs", "/chat/completions", "/responses", "/embeddings")
+
+    def __init__(self, rpm: int, tpm: int, reply_tokens: int):
+        self.limits = {name: limit for name, limit in (("requests", rpm), ("tokens", tpm)) if limit}
+        self.levels = {name: float(limit) for name, limit in self.limits.items()}
+        self.reply_tokens = reply_tokens
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def cost(self, method: str, path: str, raw: bytes) -> Dict[str, float]:
+        tokens = len(raw) // 4 + self.reply_tokens if method == "POST" and path.endswith(self.MODEL_PATHS) else 0
+        return {"requests": 1.0, "tokens": float(tokens)}
+
+    def take(self, method: str, path: str, raw: bytes) -> Tuple[bool, Dict[str, str]]:
+        """Charge one request; returns (allowed, x-ratelimit-* headers)."""
+        cost = self.cost(method, path, raw)
+        with self.lock:
+            now = time.monotonic()
+            for name, limit in self.limits.items():
+                self.levels[name] = min(limit, self.levels[name] + (now - self.updated) * limit / 60.0)
+            self.updated = now
+            short = {name: cost[name] - self.levels[name] for name in self.limits if cost[name] > self.levels[name]}
+            if not short:
+                for name in self.limits:
+                    self.levels[name] -= cost[name]
+            headers = {}
+            for name, limit in self.limits.items():
+                headers[f"x-ratelimit-limit-{name}"] = str(limit)
+                headers[f"x-ratelimit-remaining-{name}"] = str(max(0, int(self.levels[name])))
+                headers[f"x-ratelimit-reset-{name}"] = format_duration((limit - self.levels[name]) * 60.0 / limit)
+            if short:
+                wait = max(missing * 60.0 / self.limits[name] for name, missing in short.items())
+                headers["retry-after-ms"] = str(max(1, int(wait * 1000)))
+        return not short, headers
+
+
+class MockState:
+    """In-memory objects plus the time-driven lifecycle of runs, files and batches."""
+
+    def __init__(self, config: MockConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.lock = threading.RLock()
+        self.assistants: Dict[str, dict] = {}
+        self.threads: Dict[str, dict] = {}
+        self.messages: Dict[str, List[dict]] = {}   # thread_id -> messages (oldest first)
+        self.runs: Dict[str, dict] = {}
+        self.run_meta: Dict[str, dict] = {}         # run_id -> timing / materialisation state
+        self.steps: Dict[str, List[dict]] = {}      # run_id -> steps (oldest first)
+        self.files: Dict[str, dict] = {}
+        self.vector_stores: Dict[str, dict] = {}
+        self.vs_files: Dict[str, Dict[str, dict]] = {}  # vs_id -> file_id -> vector_store.file
+        self.file_batches: Dict[str, dict] = {}
+        self.batches: Dict[str, dict] = {}          # Batch API jobs
+        self.requests = 0
+        self.throttled = 0                          # 429s from rpm_limit / tpm_limit
+        self.rate_limits = (MockRateLimits(config.rpm_limit, config.tpm_limit, config.reply_tokens)
+                            if config.rpm_limit or config.tpm_limit else None)
+
+    # --- lifecycle ---------------------------------------------------------
+
+    def run_duration(self) -> float:
+        c = self.config
+        return max(0.0, c.run_latency + self.random.uniform(-c.run_latency_jitter, c.run_latency_jitter))
+
+    def refresh_run(self, run: dict) -> dict:
+        meta = self.run_meta[run["id"]]
+        if run["status"] not in ("queued", "in_progress"):
+            return run
+        elapsed = time.monotonic() - meta["started"]
+        if elapsed < meta["duration"] * 0.1:
+            run["status"] = "queued"
+        elif elapsed < meta["duration"]:
+            run["status"] = "in_progress"
+            run["started_at"] = run["started_at"] or now()
+        else:
+            self.finish_run(run)
+        return run
+
+    def finish_run(self, run: dict):
+        meta = self.run_meta[run["id"]]
+        if meta["failed"]:
+            run.update(status="failed", failed_at=now(),
+                       last_error={"code": "server_error", "message": "Simulated run failure."})
+            return
+        history = self.messages[run["thread_id"]]
+        truncation = run.get("truncation_strategy") or {}
+        if truncation.get("type") == "last_messages" and truncation.get("last_messages"):
+            history = history[-truncation["last_messages"]:]
+        prompt_tokens = sum(len(m["content"][0]["text"]["value"].split()) for m in history)
+        function = self.requested_function(run)
+        if function is not None:
+            self.require_function_call(run, function, prompt_tokens)
+            return
+        text, annotations, searched = self.compose_reply(run)
+        message = self.add_message(run["thread_id"], "assistant", text, annotations,
+                                   assistant_id=run["assistant_id"], run_id=run["id"])
+        steps = self.steps.setdefault(run["id"], [])
+        if searched:
+            steps.append(self.make_step(run, "tool_calls", {
+                "type": "tool_calls",
+                "tool_calls": [{"id": new_id("call_"), "type": "file_search", "file_search": {}}],
+            }))
+        steps.append(self.make_step(run, "message_creation", {
+            "type": "message_creation", "message_creation": {"message_id": message["id"]},
+        }))
+        completion_tokens = len(text.split())
+        run.update(status="completed", started_at=run["started_at"] or now(), completed_at=now(),
+                   usage={"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                          "total_tokens": prompt_tokens + completion_tokens})
+
+    def last_user_text(self, thread_id: str) -> str:
+        for message in reversed(self.messages[thread_id]):
+            if message["role"] == "user":
+                return message["content"][0]["text"]["value"]
+        return ""
+
+    def requested_function(self, run: dict) -> Optional[dict]:
+        """The run's function tool whose name the user asked for, if any."""
+        question = self.last_user_text(run["thread_id"])
+        for tool in run.get("tools") or []:
+            if tool.get("type") == "function" and tool["function"]["name"] in question:
+                return tool["function"]
+        return None
+
+    def require_function_call(self, run: dict, function: dict, prompt_tokens: int):
+        """Stop the run at requires_action with a LectureSummary-shaped call to `function`."""
+        arguments = json.dumps(json.loads(lecture_summary_json(self.last_user_text(run["thread_id"]))))
+        call = {"id": new_id("call_"), "type": "function",
+                "function": {"name": function["name"], "arguments": arguments}}
+        step = self.make_step(run, "tool_calls", {
+            "type": "tool_calls", "tool_calls": [dict(call, function=dict(call["function"], output=None))],
+        })
+        step.update(status="in_progress", completed_at=None)
+        self.steps.setdefault(run["id"], []).append(step)
+        completion_tokens = len(arguments.split())
+        run.update(status="requires_action", started_at=run["started_at"] or now(),
+                   required_action={"type": "submit_tool_outputs", "submit_tool_outputs": {"tool_calls": [call]}},
+                   usage={"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                          "total_tokens": prompt_tokens + completion_tokens})
+
+    def make_step(self, run: dict, step_type: str, details: dict) -> dict:
+        return {
+            "id": new_id("step_"), "object": "thread.run.step", "created_at": now(),
+            "run_id": run["id"], "assistant_id": run["assistant_id"], "thread_id": run["thread_id"],
+            "type": step_type, "status": "completed", "step_details": details,
+            "completed_at": now(), "last_error": None, "usage": None, "metadata": {},
+        }
+
+    def searchable_files(self, run: dict) -> List[str]:
+        assistant = self.assistants.get(run["assistant_id"], {})
+        tools = run.get("tools") or assistant.get("tools") or []
+        if not any(t.get("type") == "file_search" for t in tools):
+            return []
+        resources = (assistant.get("tool_resources") or {}).get("file_search") or {}
+        thread_resources = (self.threads[run["thread_id"]].get("tool_resources") or {}).get("file_search") or {}
+        file_ids = []
+        for vs_id in resources.get("vector_store_ids", []) + thread_resources.get("vector_store_ids", []):
+            file_ids += [f for f, vf in self.vs_files.get(vs_id, {}).items() if self.vs_file_status(vf) == "completed"]
+        return file_ids
+
+    def compose_reply(self, run: dict) -> Tuple[str, List[dict], bool]:
+        question = self.last_user_text(run["thread_id"])
+        if wants_json(run.get("response_format")):
+            broken = self.random.random() < self.config.json_error_rate
+            return lecture_summary_json(question, broken), [], False
+
+        text = self.plain_reply(question)
+        file_ids = self.searchable_files(run)
+        if not file_ids:
+            return text, [], False
+        marker = "【4:0†source】"
+        start = len(text)
+        text += marker
+        annotation = {"type": "file_citation", "text": marker, "start_index": start, "end_index": len(text),
+                      "file_citation": {"file_id": file_ids[0]}}
+        return text, [annotation], True
+
+    def plain_reply(self, question: str) -> str:
+        words = [FILLER[i % len(FILLER)] for i in range(self.config.reply_tokens)]
+        return f"Mock answer to: {question.splitlines()[0][:80] if question else ''} " + " ".join(words) + "."
+
+    def chat_completion(self, body: dict) -> dict:
+        """A chat.completion for a /chat/completions request body."""
+        messages = body.get("messages") or []
+        question = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+        if isinstance(question, list):  # content parts
+            question = " ".join(p.get("text", "") for p in question if isinstance(p, dict))
+        text = lecture_summary_json(question) if wants_json(body.get("response_format")) else self.plain_reply(question)
+        prompt_tokens = sum(len(str(m.get("content") or "").split()) for m in messages)
+        completion_tokens = len(text.split())
+        return {
+            "id": new_id("chatcmpl-"), "object": "chat.completion", "created": now(),
+            "model": body.get("model") or "gpt-4o-mini",
+            "choices": [{"index": 0, "finish_reason": "stop", "logprobs": None,
+                         "message": {"role": "assistant", "content": text, "refusal": None}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        }
+
+    def add_message(self, thread_id: str, role: str, text: str, annotations=None,
+                    assistant_id=None, run_id=None) -> dict:
+        message = {
+            "id": new_id("msg_"), "object": "thread.message", "created_at": now(),
+            "thread_id": thread_id, "role": role, "status": "completed",
+            "content": [{"type": "text", "text": {"value": text, "annotations": annotations or []}}],
+            "assistant_id": assistant_id, "run_id": run_id, "attachments": [], "metadata": {},
+        }
+        self.messages[thread_id].append(message)
+        return message
+
+    def vs_file_status(self, vs_file: dict) -> str:
+        if vs_file["status"] == "in_progress" and time.monotonic() >= vs_file["_ready_at"]:
+            vs_file["status"] = "completed"
+        return vs_file["status"]
+
+    def refresh_vector_store(self, vs: dict) -> dict:
+        counts = {"in_progress": 0, "completed": 0, "failed": 0, "cancelled": 0, "total": 0}
+        for vs_file in self.vs_files[vs["id"]].values():
+            counts[self.vs_file_status(vs_file)] += 1
+            counts["total"] += 1
+        vs["file_counts"] = counts
+        vs["status"] = "in_progress" if counts["in_progress"] else "completed"
+        vs["usage_bytes"] = sum(self.files.get(f, {}).get("bytes", 0) for f in self.vs_files[vs["id"]])
+        return vs
+
+    def attach_file(self, vs_id: str, file_id: str) -> dict:
+        if file_id not in self.files:
+            raise ApiError(404, f"No file found with id '{file_id}'.")
+        vs_file = {
+            "id": file_id, "object": "vector_store.file", "created_at": now(), "vector_store_id": vs_id,
+            "status": "in_progress", "usage_bytes": self.files[file_id]["bytes"], "last_error": None,
+            "_ready_at": time.monotonic() + self.config.file_processing_latency,
+        }
+        self.vs_files[vs_id][file_id] = vs_file
+        return vs_file
+
+    def refresh_batch(self, batch: dict) -> dict:
+        statuses = [self.vs_file_status(self.vs_files[batch["vector_store_id"]][f])
+                    for f in batch["_file_ids"] if f in self.vs_files[batch["vector_store_id"]]]
+        counts = {s: statuses.count(s) for s in ("in_progress", "completed", "failed", "cancelled")}
+        counts["total"] = len(statuses)
+        batch["file_counts"] = counts
+        batch["status"] = "in_progress" if counts["in_progress"] else "completed"
+        return batch
+
+    # --- Batch API jobs -----------------------------------------------------------
+
+    def add_file(self, filename: str, content: bytes, purpose: str) -> dict:
+        file_object = {"id": new_id("file-"), "object": "file", "bytes": len(content), "created_at": now(),
+                       "filename": filename, "purpose": purpose, "status": "processed", "status_details": None,
+                       "_content": content}
+        self.files[file_object["id"]] = file_object
+        return file_object
+
+    def refresh_batch_job(self, batch: dict) -> dict:
+        """validating (first 10%) -> in_progress (request_counts advance) -> finalizing (last 5%) -> completed."""
+        if batch["status"] not in ("validating", "in_progress", "finalizing"):
+            return batch
+        total = batch["request_counts"]["total"]
+        progress = (time.monotonic() - batch["_started"]) / batch["_duration"] if batch["_duration"] else 1.0
+        if progress >= 1.0:
+            self.finish_batch_job(batch)
+        elif progress >= 0.95:
+            batch.update(status="finalizing", finalizing_at=batch["finalizing_at"] or now())
+            batch["request_counts"]["completed"] = total
+        elif progress >= 0.1:
+            batch.update(status="in_progress", in_progress_at=batch["in_progress_at"] or now())
+            batch["request_counts"]["completed"] = int(total * (progress - 0.1) / 0.85)
+        return batch
+
+    def finish_batch_job(self, batch: dict):
+        outputs, errors = [], []
+        for line in batch["_requests"]:
+            request_id = new_id("req_")
+            if self.random.random() < self.config.run_failure_rate:
+                body = ApiError(500, "Simulated request failure.", "server_error").body
+                errors.append({"id": new_id("batch_req_"), "custom_id": line.get("custom_id"), "error": None,
+                               "response": {"status_code": 500, "request_id": request_id, "body": body}})
+            else:
+                outputs.append({"id": new_id("batch_req_"), "custom_id": line.get("custom_id"), "error": None,
+                                "response": {"status_code": 200, "request_id": request_id,
+                                             "body": self.chat_completion(line.get("body") or {})}})
+        to_jsonl = lambda rows: "".join(json.dumps(r) + "\n" for r in rows).encode()
+        if outputs:
+            batch["output_file_id"] = self.add_file(f"{batch['id']}_output.jsonl", to_jsonl(outputs), "batch_output")["id"]
+        if errors:
+            batch["error_file_id"] = self.add_file(f"{batch['id']}_error.jsonl", to_jsonl(errors), "batch_output")["id"]
+        batch["request_counts"].update(completed=len(outputs), failed=len(errors))
+        batch.update(status="completed", completed_at=now(), finalizing_at=batch["finalizing_at"] or now())
+        batch["_requests"] = []
+
+
+def wants_json(response_format) -> bool:
+    return isinstance(response_format, dict) and response_format.get("type") in ("json_object", "json_schema")
+
+
+def lecture_summary_json(question: str, broken: bool = False) -> str:
+    """A LectureSummary-shaped JSON reply for the topic named in the prompt (`broken`: examples is not a list)."""
+    topic = re.search(r"topic[:\s]+[\"']([^\"']+)[\"']", question)
+    summary = {
+        "topic": topic.group(1) if topic else "Mock Topic",
+        "explanation": " ".join(FILLER[:20]),
+        "examples": ["Example one", "Example two"],
+        "key_points": ["Point one", "Point two", "Point three"],
+        "difficulty": "Intermediate",
+        "resources": ["Mock textbook, chapter 3"],
+    }
+    if broken:
+        summary["examples"] = "Example one"
+    return json.dumps(summary, indent=2)
+
+
+class RawContent:
+    """A non-JSON response body (file downloads)."""
+
+    def __init__(self, data: bytes, content_type: str = "application/octet-stream"):
+        self.data = data
+        self.content_type = content_type
+
+
+def public(obj: dict) -> dict:
+    """Strip the mock's private bookkeeping keys."""
+    return {k: v for k, v in obj.items() if not k.startswith("_")}
+
+
+def paginate(items: List[dict], query: Dict[str, str], default_order: str = "desc") -> dict:
+    """Cursor pagination the way the API does it (limit/order/after/before)."""
+    order = query.get("order", default_order)
+    limit = min(int(query.get("limit", 20)), 100)
+    ordered = list(reversed(items)) if order == "desc" else list(items)  # items are kept oldest first
+    ids = [o["id"] for o in ordered]
+    if query.get("after") in ids:
+        ordered = ordered[ids.index(query["after"]) + 1:]
+    elif query.get("before") in ids:
+        ordered = ordered[:ids.index(query["before"])]
+    page = ordered[:limit]
+    return {
+        "object": "list",
+        "data": [public(o) for o in page],
+        "first_id": page[0]["id"] if page else None,
+        "last_id": page[-1]["id"] if page else None,
+        "has_more": len(ordered) > limit,
+    }
+
+
+class MockApi:
+    """Route table mapping (method, path regex) to handlers over a MockState."""
+
+    def __init__(self, state: MockState):
+        self.state = state
+        r = self.routes = []
+        add = lambda method, pattern, fn: r.append((method, re.compile(f"^/v1{pattern}$"), fn))
+        add("POST", "/assistants", self.create_assistant)
+        add("GET", "/assistants", lambda q, b: paginate(list(state.assistants.values()), q))
+        add("GET", "/assistants/(?P<aid>[^/]+)", lambda q, b, aid: self.get(state.assistants, aid, "assistant"))
+        add("POST", "/assistants/(?P<aid>[^/]+)", self.update_assistant)
+        add("DELETE", "/assistants/(?P<aid>[^/]+)", lambda q, b, aid: self.delete(state.assistants, aid, "assistant"))
+        add("POST", "/threads", self.create_thread)
+        add("GET", "/threads", lambda q, b: paginate(list(state.threads.values()), q))
+        add("POST", "/threads/runs", self.create_thread_and_run)
+        add("GET", "/threads/(?P<tid>[^/]+)", lambda q, b, tid: self.get(state.threads, tid, "thread"))
+        add("DELETE", "/threads/(?P<tid>[^/]+)", self.delete_thread)
+        add("POST", "/threads/(?P<tid>[^/]+)/messages", self.create_message)
+        add("GET", "/threads/(?P<tid>[^/]+)/messages", self.list_messages)
+        add("POST", "/threads/(?P<tid>[^/]+)/runs", self.create_run)
+        add("GET", "/threads/(?P<tid>[^/]+)/runs", self.list_runs)
+        add("GET", "/threads/(?P<tid>[^/]+)/runs/(?P<rid>[^/]+)", self.retrieve_run)
+        add("POST", "/threads/(?P<tid>[^/]+)/runs/(?P<rid>[^/]+)/cancel", self.cancel_run)
+        add("GET", "/threads/(?P<tid>[^/]+)/runs/(?P<rid>[^/]+)/steps", self.list_steps)
+        add("POST", "/files", self.create_file)
+        add("GET", "/files", lambda q, b: paginate(
+            [f for f in state.files.values() if not q.get("purpose") or f["purpose"] == q["purpose"]], q))
+        add("GET", "/files/(?P<fid>[^/]+)", lambda q, b, fid: self.get(state.files, fid, "file"))
+        add("GET", "/files/(?P<fid>[^/]+)/content", self.file_content)
+        add("DELETE", "/files/(?P<fid>[^/]+)", lambda q, b, fid: self.delete(state.files, fid, "file"))
+        add("POST", "/vector_stores", self.create_vector_store)
+        add("GET", "/vector_stores", lambda q, b: paginate(
+            [state.refresh_vector_store(v) for v in state.vector_stores.values()], q))
+        add("GET", "/vector_stores/(?P<vid>[^/]+)", self.retrieve_vector_store)
+        add("DELETE", "/vector_stores/(?P<vid>[^/]+)", self.delete_vector_store)
+        add("POST", "/vector_stores/(?P<vid>[^/]+)/files", self.create_vs_file)
+        add("GET", "/vector_stores/(?P<vid>[^/]+)/files", self.list_vs_files)
+        add("GET", "/vector_stores/(?P<vid>[^/]+)/files/(?P<fid>[^/]+)", self.retrieve_vs_file)
+        add("DELETE", "/vector_stores/(?P<vid>[^/]+)/files/(?P<fid>[^/]+)", self.delete_vs_file)
+        add("POST", "/vector_stores/(?P<vid>[^/]+)/file_batches", self.create_file_batch)
+        add("GET", "/vector_stores/(?P<vid>[^/]+)/file_batches/(?P<bid>[^/]+)", self.retrieve_file_batch)
+        add("POST", "/chat/completions", lambda q, b: self.state.chat_completion(b))
+        add("POST", "/batches", self.create_batch)
+        add("GET", "/batches", lambda q, b: paginate(
+            [self.state.refresh_batch_job(x) for x in state.batches.values()], q))
+        add("GET", "/batches/(?P<bid>[^/]+)", self.retrieve_batch)
+        add("POST", "/batches/(?P<bid>[^/]+)/cancel", self.cancel_batch)
+
+    def dispatch(self, method: str, path: str, query: Dict[str, str], body):
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(path)
+            if match and route_method == method:
+                with self.state.lock:
+                    return handler(query, body, **match.groupdict())
+        raise ApiError(404, f"Unknown endpoint {method} {path}")
+
+    # --- generic -------------------------------------------------------------
+
+    @staticmethod
+    def get(table: dict, object_id: str, kind: str) -> dict:
+        if object_id not in table:
+            raise ApiError(404, f"No {kind} found with id '{object_id}'.")
+        return public(table[object_id])
+
+    @staticmethod
+    def delete(table: dict, object_id: str, kind: str) -> dict:
+        if table.pop(object_id, None) is None:
+            raise ApiError(404, f"No {kind} found with id '{object_id}'.")
+        return {"id": object_id, "object": f"{kind}.deleted", "deleted": True}
+
+    # --- assistants ------------------------------------------------------------
+
+    def create_assistant(self, query, body):
+        assistant = {
+            "id": new_id("asst_"), "object": "assistant", "created_at": now(),
+            "name": body.get("name"), "description": body.get("description"),
+            "model": body.get("model", "gpt-4o-mini"), "instructions": body.get("instructions"),
+            "tools": body.get("tools", []), "tool_resources": body.get("tool_resources") or {},
+            "metadata": body.get("metadata") or {}, "temperature": body.get("temperature", 1.0),
+            "top_p": body.get("top_p", 1.0), "response_format": body.get("response_format", "auto"),
+        }
+        self.state.assistants[assistant["id"]] = assistant
+        return assistant
+
+    def update_assistant(self, query, body, aid):
+        self.get(self.state.assistants, aid, "assistant")
+        self.state.assistants[aid].update({k: v for k, v in body.items() if v is not None})
+        return public(self.state.assistants[aid])
+
+    # --- threads & messages ------------------------------------------------------
+
+    def create_thread(self, query, body):
+        thread = {"id": new_id("thread_"), "object": "thread", "created_at": now(),
+                  "metadata": (body or {}).get("metadata") or {}, "tool_resources": (body or {}).get("tool_resources")}
+        self.state.threads[thread["id"]] = thread
+        self.state.messages[thread["id"]] = []
+        for message in (body or {}).get("messages", []):
+            self.state.add_message(thread["id"], message.get("role", "user"), self.text_of(message))
+        return thread
+
+    def delete_thread(self, query, body, tid):
+        self.state.messages.pop(tid, None)
+        return self.delete(self.state.threads, tid, "thread")
+
+    @staticmethod
+    def text_of(message: dict) -> str:
+        content = message.get("content", "")
+        if isinstance(content, list):
+            return "".join(part.get("text", "") for part in content if isinstance(part, dict))
+        return content
+
+    def require_thread(self, tid: str):
+        if tid not in self.state.threads:
+            raise ApiError(404, f"No thread found with id '{tid}'.")
+
+    def create_message(self, query, body, tid):
+        self.require_thread(tid)
+        return self.state.add_message(tid, body.get("role", "user"), self.text_of(body))
+
+    def list_messages(self, query, body, tid):
+        self.require_thread(tid)
+        for run in self.state.runs.values():
+            if run["thread_id"] == tid:
+                self.state.refresh_run(run)
+        messages = self.state.messages[tid]
+        if query.get("run_id"):
+            messages = [m for m in messages if m["run_id"] == query["run_id"]]
+        return paginate(messages, query)
+
+    # --- runs ------------------------------------------------------------------------
+
+    def create_run(self, query, body, tid):
+        self.require_thread(tid)
+        assistant_id = body.get("assistant_id")
+        assistant = self.get(self.state.assistants, assistant_id, "assistant")
+        for message in body.get("additional_messages") or []:
+            self.state.add_message(tid, message.get("role", "user"), self.text_of(message))
+        run = {
+            "id": new_id("run_"), "object": "thread.run", "created_at": now(), "thread_id": tid,
+            "assistant_id": assistant_id, "status": "queued", "started_at": None, "completed_at": None,
+            "failed_at": None, "cancelled_at": None, "expires_at": now() + 600, "last_error": None,
+            "model": body.get("model") or assistant["model"],
+            "instructions": body.get("instructions") or assistant["instructions"],
+            "tools": body.get("tools") or assistant["tools"], "metadata": body.get("metadata") or {},
+            "response_format": body.get("response_format") or "auto", "usage": None,
+            "required_action": None, "incomplete_details": None, "parallel_tool_calls": True,
+            "tool_choice": "auto", "truncation_strategy": body.get("truncation_strategy"),
+            "temperature": body.get("temperature"), "top_p": body.get("top_p"),
+            "max_prompt_tokens": body.get("max_prompt_tokens"),
+            "max_completion_tokens": body.get("max_completion_tokens"),
+        }
+        self.state.runs[run["id"]] = run
+        self.state.run_meta[run["id"]] = {
+            "started": time.monotonic(),
+            "duration": self.state.run_duration(),
+            "failed": self.state.random.random() < self.state.config.run_failure_rate,
+        }
+        if body.get("stream"):
+            return StreamedRun(self.state, run)
+        return dict(run)
+
+    def create_thread_and_run(self, query, body):
+        thread = self.create_thread(query, body.get("thread") or {})
+        run_body = {k: v for k, v in body.items() if k != "thread"}
+        return self.create_run(query, run_body, thread["id"])
+
+    def find_run(self, tid: str, rid: str) -> dict:
+        run = self.state.runs.get(rid)
+        if run is None or run["thread_id"] != tid:
+            raise ApiError(404, f"No run found with id '{rid}'.")
+        return run
+
+    def retrieve_run(self, query, body, tid, rid):
+        return dict(self.state.refresh_run(self.find_run(tid, rid)))
+
+    def list_runs(self, query, body, tid):
+        self.require_thread(tid)
+        return paginate([self.state.refresh_run(r) for r in self.state.runs.values() if r["thread_id"] == tid], query)
+
+    def cancel_run(self, query, body, tid, rid):
+        run = self.state.refresh_run(self.find_run(tid, rid))
+        if run["status"] in ("queued", "in_progress", "requires_action"):
+            run.update(status="cancelled", cancelled_at=now(), required_action=None)
+        return dict(run)
+
+    def list_steps(self, query, body, tid, rid):
+        self.state.refresh_run(self.find_run(tid, rid))
+        return paginate(self.state.steps.get(rid, []), query)
+
+    # --- files -------------------------------------------------------------------------
+
+    def create_file(self, query, body):
+        filename, content, purpose = body
+        return public(self.state.add_file(filename, content, purpose))
+
+    def file_content(self, query, body, fid):
+        if fid not in self.state.files:
+            raise ApiError(404, f"No file found with id '{fid}'.")
+        return RawContent(self.state.files[fid]["_content"])
+
+    # --- Batch API -----------------------------------------------------------------------
+
+    def create_batch(self, query, body):
+        input_file = self.state.files.get(body.get("input_file_id"))
+        if input_file is None:
+            raise ApiError(404, f"No file found with id '{body.get('input_file_id')}'.")
+        if input_file["purpose"] != "batch":
+            raise ApiError(400, "The input file must be uploaded with purpose 'batch'.")
+        try:
+            requests = [json.loads(line) for line in input_file["_content"].decode().splitlines() if line.strip()]
+        except ValueError:
+            raise ApiError(400, "The input file is not valid JSONL.")
+        c = self.state.config
+        batch = {
+            "id": new_id("batch_"), "object": "batch", "endpoint": body.get("endpoint"), "errors": None,
+            "input_file_id": input_file["id"], "completion_window": body.get("completion_window", "24h"),
+            "status": "validating", "output_file_id": None, "error_file_id": None, "created_at": now(),
+            "in_progress_at": None, "expires_at": now() + 24 * 3600, "finalizing_at": None, "completed_at": None,
+            "failed_at": None, "expired_at": None, "cancelling_at": None, "cancelled_at": None,
+            "request_counts": {"total": len(requests), "completed": 0, "failed": 0},
+            "metadata": body.get("metadata"),
+            "_requests": requests, "_started": time.monotonic(),
+            "_duration": c.batch_latency + c.batch_request_latency * len(requests),
+        }
+        self.state.batches[batch["id"]] = batch
+        return public(batch)
+
+    def require_batch(self, bid: str) -> dict:
+        if bid not in self.state.batches:
+            raise ApiError(404, f"No batch found with id '{bid}'.")
+        return self.state.batches[bid]
+
+    def retrieve_batch(self, query, body, bid):
+        return public(self.state.refresh_batch_job(self.require_batch(bid)))
+
+    def cancel_batch(self, query, body, bid):
+        batch = self.state.refresh_batch_job(self.require_batch(bid))
+        if batch["status"] in ("validating", "in_progress", "finalizing"):
+            batch.update(status="cancelled", cancelling_at=now(), cancelled_at=now(), _requests=[])
+        return public(batch)
+
+    # --- vector stores -------------------------------------------------------------------
+
+    def create_vector_store(self, query, body):
+        vs = {"id": new_id("vs_"), "object": "vector_store", "created_at": now(), "name": body.get("name"),
+              "status": "completed", "usage_bytes": 0, "last_active_at": now(), "metadata": body.get("metadata") or {},
+              "expires_after": body.get("expires_after"), "expires_at": None}
+        self.state.vector_stores[vs["id"]] = vs
+        self.state.vs_files[vs["id"]] = {}
+        for file_id in body.get("file_ids") or []:
+            self.state.attach_file(vs["id"], file_id)
+        return dict(self.state.refresh_vector_store(vs))
+
+    def require_store(self, vid: str) -> dict:
+        if vid not in self.state.vector_stores:
+            raise ApiError(404, f"No vector store found with id '{vid}'.")
+        return self.state.vector_stores[vid]
+
+    def retrieve_vector_store(self, query, body, vid):
+        return dict(self.state.refresh_vector_store(self.require_store(vid)))
+
+    def delete_vector_store(self, query, body, vid):
+        self.state.vs_files.pop(vid, None)
+        return self.delete(self.state.vector_stores, vid, "vector_store")
+
+    def create_vs_file(self, query, body, vid):
+        self.require_store(vid)
+        return public(self.state.attach_file(vid, body.get("file_id")))
+
+    def list_vs_files(self, query, body, vid):
+        self.require_store(vid)
+        files = list(self.state.vs_files[vid].values())
+        for vs_file in files:
+            self.state.vs_file_status(vs_file)
+        if query.get("filter"):
+            files = [f for f in files if f["status"] == query["filter"]]
+        return paginate(files, query)
+
+    def retrieve_vs_file(self, query, body, vid, fid):
+        self.require_store(vid)
+        if fid not in self.state.vs_files[vid]:
+            raise ApiError(404, f"No file found with id '{fid}' in vector store '{vid}'.")
+        vs_file = self.state.vs_files[vid][fid]
+        self.state.vs_file_status(vs_file)
+        return public(vs_file)
+
+    def delete_vs_file(self, query, body, vid, fid):
+        self.require_store(vid)
+        if self.state.vs_files[vid].pop(fid, None) is None:
+            raise ApiError(404, f"No file found with id '{fid}' in vector store '{vid}'.")
+        return {"id": fid, "object": "vector_store.file.deleted", "deleted": True}
+
+    def create_file_batch(self, query, body, vid):
+        self.require_store(vid)
+        file_ids = body.get("file_ids") or []
+        for file_id in file_ids:
+            self.state.attach_file(vid, file_id)
+        batch = {"id": new_id("vsfb_"), "object": "vector_store.files_batch", "created_at": now(),
+                 "vector_store_id": vid, "status": "in_progress", "_file_ids": file_ids}
+        self.state.file_batches[batch["id"]] = batch
+        return public(self.state.refresh_batch(batch))
+
+    def retrieve_file_batch(self, query, body, vid, bid):
+        batch = self.state.file_batches.get(bid)
+        if batch is None or batch["vector_store_id"] != vid:
+            raise ApiError(404, f"No file batch found with id '{bid}'.")
+        return public(self.state.refresh_batch(batch))
+
+
+class StreamedRun:
+    """Server-sent events for a streamed run, paced at the configured tokens/sec."""
+
+    def __init__(self, state: MockState, run: dict):
+        self.state = state
+        self.run = run
+
+    def events(self):
+        state, run = self.state, self.run
+        yield "thread.run.created", dict(run)
+        yield "thread.run.queued", dict(run)
+        # Time before the first token: the run's queue/think time, without the generation part.
+        time.sleep(state.run_meta[run["id"]]["duration"] * 0.3)
+        with state.lock:
+            run["status"] = "in_progress"
+            run["started_at"] = now()
+        yield "thread.run.in_progress", dict(run)
+        with state.lock:
+            state.run_meta[run["id"]]["duration"] = 0.0
+            if run["status"] in ("queued", "in_progress"):
+                state.finish_run(run)
+            steps = state.steps.get(run["id"], [])
+            message = next((m for m in reversed(state.messages[run["thread_id"]]) if m["run_id"] == run["id"]), None)
+        if message is None:
+            yield f"thread.run.{run['status']}", dict(run)
+            return
+        message_step = None
+        for step in steps:
+            yield "thread.run.step.created", dict(step, status="in_progress")
+            if step["type"] != "tool_calls":
+                message_step = step
+                continue
+            delta = {"id": step["id"], "object": "thread.run.step.delta", "delta": {"step_details": {
+                "type": "tool_calls",
+                "tool_calls": [dict(call, index=i) for i, call in enumerate(step["step_details"]["tool_calls"])],
+            }}}
+            yield "thread.run.step.delta", delta
+            yield "thread.run.step.completed", step
+        yield "thread.message.created", dict(message, status="in_progress", content=[])
+        yield "thread.message.in_progress", dict(message, status="in_progress", content=[])
+        text = message["content"][0]["text"]["value"]
+        annotations = message["content"][0]["text"]["annotations"]
+        pieces = re.findall(r"\S+\s*", text)
+        delay = 1.0 / state.config.stream_tokens_per_second if state.config.stream_tokens_per_second else 0.0
+        position = 0
+        for piece in pieces:
+            time.sleep(delay)
+            block = {"index": 0, "type": "text", "text": {"value": piece, "annotations": []}}
+            end = position + len(piece)
+            block["text"]["annotations"] = [
+                dict(a, index=i) for i, a in enumerate(annotations) if position <= a["start_index"] < end
+            ]
+            position = end
+            yield "thread.message.delta", {"id": message["id"], "object": "thread.message.delta",
+                                           "delta": {"content": [block]}}
+        yield "thread.message.completed", message
+        if message_step is not None:
+            yield "thread.run.step.completed", message_step
+        yield "thread.run.completed", dict(run)
+
+
+def parse_multipart(content_type: str, raw: bytes) -> Tuple[str, bytes, str]:
+    """(filename, file content, purpose) from a files.create multipart body."""
+    boundary = re.search(r"boundary=([^;]+)", content_type).group(1).strip('"').encode()
+    filename, content, purpose = "upload", b"", "assistants"
+    for part in raw.split(b"--" + boundary):
+        header, _, payload = part.partition(b"\r\n\r\n")
+        payload = payload[:-2] if payload.endswith(b"\r\n") else payload
+        name = re.search(rb'name="([^"]+)"', header)
+        if not name:
+            continue
+        if name.group(1) == b"file":
+            found = re.search(rb'filename="([^"]*)"', header)
+            filename = found.group(1).decode() if found else filename
+            content = payload
+        elif name.group(1) == b"purpose":
+            purpose = payload.decode()
+    return filename, content, purpose
+
+
+def make_handler(api: MockApi):
+    config = api.state.config
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        rate_headers: Dict[str, str] = {}
+
+        def log_message(self, format, *args):  # keep benchmark output clean
+            pass
+
+        def send_json(self, status: int, payload: dict, extra_headers: Optional[dict] = None):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("content-type", "application/json")
+            self.send_header("content-length", str(len(data)))
+            self.send_header("x-request-id", new_id("req_"))
+            if config.poll_after_ms is not None:
+                self.send_header("openai-poll-after-ms", str(config.poll_after_ms))
+            for name, value in {**self.rate_headers, **(extra_headers or {})}.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def send_raw(self, raw: RawContent):
+            self.send_response(200)
+            self.send_header("content-type", raw.content_type)
+            self.send_header("content-length", str(len(raw.data)))
+            self.send_header("x-request-id", new_id("req_"))
+            for name, value in self.rate_headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(raw.data)
+
+        def send_stream(self, streamed: StreamedRun):
+            self.send_response(200)
+            self.send_header("content-type", "text/event-stream")
+            self.send_header("cache-control", "no-cache")
+            self.send_header("connection", "close")
+            for name, value in self.rate_headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.close_connection = True
+            try:
+                for event, data in streamed.events():
+                    self.wfile.write(f"event: {event}\ndata: {json.dumps(public(data))}\n\n".encode())
+                    self.wfile.flush()
+                self.wfile.write(b"event: done\ndata: [DONE]\n\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the client stopped reading (e.g. aborted on a schema violation)
+
+        def handle_any(self, method: str):
+            url = urlparse(self.path)
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            length = int(self.headers.get("content-length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            with api.state.lock:
+                api.state.requests += 1
+                roll = api.state.random.random()
+            time.sleep(config.latency + api.state.random.uniform(0, config.latency_jitter))
+            self.rate_headers = {}
+            if api.state.rate_limits is not None:
+                allowed, self.rate_headers = api.state.rate_limits.take(method, url.path, raw)
+                if not allowed:
+                    api.state.throttled += 1
+                    return self.send_json(429, ApiError(429, "Rate limit reached for requests.", "requests").body)
+            if roll < config.rate_limit_rate:
+                return self.send_json(429, ApiError(429, "Rate limit reached (simulated).", "rate_limit_exceeded").body,
+                                      {"retry-after-ms": "200"})
+            if roll < config.rate_limit_rate + config.failure_rate:
+                return self.send_json(500, ApiError(500, "Internal error (simulated).", "server_error").body)
+            try:
+                content_type = self.headers.get("content-type", "")
+                if content_type.startswith("multipart/form-data"):
+                    body = parse_multipart(content_type, raw)
+                else:
+                    body = json.loads(raw) if raw else {}
+                result = api.dispatch(method, url.path, query, body)
+            except ApiError as e:
+                return self.send_json(e.status, e.body)
+            except Exception as e:  # a mock bug should surface as a 500, not a hung client
+                return self.send_json(500, ApiError(500, f"Mock server error: {e}", "server_error").body)
+            if isinstance(result, StreamedRun):
+                return self.send_stream(result)
+            if isinstance(result, RawContent):
+                return self.send_raw(result)
+            self.send_json(200, result)
+
+        def do_GET(self):
+            self.handle_any("GET")
+
+        def do_POST(self):
+            self.handle_any("POST")
+
+        def do_DELETE(self):
+            self.handle_any("DELETE")
+
+    return Handler
+
+
+class MockOpenAIServer:
+    """Threaded mock server; use as a context manager or call start()/stop()."""
+
+    def __init__(self, config: Optional[MockConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or MockConfig()
+        self.state = MockState(self.config)
+        self.api = MockApi(self.state)
+        self.httpd = ThreadingHTTPServer((host, port), make_handler(self.api))
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockOpenAIServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="mock-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Local mock of the OpenAI Assistants / Files / Vector Stores / Batch API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    defaults = MockConfig()
+    parser.add_argument("--latency", type=float, default=defaults.latency, help="Seconds added to every request")
+    parser.add_argument("--latency-jitter", type=float, default=defaults.latency_jitter)
+    parser.add_argument("--failure-rate", type=float, default=defaults.failure_rate, help="Share of requests failing with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=defaults.rate_limit_rate, help="Share of requests failing with 429")
+    parser.add_argument("--run-latency", type=float, default=defaults.run_latency, help="Seconds a run takes to complete")
+    parser.add_argument("--run-failure-rate", type=float, default=defaults.run_failure_rate)
+    parser.add_argument("--file-processing-latency", type=float, default=defaults.file_processing_latency)
+    parser.add_argument("--stream-tokens-per-second", type=float, default=defaults.stream_tokens_per_second)
+    parser.add_argument("--reply-tokens", type=int, default=defaults.reply_tokens)
+    parser.add_argument("--json-error-rate", type=float, default=defaults.json_error_rate,
+                        help="Share of JSON-mode replies that violate the LectureSummary schema")
+    parser.add_argument("--poll-after-ms", type=int, default=None)
+    parser.add_argument("--batch-latency", type=float, default=defaults.batch_latency,
+                        help="Seconds a Batch API job takes before its per-request time")
+    parser.add_argument("--batch-request-latency", type=float, default=defaults.batch_request_latency)
+    parser.add_argument("--rpm-limit", type=int, default=defaults.rpm_limit,
+                        help="Requests per minute before 429s, reported in x-ratelimit-* headers (0: off)")
+    parser.add_argument("--tpm-limit", type=int, default=defaults.tpm_limit,
+                        help="Tokens per minute of model calls before 429s (0: off)")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    config = MockConfig(**{k: v for k, v in vars(args).items() if k not in ("host", "port")})
+    server = MockOpenAIServer(config, args.host, args.port)
+    print(f"🧪 Mock OpenAI API listening on {server.url}  (Ctrl+C to stop)")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Reproducible benchmarks for the lab scripts against the local mock server.
+
+Starts benchmarks/mock_server.py in-process, points the shared client at it
+and drives the real functions of scripts 01–03 through these scenarios:
+
+    01-polling          create a thread, run it, poll until done
+    01-streaming        the same question streamed through labkit.streaming
+    02-json-mode        JSON-mode LectureSummary
+    02-function-tools   strict function tool passed per run (schema from the registry)
+    02-batch            --batch-topics LectureSummary objects through the Batch API
+    03-rag-serial       the eight KMP queries one after another
+    03-rag-concurrent   the same queries on the async engine (--concurrency)
+    03-rag-fast         the same queries, one streamed create_and_run request each
+    03-upload-cold      upload data/ + create a vector store with an empty manifest
+    03-upload-warm      the same with a warm upload manifest (everything reused)
+
+Each scenario runs --repeat times. The report lists wall time (mean, p50,
+p95), throughput, API calls and the slowest API operation, and is saved as
+JSON in benchmarks/results/ so runs can be compared with --compare.
+
+With --rpm-limit / --tpm-limit the mock enforces per-minute limits and
+reports them in x-ratelimit-* headers; the clients pace themselves from
+those headers (labkit.rate_limits) unless --no-pacing is given, so the
+"failed" column shows the 429s pacing avoided.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--repeat 3] [--scenarios rag,upload]
+        [--run-latency 0.8] [--latency 0.02] [--failure-rate 0] [--compare <report.json>]
+        [--rpm-limit 300 [--tpm-limit 40000] [--no-pacing]]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Dict, List
+
+BENCH_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = BENCH_DIR.parent
+SCRIPTS_DIR = PROJECT_ROOT / "scripts"
+RESULTS_DIR = BENCH_DIR / "results"
+
+sys.path.insert(0, str(SCRIPTS_DIR))
+sys.path.insert(0, str(BENCH_DIR))
+
+from lab import load_script  # noqa: E402
+from mock_server import MockConfig, MockOpenAIServer  # noqa: E402
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+class Bench:
+    """Shared context for scenarios: the mock server, the client, the lab modules and fixtures."""
+
+    def __init__(self, args):
+        self.args = args
+        self.tmp = Path(tempfile.mkdtemp(prefix="labbench-"))
+
+    def setup(self):
+        from labkit.polling import DurationStats, set_default_stats
+
+        from labkit.tool_schemas import ToolSchemaRegistry, set_registry
+
+        set_default_stats(DurationStats(path=None))  # learned mock timings must not leak into .poll_stats.json
+        set_registry(ToolSchemaRegistry(path=None))
+        with contextlib.redirect_stdout(io.StringIO()):
+            from labkit.client import get_client
+            from labkit.upload_cache import UploadManifest
+
+            self.client = get_client()
+            self.lab01 = load_script("01_responses_api.py")
+            self.lab02 = load_script("02_structured_output.py")
+            self.lab03 = load_script("03_rag_file_search.py")
+            assistant = self.client.beta.assistants.create(
+                name="Benchmark Assistant", model="gpt-4o-mini", tools=[{"type": "file_search"}],
+                instructions="You are a Study Q&A Assistant."
+            )
+            self.assistant_id = assistant.id
+            self.warm_manifest = UploadManifest(self.tmp / "warm_manifest.json")
+            vector_store, _ = self.prepare(self.warm_manifest)
+            self.lab03.attach_vector_store_to_assistant(self.client, self.assistant_id, vector_store.id)
+
+    def prepare(self, manifest):
+        options = SimpleNamespace(sync=False, bulk=False, store_name=None, workers=8, batch_size=100)
+        return self.lab03.prepare_vector_store(self.client, self.assistant_id, options, manifest)
+
+    # --- scenarios: each returns the number of operations it completed ---------
+
+    def polling(self) -> int:
+        thread = self.lab01.create_thread_with_messages(self.client)
+        self.lab01.demonstrate_polling_run(self.client, self.assistant_id, thread.id)
+        return 1
+
+    def streaming(self) -> int:
+        thread = self.lab01.create_thread_with_messages(self.client)
+        self.lab01.demonstrate_streaming_run(self.client, self.assistant_id, thread.id)
+        return 1
+
+    def json_mode(self) -> int:
+        return 1 if self.lab02.demonstrate_json_mode(self.client, self.assistant_id) else 0
+
+    def function_tools(self) -> int:
+        return 1 if self.lab02.demonstrate_function_tools_strict(self.client, self.assistant_id) else 0
+
+    def batch_summaries(self) -> int:
+        topics_path = self.tmp / "topics.txt"
+        topics_path.write_text("".join(f"Topic {i}\n" for i in range(self.args.batch_topics)))
+        output = self.tmp / "summaries.jsonl"
+        options = SimpleNamespace(batch=topics_path, batch_id=None, batch_output=output)
+        self.lab02.run_batch_summaries(self.client, self.assistant_id, options)
+        with open(output) as f:
+            return sum(1 for _ in f)
+
+    def rag_serial(self) -> int:
+        results = self.lab03.demonstrate_rag_queries(self.client, self.assistant_id, concurrency=1)
+        return sum(1 for r in results if "response_length" in r)
+
+    def rag_concurrent(self) -> int:
+        results = self.lab03.demonstrate_rag_queries(self.client, self.assistant_id,
+                                                     concurrency=self.args.concurrency)
+        return sum(1 for r in results if "response_length" in r)
+
+    def rag_fast(self) -> int:
+        results = self.lab03.demonstrate_rag_queries(self.client, self.assistant_id, concurrency=1, fast=True)
+        return sum(1 for r in results if "response_length" in r)
+
+    def upload_cold(self) -> int:
+        from labkit.upload_cache import UploadManifest
+
+        manifest_path = self.tmp / f"cold_{time.monotonic_ns()}.json"
+        _, file_ids = self.prepare(UploadManifest(manifest_path))
+        return len(file_ids)
+
+    def upload_warm(self) -> int:
+        _, file_ids = self.prepare(self.warm_manifest)
+        return len(file_ids)
+
+
+SCENARIOS: Dict[str, Callable[[Bench], int]] = {
+    "01-polling": Bench.polling,
+    "01-streaming": Bench.streaming,
+    "02-json-mode": Bench.json_mode,
+    "02-function-tools": Bench.function_tools,
+    "02-batch": Bench.batch_summaries,
+    "03-rag-serial": Bench.rag_serial,
+    "03-rag-concurrent": Bench.rag_concurrent,
+    "03-rag-fast": Bench.rag_fast,
+    "03-upload-cold": Bench.upload_cold,
+    "03-upload-warm": Bench.upload_warm,
+}
+
+
+def run_scenario(bench: Bench, name: str, repeat: int, verbose: bool) -> dict:
+    from labkit.telemetry import get_telemetry
+
+    telemetry = get_telemetry()
+    telemetry.reset()
+    durations, operations, errors = [], 0, []
+    for _ in range(repeat):
+        output = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(io.StringIO())
+        start = time.perf_counter()
+        try:
+            with output:
+                operations += SCENARIOS[name](bench)
+        except (Exception, SystemExit) as e:
+            errors.append(f"{type(e).__name__}: {e}")
+        durations.append(time.perf_counter() - start)
+
+    rows = telemetry.snapshot()
+    api_calls = sum(stats.latency.count for _, stats in rows)
+    failed_calls = sum(n for _, stats in rows for status, n in stats.statuses.items() if not status.startswith("2"))
+    slowest = rows[0] if rows else None
+    total = sum(durations)
+    return {
+        "scenario": name,
+        "repeat": repeat,
+        "mean_s": statistics.mean(durations),
+        "p50_s": percentile(durations, 0.50),
+        "p95_s": percentile(durations, 0.95),
+        "operations": operations,
+        "ops_per_s": operations / total if total else 0.0,
+        "api_calls": api_calls,
+        "failed_api_calls": failed_calls,
+        "slowest_operation": slowest[0] if slowest else None,
+        "slowest_operation_total_s": slowest[1].latency.total if slowest else 0.0,
+        "api_operations": [stats.as_dict(op) for op, stats in rows],
+        "errors": errors,
+    }
+
+
+def print_report(results: List[dict], baseline: Dict[str, dict]):
+    print(f"\n{'scenario':<20} {'mean':>8} {'p50':>8} {'p95':>8} {'ops/s':>7} {'calls':>6} {'failed':>6}  slowest API operation")
+    for r in results:
+        line = (f"{r['scenario']:<20} {r['mean_s']:>7.2f}s {r['p50_s']:>7.2f}s {r['p95_s']:>7.2f}s "
+                f"{r['ops_per_s']:>7.2f} {r['api_calls']:>6} {r['failed_api_calls']:>6}  "
+                f"{r['slowest_operation'] or '-'} ({r['slowest_operation_total_s']:.2f}s)")
+        previous = baseline.get(r["scenario"])
+        if previous and previous["p50_s"]:
+            change = 100 * (r["p50_s"] - previous["p50_s"]) / previous["p50_s"]
+            line += f"  [p50 {change:+.0f}% vs baseline]"
+        print(line)
+        for error in r["errors"][:3]:
+            print(f"    ❌ {error}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the lab scripts against a local mock OpenAI server")
+    parser.add_argument("--scenarios", default="",
+                        help="Comma-separated substrings selecting scenarios (default: all)")
+    parser.add_argument("--list", action="store_true", help="List scenarios and exit")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrency for 03-rag-concurrent")
+    parser.add_argument("--batch-topics", type=int, default=200, help="Topics per 02-batch job")
+    parser.add_argument("--verbose", action="store_true", help="Show the scripts' own output")
+    parser.add_argument("--output", type=Path, default=None, help="Report path (default: benchmarks/results/bench-<time>.json)")
+    parser.add_argument("--compare", type=Path, default=None, help="Earlier report to compare p50 against")
+    defaults = MockConfig()
+    parser.add_argument("--latency", type=float, default=defaults.latency)
+    parser.add_argument("--latency-jitter", type=float, default=defaults.latency_jitter)
+    parser.add_argument("--failure-rate", type=float, default=defaults.failure_rate)
+    parser.add_argument("--rate-limit-rate", type=float, default=defaults.rate_limit_rate)
+    parser.add_argument("--run-latency", type=float, default=defaults.run_latency)
+    parser.add_argument("--file-processing-latency", type=float, default=defaults.file_processing_latency)
+    parser.add_argument("--stream-tokens-per-second", type=float, default=defaults.stream_tokens_per_second)
+    parser.add_argument("--poll-after-ms", type=int, default=None)
+    parser.add_argument("--batch-latency", type=float, default=defaults.batch_latency)
+    parser.add_argument("--json-error-rate", type=float, default=defaults.json_error_rate)
+    parser.add_argument("--rpm-limit", type=int, default=defaults.rpm_limit,
+                        help="Mock requests-per-minute limit, reported in x-ratelimit-* headers (0: off)")
+    parser.add_argument("--tpm-limit", type=int, default=defaults.tpm_limit,
+                        help="Mock tokens-per-minute limit for model calls (0: off)")
+    parser.add_argument("--no-pacing", action="store_true",
+                        help="Disable header-driven client pacing (OPENAI_RATE_LIMITS=0) to compare against")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    if args.list:
+        print("\n".join(SCENARIOS))
+        return
+    selected = [name for name in SCENARIOS
+                if not args.scenarios or any(s.strip() and s.strip() in name for s in args.scenarios.split(","))]
+    if not selected:
+        print(f"❌ No scenario matches '{args.scenarios}'. Use --list.")
+        sys.exit(1)
+
+    config = MockConfig(
+        latency=args.latency, latency_jitter=args.latency_jitter, failure_rate=args.failure_rate,
+        rate_limit_rate=args.rate_limit_rate, run_latency=args.run_latency,
+        file_processing_latency=args.file_processing_latency,
+        stream_tokens_per_second=args.stream_tokens_per_second, poll_after_ms=args.poll_after_ms,
+        batch_latency=args.batch_latency, json_error_rate=args.json_error_rate, seed=args.seed,
+        rpm_limit=args.rpm_limit, tpm_limit=args.tpm_limit,
+    )
+    warnings.filterwarnings("ignore", category=DeprecationWarning)  # Assistants API deprecation notices
+
+    with MockOpenAIServer(config) as server:
+        os.environ.update(OPENAI_API_KEY="mock-key", OPENAI_BASE_URL=server.url, OPENAI_TELEMETRY="1",
+                          OPENAI_LEDGER="0",  # mock resources stay out of the real ledger
+                          OPENAI_RATE_LIMITS="0" if args.no_pacing else "1")
+        os.environ.pop("OPENAI_ORG", None)
+        print(f"🧪 Mock OpenAI API on {server.url} (run latency {config.run_latency}s, "
+              f"request latency {config.latency}s, failure rate {config.failure_rate:.0%})")
+        bench = Bench(args)
+        bench.setup()
+
+        results = []
+        for name in selected:
+            print(f"⏱️  {name} x{args.repeat} ...", flush=True)
+            results.append(run_scenario(bench, name, args.repeat, args.verbose))
+
+    baseline = {}
+    if args.compare:
+        baseline = {r["scenario"]: r for r in json.loads(args.compare.read_text())["results"]}
+    print_report(results, baseline)
+
+    output = args.output or RESULTS_DIR / f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "mock_config": vars(config),
+        "repeat": args.repeat,
+        "results": results,
+    }
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\n📁 Report written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Startup cost of the lab CLI and scripts.
+
+Runs each command below in a fresh interpreter --repeat times and reports
+the wall time (min and median), then runs it once more under
+`python -X importtime` and lists the total import time and the heaviest
+top-level imports. No API key or network is needed: the commands only parse
+their arguments.
+
+    python -c pass                        interpreter baseline
+    lab --help                            CLI dispatch only
+    lab cleanup --help                    99_cleanup.py imported, no client
+    lab rag --help                        03_rag_file_search.py imported, no client
+    lab structured --help                 02_structured_output.py imported, no client or pydantic
+    import labkit.client + openai         what the first get_client() adds
+
+Usage:
+    python benchmarks/startup_times.py [--repeat 10] [--top 8] [--output <report.json>]
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+BENCH_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = BENCH_DIR.parent
+SCRIPTS_DIR = PROJECT_ROOT / "scripts"
+RESULTS_DIR = BENCH_DIR / "results"
+LAB = str(SCRIPTS_DIR / "lab.py")
+
+COMMANDS = {
+    "python -c pass": ["-c", "pass"],
+    "lab --help": [LAB, "--help"],
+    "lab cleanup --help": [LAB, "cleanup", "--help"],
+    "lab rag --help": [LAB, "rag", "--help"],
+    "lab structured --help": [LAB, "structured", "--help"],
+    "labkit.client + openai": ["-c", "import labkit.client, openai"],
+}
+
+
+def run(args: List[str], extra: Tuple[str, ...] = ()) -> Tuple[float, str]:
+    """Run `python [extra] args` from the project root; returns (seconds, stderr)."""
+    env = dict(os.environ, PYTHONPATH=str(SCRIPTS_DIR), PYTHONDONTWRITEBYTECODE="1")
+    start = time.perf_counter()
+    done = subprocess.run([sys.executable, *extra, *args], cwd=PROJECT_ROOT, env=env,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    seconds = time.perf_counter() - start
+    if done.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} exited with {done.returncode}: {done.stderr.strip()[-300:]}")
+    return seconds, done.stderr
+
+
+def parse_importtime(stderr: str) -> Tuple[float, List[Tuple[str, float]]]:
+    """Total self time and (module, cumulative seconds) of top-level imports, heaviest first."""
+    total, top_level = 0, []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        total += int(self_us)
+        if not name.startswith("  "):  # nesting is shown by two spaces per level
+            top_level.append((name.strip(), int(cumulative_us) / 1e6))
+    top_level.sort(key=lambda item: item[1], reverse=True)
+    return total / 1e6, top_level
+
+
+def measure(name: str, args: List[str], repeat: int, top: int) -> dict:
+    run(args)  # warm the OS file cache and __pycache__ before timing
+    times = [run(args)[0] for _ in range(repeat)]
+    _, stderr = run(args, ("-X", "importtime"))
+    import_total, heaviest = parse_importtime(stderr)
+    return {
+        "command": name,
+        "min_s": min(times),
+        "median_s": statistics.median(times),
+        "import_s": import_total,
+        "heaviest_imports": [{"module": module, "cumulative_s": seconds} for module, seconds in heaviest[:top]],
+    }
+
+
+def print_report(results: List[dict]):
+    print(f"\n{'command':<26} {'min':>8} {'median':>8} {'imports':>8}  heaviest top-level imports")
+    for r in results:
+        heaviest = ", ".join(f"{i['module']} {i['cumulative_s'] * 1000:.0f}ms" for i in r["heaviest_imports"][:3])
+        print(f"{r['command']:<26} {r['min_s'] * 1000:>6.0f}ms {r['median_s'] * 1000:>6.0f}ms "
+              f"{r['import_s'] * 1000:>6.0f}ms  {heaviest or '-'}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Measure startup and import time of the lab CLI")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--top", type=int, default=8, help="Heaviest imports kept per command in the report")
+    parser.add_argument("--commands", default="", help="Comma-separated substrings selecting commands (default: all)")
+    parser.add_argument("--output", type=Path, default=None,
+                        help="Report path (default: benchmarks/results/startup-<time>.json)")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    selected = {name: argv for name, argv in COMMANDS.items()
+                if not args.commands or any(s.strip() and s.strip() in name for s in args.commands.split(","))}
+    results = []
+    for name, command in selected.items():
+        print(f"⏱️  {name} x{args.repeat} ...", flush=True)
+        results.append(measure(name, command, args.repeat, args.top))
+    print_report(results)
+
+    output = args.output or RESULTS_DIR / f"startup-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps({
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "results": results,
+    }, indent=2))
+    print(f"\n📁 Report written to {output}")
+
+
+if __name__ == "__main__":
+    main()
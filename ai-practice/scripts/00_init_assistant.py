@@ -12,29 +12,12 @@ Usage: python scripts/00_init_assistant.py
 Docs: https://platform.openai.com/docs/api-reference/assistants
 """
 
-import os
+import argparse
 import sys
 from pathlib import Path
-from dotenv import load_dotenv
-from openai import OpenAI
+from labkit.client import get_client
+from labkit.telemetry import report_telemetry
 
-# Load environment variables
-load_dotenv()
-
-def get_client():
-    """Initialize OpenAI client with API key from environment."""
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        print("❌ Error: OPENAI_API_KEY not found in environment variables.")
-        print("   Please copy .env.example to .env and add your API key.")
-        sys.exit(1)
-    
-    org_id = os.getenv("OPENAI_ORG")
-    client_kwargs = {"api_key": api_key}
-    if org_id:
-        client_kwargs["organization"] = org_id
-    
-    return OpenAI(**client_kwargs)
 
 def load_assistant_id():
     """Load existing assistant ID from .assistant file if it exists."""
@@ -96,8 +79,14 @@ provide specific citations and references to the source material.""",
         print(f"❌ Error creating/updating assistant: {e}")
         sys.exit(1)
 
+def parse_args(argv=None):
+    """Command-line options (none yet; gives the script a --help)."""
+    parser = argparse.ArgumentParser(description="Create or reuse the lab assistant and save its ID in .assistant")
+    return parser.parse_args(argv)
+
 def main():
     """Main function to bootstrap the assistant."""
+    parse_args()
     print("🚀 OpenAI Practice Lab - Assistant Bootstrap")
     print("=" * 50)
     
@@ -107,6 +96,8 @@ def main():
     
     # Create or update assistant
     assistant = create_or_update_assistant(client)
+    print()
+    report_telemetry()
     
     print("\n🎯 Next Steps:")
     print("   1. Run: python scripts/01_responses_api.py")
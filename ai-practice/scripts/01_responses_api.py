@@ -4,36 +4,28 @@
 
 Walk-through of OpenAI Threads → Runs → streaming workflow.
 Demonstrates message handling, run polling, streaming responses, and tool calls.
+A local token budget (labkit.token_budget) predicts each run's prompt size and
+cost and keeps the growing thread within --token-budget.
 
-Usage: python scripts/01_responses_api.py
+Usage: python scripts/01_responses_api.py [--parallel-runs <n>] [--transcript <path>]
+                                          [--token-budget <tokens> [--compact]]
 
 Docs: https://platform.openai.com/docs/api-reference/responses
 """
 
-import os
 import sys
 import time
+import asyncio
+import argparse
 import json
 from pathlib import Path
-from dotenv import load_dotenv
-from openai import OpenAI
+from labkit.client import get_async_client, get_client
+from labkit.polling import AdaptivePoller, PollTimeout, print_poll_summary
+from labkit.run_scheduler import BackgroundRunScheduler
+from labkit.streaming import file_sink, stdout_consumer, stream_run
+from labkit.telemetry import report_telemetry
+from labkit.token_budget import ThreadBudget
 
-# Load environment variables
-load_dotenv()
-
-def get_client():
-    """Initialize OpenAI client with API key from environment."""
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        print("❌ Error: OPENAI_API_KEY not found in environment variables.")
-        sys.exit(1)
-    
-    org_id = os.getenv("OPENAI_ORG")
-    client_kwargs = {"api_key": api_key}
-    if org_id:
-        client_kwargs["organization"] = org_id
-    
-    return OpenAI(**client_kwargs)
 
 def load_assistant_id():
     """Load assistant ID from .assistant file."""
@@ -43,53 +35,70 @@ def load_assistant_id():
         sys.exit(1)
     return assistant_file.read_text().strip()
 
-def create_thread_with_messages(client):
+def create_thread_with_messages(client, budget=None):
     """Create a thread and add sample messages."""
     print("📝 Creating thread with messages...")
     
+    messages = [
+        {
+            "role": "user",
+            "content": "Hello! I'm learning algorithms and data structures. Can you explain how to solve the problem of finding the longest common subsequence?"
+        },
+        {
+            "role": "user", 
+            "content": "Also, what is the time complexity of the longest common subsequence problem?"
+        }
+    ]
     # Create thread with initial messages
-    thread = client.beta.threads.create(
-        messages=[
-            {
-                "role": "user",
-                "content": "Hello! I'm learning algorithms and data structures. Can you explain how to solve the problem of finding the longest common subsequence?"
-            },
-            {
-                "role": "user", 
-                "content": "Also, what is the time complexity of the longest common subsequence problem?"
-            }
-        ]
-    )
+    thread = client.beta.threads.create(messages=messages)
+    if budget:
+        for message in messages:
+            budget.add(message["role"], message["content"])
     
     print(f"✅ Thread created: {thread.id}")
     return thread
 
-def demonstrate_polling_run(client, assistant_id, thread_id):
+def demonstrate_polling_run(client, assistant_id, thread_id, budget=None):
     """Demonstrate run creation with polling until completion."""
     print("\n🔄 Starting run with polling...")
     
+    instructions = "Please provide clear, educational explanations suitable for someone learning the algorithms and data structures."
+    plan = budget.plan(instructions) if budget else None
+    if plan:
+        print(plan.describe())
     start_time = time.time()
     
     # Create and start run
     run = client.beta.threads.runs.create(
         thread_id=thread_id,
         assistant_id=assistant_id,
-        instructions="Please provide clear, educational explanations suitable for someone learning the algorithms and data structures."
+        instructions=instructions,
+        **(plan.run_options if plan else {})
     )
     
     print(f"🚀 Run started: {run.id}")
     print(f"📊 Initial status: {run.status}")
     
-    # Poll until completion
-    while run.status in ["queued", "in_progress", "requires_action"]:
-        time.sleep(1)
-        run = client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run.id)
-        print(f"⏳ Status: {run.status}")
-        
-        if run.status == "requires_action":
-            print("🔧 Run requires action (tool calls)")
-            # In a real scenario, you'd handle tool calls here
-            break
+    # Poll until completion (adaptive backoff instead of a fixed 1s sleep)
+    if run.status in ["queued", "in_progress"]:
+        poller = AdaptivePoller("runs.retrieve", baseline_interval=1.0)
+        try:
+            run = poller.poll(
+                lambda: client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run.id),
+                is_done=lambda r: r.status not in ["queued", "in_progress"],
+                on_update=lambda r: print(f"⏳ Status: {r.status}")
+            )
+        except PollTimeout as e:
+            print(f"⌛ {e}; cancelling run {run.id}")
+            try:
+                run = client.beta.threads.runs.cancel(thread_id=thread_id, run_id=run.id)
+            except Exception as cancel_error:
+                print(f"⚠️ Could not cancel run {run.id}: {cancel_error}")
+                run = e.last_result or run
+    
+    if run.status == "requires_action":
+        print("🔧 Run requires action (tool calls)")
+        # In a real scenario, you'd handle tool calls here
     
     end_time = time.time()
     duration = end_time - start_time
@@ -100,49 +109,104 @@ def demonstrate_polling_run(client, assistant_id, thread_id):
     if run.usage:
         print(f"💰 Token usage: {run.usage.total_tokens} total "
               f"({run.usage.prompt_tokens} prompt + {run.usage.completion_tokens} completion)")
+    if budget:
+        budget.record_run(run, plan)
     
     return run
 
-def demonstrate_streaming_run(client, assistant_id, thread_id):
-    """Demonstrate streaming run with real-time token display."""
+def demonstrate_multiplexed_runs(client, assistant_id, count):
+    """Start several runs at once and wait on all of them from one scheduler thread."""
+    print(f"\n🧮 Starting {count} runs tracked by one multiplexed poller...")
+    
+    topics = ["binary search", "merge sort", "hash tables", "breadth-first search", "heaps", "tries"]
+    start_time = time.time()
+    
+    with BackgroundRunScheduler(requests_per_second=5) as scheduler:
+        pending = []
+        for i in range(count):
+            topic = topics[i % len(topics)]
+            run = client.beta.threads.create_and_run(
+                assistant_id=assistant_id,
+                thread={"messages": [{"role": "user", "content": f"In two sentences, what is {topic}?"}]}
+            )
+            print(f"🚀 Run {run.id} started on thread {run.thread_id} ({topic})")
+            pending.append(scheduler.track(run.thread_id, run.id, priority=i))
+        
+        for future in pending:
+            run = future.result()
+            print(f"✅ Run {run.id}: {run.status}")
+    
+    print(f"⏱️ {count} runs finished in {time.time() - start_time:.2f} seconds")
+
+def demonstrate_streaming_run(client, assistant_id, thread_id, transcript_path=None, budget=None, compact=False):
+    """
+    Demonstrate streaming run with real-time token display.
+
+    With `compact`, a thread whose next prompt (the new question included) is
+    over the budget is summarized into a new one first. Returns
+    (thread id the run streamed on, response text).
+    """
     print("\n🌊 Starting streaming run...")
     
     # Add another message to the thread
+    question = "Can you give me a practical example of the queue and stack data structures?"
     client.beta.threads.messages.create(
         thread_id=thread_id,
         role="user",
-        content="Can you give me a practical example of the queue and stack data structures?"
+        content=question
     )
+    instructions = "Provide a concise but detailed explanation of the queue and stack data structures."
+    plan = None
+    if budget:
+        budget.add("user", question)
+        compacted_id = budget.enforce(client, thread_id, compact=compact, instructions=instructions)
+        if compacted_id != thread_id:
+            print(f"🗜️ Older turns summarized; continuing on thread {compacted_id}")
+            thread_id = compacted_id
+        plan = budget.plan(instructions)
+        print(plan.describe())
     
     print("📡 Streaming response:")
     print("-" * 50)
     
-    # Create streaming run
-    stream = client.beta.threads.runs.create(
-        thread_id=thread_id,
-        assistant_id=assistant_id,
-        stream=True,
-        instructions="Provide a concise but detailed explanation of the queue and stack data structures."
-    )
+    async def stream():
+        # Consumers see every event as it arrives; add fanout_consumer(Broadcaster()) to serve SSE clients.
+        consumers = [stdout_consumer()]
+        if transcript_path:
+            consumers.append(file_sink(transcript_path))
+        async_client = get_async_client()
+        try:
+            return await stream_run(
+                async_client,
+                consumers,
+                thread_id=thread_id,
+                assistant_id=assistant_id,
+                instructions=instructions,
+                **(plan.run_options if plan else {})
+            )
+        finally:
+            await async_client.close()
+    
+    result = asyncio.run(stream())
+    if budget:
+        budget.record_run(result.run, plan)
     
-    full_response = ""
-    for event in stream:
-        if event.event == "thread.message.delta":
-            if hasattr(event.data.delta, 'content') and event.data.delta.content:
-                for content in event.data.delta.content:
-                    if hasattr(content, 'text') and hasattr(content.text, 'value'):
-                        chunk = content.text.value
-                        print(chunk, end="", flush=True)
-                        full_response += chunk
-        elif event.event == "thread.run.completed":
-            print(f"\n\n✅ Streaming completed")
-            if hasattr(event.data, 'usage') and event.data.usage:
-                usage = event.data.usage
-                print(f"💰 Token usage: {usage.total_tokens} total "
-                      f"({usage.prompt_tokens} prompt + {usage.completion_tokens} completion)")
+    if result.status == "completed":
+        print(f"\n\n✅ Streaming completed")
+        if result.run.usage:
+            usage = result.run.usage
+            print(f"💰 Token usage: {usage.total_tokens} total "
+                  f"({usage.prompt_tokens} prompt + {usage.completion_tokens} completion)")
+    else:
+        print(f"\n\n❌ Stream ended with status: {result.status}")
+        for error in result.errors:
+            print(f"  Error: {error}")
+    result.stats.print_summary()
+    if transcript_path:
+        print(f"📝 Transcript written to {transcript_path}")
     
     print("-" * 50)
-    return full_response
+    return thread_id, result.text
 
 def retrieve_thread_messages(client, thread_id):
     """Retrieve and display all messages in the thread."""
@@ -187,8 +251,22 @@ def demonstrate_run_steps(client, thread_id, run_id):
     except Exception as e:
         print(f"⚠️  Could not retrieve run steps: {e}")
 
+def parse_args(argv=None):
+    """Command-line options for the Responses API lab."""
+    parser = argparse.ArgumentParser(description="Threads → Runs → streaming lab")
+    parser.add_argument("--parallel-runs", type=int, default=0,
+                        help="Also start N runs at once and wait on them with one multiplexed poller")
+    parser.add_argument("--transcript", type=Path, default=None,
+                        help="Also write the streamed answer to this file as it arrives")
+    parser.add_argument("--token-budget", type=int, default=None,
+                        help="Max prompt tokens per run; older messages are truncated away (default: no limit)")
+    parser.add_argument("--compact", action="store_true",
+                        help="Over the budget, summarize older turns into a new thread instead of truncating them")
+    return parser.parse_args(argv)
+
 def main():
     """Main function to run the Responses API lab."""
+    args = parse_args()
     print("🚀 OpenAI Practice Lab - Responses API")
     print("=" * 50)
     
@@ -196,25 +274,40 @@ def main():
     client = get_client()
     assistant_id = load_assistant_id()
     print(f"✅ Using assistant: {assistant_id}")
+    # The model prices the predictions; the budget counts the thread locally from here on.
+    # Without --token-budget it is taken from the first run instead of an extra assistants.retrieve.
+    model = client.beta.assistants.retrieve(assistant_id).model if args.token_budget else None
+    budget = ThreadBudget(model=model, max_prompt_tokens=args.token_budget)
     
     # 1. Create thread with messages
-    thread = create_thread_with_messages(client)
+    thread = create_thread_with_messages(client, budget)
+    thread_id = thread.id
     
     # 2. Demonstrate polling run
-    run = demonstrate_polling_run(client, assistant_id, thread.id)
+    run = demonstrate_polling_run(client, assistant_id, thread_id, budget)
     
     # 3. Show run steps for debugging
-    demonstrate_run_steps(client, thread.id, run.id)
+    demonstrate_run_steps(client, thread_id, run.id)
     
-    # 4. Demonstrate streaming run
-    demonstrate_streaming_run(client, assistant_id, thread.id)
+    # 4. Demonstrate streaming run (on a compacted thread when the history outgrew the budget)
+    thread_id, _ = demonstrate_streaming_run(client, assistant_id, thread_id, transcript_path=args.transcript,
+                                             budget=budget, compact=args.compact)
     
     # 5. Show final conversation
-    retrieve_thread_messages(client, thread.id)
+    retrieve_thread_messages(client, thread_id)
+    
+    # 6. Optionally wait on many runs with one scheduler
+    if args.parallel_runs > 0:
+        demonstrate_multiplexed_runs(client, assistant_id, args.parallel_runs)
     
     # Save thread ID for potential cleanup
     thread_file = Path(".last_thread")
-    thread_file.write_text(thread.id)
+    thread_file.write_text(thread_id)
+    
+    print()
+    print(budget.summary())
+    print_poll_summary()
+    report_telemetry()
     
     print(f"\n🎯 Lab Complete!")
     print(f"   Thread ID saved to: {thread_file}")
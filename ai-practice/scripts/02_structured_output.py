@@ -4,50 +4,45 @@
 
 Demonstrates how the Study Q&A Assistant can provide structured JSON output.
 Compares:
-1. JSON Mode: Directly asking for JSON matching LectureSummary.
+1. JSON Mode: Directly asking for JSON matching LectureSummary. The answer is
+   streamed and validated field by field (labkit/json_stream.py); a schema
+   violation cancels the run and retries instead of waiting for the end.
 2. Function Tools (Strict): Using a function schema (derived from LectureSummary)
-   to get structured arguments from the assistant.
+   to get structured arguments from the assistant. The schema is compiled once
+   and cached (labkit/tool_schemas.py) and passed with the run.
 
-Usage: python scripts/02_structured_output.py
+Bulk mode: --batch <topics.txt> writes one request per topic (one topic per
+line) to a JSONL file, submits it to the Batch API, polls the job and streams
+the results into validated LectureSummary objects (--batch-output).
+
+Usage: python scripts/02_structured_output.py [--cache [--cache-ttl <hours>]] [--install-tools]
+       python scripts/02_structured_output.py --batch <topics.txt> [--batch-output <summaries.jsonl>]
+       python scripts/02_structured_output.py --batch-id <batch_id> [--batch-output <summaries.jsonl>]
 Docs: https://platform.openai.com/docs/guides/structured-output
 """
 
-import os
+from __future__ import annotations
+
 import sys
 import json
+import asyncio
+import argparse
+from contextlib import nullcontext
 from pathlib import Path
-from typing import List, Optional 
-from dotenv import load_dotenv
-from openai import OpenAI
-from pydantic import BaseModel, Field
-
-# Load environment variables
-load_dotenv()
-
-# Pydantic Model for Structured Output
-class LectureSummary(BaseModel):
-    """Structured explanation of a lecture topic."""
-    topic: str = Field(description="The name of the topic being explained")
-    explanation: str = Field(description="Simple and clear explanation of the topic")
-    examples: List[str] = Field(description="Practical examples related to the topic")
-    key_points: List[str] = Field(description="Main takeaways or important ideas")
-    difficulty: Optional[str] = Field(None, description="Difficulty level: Beginner, Intermediate, or Advanced") # Made optional explicit
-    resources: Optional[List[str]] = Field(None, description="Suggested resources to learn more") # Made optional explicit
-
-
-def get_client():
-    """Initialize OpenAI client with API key from environment."""
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        print("❌ Error: OPENAI_API_KEY not found in environment variables.")
-        sys.exit(1)
-    
-    org_id = os.getenv("OPENAI_ORG")
-    client_kwargs = {"api_key": api_key}
-    if org_id:
-        client_kwargs["organization"] = org_id
-    
-    return OpenAI(**client_kwargs)
+from typing import TYPE_CHECKING, Iterator, Optional
+from labkit.batch import batch_request, iter_batch_results, submit_batch, wait_for_batch, write_batch_file
+from labkit.client import get_async_client, get_client
+from labkit.json_stream import IncrementalJSONValidator, SchemaViolation, schema_validator, validate_text
+from labkit.polling import print_poll_summary
+from labkit.response_cache import ResponseCache, assistant_config, cache_key
+from labkit.streaming import stream_run
+from labkit.tool_schemas import DEFAULT_TOOLS, TOOL_SCHEMA_FILE, ensure_assistant_tools, get_registry
+from labkit.telemetry import report_telemetry
+from labkit.thread_pool import AsyncThreadPool, ThreadPool
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
 
 def load_assistant_id():
     """Load assistant ID from .assistant file."""
@@ -57,174 +52,221 @@ def load_assistant_id():
         sys.exit(1)
     return assistant_file.read_text().strip()
 
-def demonstrate_json_mode(client: OpenAI, assistant_id: str):
-    """Demonstrate basic JSON mode for LectureSummary."""
+JSON_MODE_INSTRUCTIONS = "You are a Study Q&A Assistant. Respond with valid JSON matching the requested LectureSummary structure. Populate all requested fields accurately."
+
+def lecture_summary_prompt(topic: str) -> str:
+    """JSON-mode prompt for one topic (shared by the interactive and batch paths)."""
+    return f"""Create a Lecture Summary for the topic: "{topic}".
+            Ensure the JSON object has the following fields: topic, explanation, examples (list), key_points (list), and optionally difficulty and resources (list)."""
+
+JSON_MODE_MAX_ATTEMPTS = 2
+
+async def stream_validated_summary(assistant_id: str, prompt: str, response_format: dict,
+                                   max_attempts: int = JSON_MODE_MAX_ATTEMPTS):
+    """
+    Stream JSON mode answers and validate each field as it completes.
+
+    A schema violation aborts the stream and cancels the run, then the request
+    is retried on a fresh thread. Returns (raw text, LectureSummary) or (text, None).
+    """
+    from labkit.schemas import LectureSummary
+
+    async_client = get_async_client()
+    pool = AsyncThreadPool(async_client, max_threads=1)
+    text = None
+    try:
+        for attempt in range(1, max_attempts + 1):
+            validator = IncrementalJSONValidator(LectureSummary)
+            async with pool.lease([{"role": "user", "content": prompt}]) as lease:
+                result = await stream_run(
+                    async_client,
+                    [schema_validator(validator)],
+                    thread_id=lease.thread_id,
+                    assistant_id=assistant_id,
+                    response_format=response_format,
+                    instructions=JSON_MODE_INSTRUCTIONS,
+                    **pool.run_options,
+                )
+                if result.status == "aborted":
+                    lease.discard()  # the cancelled run may still be winding down on this thread
+            text = result.text
+            if result.status == "aborted":
+                print(f"⚠️  Attempt {attempt}: {result.errors[0]} — aborted after {validator.chars} characters, run cancelled")
+                continue
+            if result.status != "completed":
+                print(f"❌ Run failed (JSON Mode). Status: {result.status}")
+                return text, None
+            try:
+                return text, validator.finish()
+            except SchemaViolation as e:
+                print(f"⚠️  Attempt {attempt}: {e}")
+        return text, None
+    finally:
+        await pool.close()
+        await async_client.close()
+
+def demonstrate_json_mode(client: OpenAI, assistant_id: str, cache: Optional[ResponseCache] = None):
+    """Demonstrate basic JSON mode for LectureSummary (served from the response cache when enabled)."""
+    from labkit.schemas import LectureSummary
+
     print("🔧 Demonstrating JSON Mode (for LectureSummary)")
     print("-" * 40)
     
     topic_for_summary = "Recursion in Programming" # Example topic
-    thread = client.beta.threads.create(
-        messages=[{
-            "role": "user",
-            "content": f"""Create a Lecture Summary for the topic: "{topic_for_summary}".
-            Ensure the JSON object has the following fields: topic, explanation, examples (list), key_points (list), and optionally difficulty and resources (list)."""
-        }]
-    )
+    prompt = lecture_summary_prompt(topic_for_summary)
+    response_format = {"type": "json_object"}
     
-    run = client.beta.threads.runs.create_and_poll(
-        thread_id=thread.id,
-        assistant_id=assistant_id,
-        response_format={"type": "json_object"},
-        instructions="You are a Study Q&A Assistant. Respond with valid JSON matching the requested LectureSummary structure. Populate all requested fields accurately."
-    )
+    key = None
+    cached = None
+    if cache is not None:
+        key = cache_key(assistant_config(client, assistant_id), prompt,
+                        instructions=JSON_MODE_INSTRUCTIONS, response_format=response_format)
+        cached = cache.get(key)
     
-    if run.status == "completed":
-        messages = client.beta.threads.messages.list(thread_id=thread.id)
-        response_content_str = messages.data[0].content[0].text.value
-        
-        print(f"📄 Raw JSON Response for '{topic_for_summary}':")
-        print(response_content_str)
-        
+    if cached:
+        print("♻️ Served from response cache")
+        response_content_str = cached["text"]
         try:
-            processed_content_str = response_content_str.strip()
-            if processed_content_str.startswith("```json"):
-                processed_content_str = processed_content_str[len("```json"):].strip()
-            elif processed_content_str.startswith("```"):
-                 processed_content_str = processed_content_str[len("```"):].strip()
-            if processed_content_str.endswith("```"):
-                processed_content_str = processed_content_str[:-len("```")].strip()
-            
-            print(f"DEBUG_JSON_MODE: Processed for parsing: '{processed_content_str}'")
-            json_data = json.loads(processed_content_str)
-            print("\n✅ Valid JSON parsed successfully")
-            print(f"📊 Fields found: {list(json_data.keys())}")
-            
-            try:
-                lecture_summary_obj = LectureSummary(**json_data)
-                print("✅ Pydantic validation successful (LectureSummary)!")
-                return lecture_summary_obj
-            except Exception as e:
-                print(f"⚠️  Pydantic validation failed for LectureSummary: {e}")
-                return json_data 
-            
-        except json.JSONDecodeError as e:
-            print(f"❌ Invalid JSON from assistant: {e}")
-            print(f"   Content that failed parsing: '{response_content_str}'")
-            return None
+            lecture_summary_obj = validate_text(LectureSummary, response_content_str)
+        except SchemaViolation as e:
+            print(f"⚠️  Cached answer no longer matches LectureSummary ({e}); ignoring it")
+            lecture_summary_obj = None
     else:
-        print(f"❌ Run failed (JSON Mode). Status: {run.status}")
+        response_content_str, lecture_summary_obj = asyncio.run(
+            stream_validated_summary(assistant_id, prompt, response_format))
+    
+    print(f"📄 Raw JSON Response for '{topic_for_summary}':")
+    print(response_content_str)
+    
+    if lecture_summary_obj is None:
+        print("❌ No valid LectureSummary from the assistant")
         return None
+    if key and not cached:
+        cache.put(key, {"text": response_content_str})
+    print("\n✅ Valid JSON parsed and validated field by field while streaming")
+    print(f"📊 Fields found: {[name for name in LectureSummary.model_fields if name in lecture_summary_obj.model_fields_set]}")
+    print("✅ Pydantic validation successful (LectureSummary)!")
+    return lecture_summary_obj
+
+LECTURE_TOOL_NAME = "summarize_lecture_topic"
+LECTURE_TOOL_DESCRIPTION = "Summarizes a lecture topic providing explanation, examples, key points, and optionally difficulty and resources."
+
+def demonstrate_function_tools_strict(client: OpenAI, assistant_id: str, install_on_assistant: bool = False,
+                                      pool: Optional[ThreadPool] = None):
+    """
+    Demonstrate function tools with strict schema for LectureSummary.
+
+    The strict schema comes from the tool schema registry (compiled once per
+    model version) and is passed with the run, so the shared assistant is not
+    modified; with install_on_assistant it is installed only if missing.
+    The run is a single create_and_run call on a thread owned by `pool`.
+    """
+    from labkit.schemas import LectureSummary
 
-def demonstrate_function_tools_strict(client: OpenAI, assistant_id: str):
-    """Demonstrate function tools with strict schema for LectureSummary."""
     print("\n🎯 Demonstrating Function Tools (Strict Schema for LectureSummary)")
     print("-" * 60)
     
-   
-    pydantic_params_schema = LectureSummary.model_json_schema()
- 
-    function_parameters = {
-        "type": "object",
-        "properties": pydantic_params_schema.get("properties", {}),
-        # 'required' list is derived from Pydantic model (non-Optional fields)
-        "required": pydantic_params_schema.get("required", []),
-        "additionalProperties": False
-    }
-
-
-    function_schema_definition = {
-        "name": "summarize_lecture_topic", # Consistent name
-        "description": "Summarizes a lecture topic providing explanation, examples, key points, and optionally difficulty and resources.",
-        "strict": True,
-        "parameters": function_parameters
-    }
-    
-    print(f"DEBUG: Function Schema (parameters part) being sent to OpenAI:\n{json.dumps(function_parameters, indent=2)}")
+    registry = get_registry()
+    compiled_before = registry.compiled
+    function_tool = registry.function_tool(LectureSummary, LECTURE_TOOL_NAME, LECTURE_TOOL_DESCRIPTION)
+    tools = DEFAULT_TOOLS + [function_tool]
+    print(f"DEBUG: Function Schema (parameters part) being sent to OpenAI:\n{json.dumps(function_tool['function']['parameters'], indent=2)}")
+    print(f"🗂️  Tool schema {'compiled and cached' if registry.compiled > compiled_before else 'reused from cache'} ({TOOL_SCHEMA_FILE.name})")
 
-    try:
-        print("🔧 Updating assistant with 'summarize_lecture_topic' tool...")
-        client.beta.assistants.update(
-            assistant_id=assistant_id,
-            tools=[
-                {"type": "file_search"},
-                {"type": "function", "function": function_schema_definition}
-            ]
-        )
-        print("✅ Assistant updated successfully.")
-    except Exception as e:
-        print(f"❌ Failed to update assistant with function tool: {e}")
-        return None # Cannot proceed if assistant update fails
+    run_tools = {"tools": tools}
+    if install_on_assistant:
+        try:
+            if ensure_assistant_tools(client, assistant_id, tools):
+                print(f"🔧 Installed '{LECTURE_TOOL_NAME}' on the assistant.")
+            else:
+                print(f"✅ Assistant already has '{LECTURE_TOOL_NAME}'; no update needed.")
+        except Exception as e:
+            print(f"❌ Failed to update assistant with function tool: {e}")
+            return None # Cannot proceed if assistant update fails
+        run_tools = {}
+    else:
+        print(f"🔧 Passing '{LECTURE_TOOL_NAME}' with the run (assistant left unchanged).")
     
     topic_for_function = "Dynamic Programming"
-    thread = client.beta.threads.create(
-        messages=[{
-            "role": "user",
-            # Corrected prompt to use the defined function name and provide a topic
-            "content": f"""Please summarize the topic '{topic_for_function}' using the summarize_lecture_topic function. 
-            Include its explanation, examples, key_points, and if possible, its difficulty and some learning resources."""
-        }]
-    )
-    
     print(f"🚀 Running assistant to get structured summary for '{topic_for_function}' via function call...")
-    run = client.beta.threads.runs.create_and_poll(
-        thread_id=thread.id,
-        assistant_id=assistant_id,
-        # Corrected instructions to use the defined function name
-        instructions="You are a Study Q&A Assistant. Use the summarize_lecture_topic function to provide a structured summary of the requested topic."
-    )
-    
-    if run.status == "completed":
+    with (nullcontext(pool) if pool else ThreadPool(client, recycle=False)) as pool:
+        thread_id, run = pool.run(
+            assistant_id,
+            # Corrected prompt to use the defined function name and provide a topic
+            f"""Please summarize the topic '{topic_for_function}' using the summarize_lecture_topic function. 
+            Include its explanation, examples, key_points, and if possible, its difficulty and some learning resources.""",
+            # Corrected instructions to use the defined function name
+            instructions="You are a Study Q&A Assistant. Use the summarize_lecture_topic function to provide a structured summary of the requested topic.",
+            **run_tools
+        )
+        return read_lecture_function_call(client, thread_id, run)
+
+def read_lecture_function_call(client: OpenAI, thread_id: str, run):
+    """Validate the summarize_lecture_topic call of a finished (or requires_action) run as a LectureSummary."""
+    from pydantic import ValidationError
+
+    from labkit.schemas import LectureSummary
+
+    if run.status == "requires_action":
+        # The function call is waiting for our output; its arguments are on the run itself.
+        print("🔍 Run requires action. Reading the function call from the run...")
+        tool_calls = run.required_action.submit_tool_outputs.tool_calls
+        try:
+            client.beta.threads.runs.cancel(run_id=run.id, thread_id=thread_id)  # we only want the arguments
+        except Exception as e:
+            print(f"⚠️  Could not cancel run {run.id}: {e}")
+    elif run.status == "completed":
         print("🔍 Run completed. Checking for function call in run steps...")
-        steps = client.beta.threads.runs.steps.list(thread_id=thread.id, run_id=run.id)
-        function_call_found = False
-        for step in steps.data:
-            if step.type == "tool_calls" and step.step_details and step.step_details.tool_calls:
-                for tool_call in step.step_details.tool_calls:
-                    # Check for the correct function name
-                    if tool_call.type == "function" and tool_call.function.name == "summarize_lecture_topic":
-                        function_call_found = True
-                        print(f"✅ Function '{tool_call.function.name}' was called by the assistant.")
-                        function_args_str = tool_call.function.arguments
-                        print(f"📋 Raw Function Call Arguments (JSON string):\n{function_args_str}")
-                        
-                        try:
-                            function_args_dict = json.loads(function_args_str)
-                            print("\n✅ Parsed function arguments successfully.")
-                            
-                            # Validate with LectureSummary Pydantic model
-                            try:
-                                lecture_summary_obj = LectureSummary(**function_args_dict)
-                                print("✅ Pydantic validation successful (LectureSummary for function args)!")
-                                # Corrected print statements
-                                print(f"📊 Topic: {lecture_summary_obj.topic}")
-                                print(f"📊 Explanation (snippet): {lecture_summary_obj.explanation[:100]}...")
-                                print(f"📊 Examples: {len(lecture_summary_obj.examples)} items")
-                                print(f"📊 Key Points: {len(lecture_summary_obj.key_points)} items")
-                                if lecture_summary_obj.difficulty:
-                                    print(f"📊 Difficulty: {lecture_summary_obj.difficulty}")
-                                return lecture_summary_obj
-                            except Exception as e_pydantic:
-                                print(f"❌ Pydantic validation failed for LectureSummary (function args): {e_pydantic}")
-                                return function_args_dict # Return raw dict if Pydantic fails
-                        except json.JSONDecodeError as e_json:
-                            print(f"❌ Failed to parse function arguments JSON: {e_json}")
-                            print(f"   Raw arguments string: {function_args_str}")
-                            return None # Cannot proceed if args are not JSON
-        
-        if not function_call_found:
-            print("⚠️  No call to 'summarize_lecture_topic' function found in run steps.")
-            messages = client.beta.threads.messages.list(thread_id=thread.id)
-            if messages.data and messages.data[0].content and messages.data[0].content[0].type == "text":
-                 print(f"   Assistant's last message: {messages.data[0].content[0].text.value[:200]}...")
-            return None
+        steps = client.beta.threads.runs.steps.list(thread_id=thread_id, run_id=run.id)
+        tool_calls = [tool_call for step in steps.data
+                      if step.type == "tool_calls" and step.step_details and step.step_details.tool_calls
+                      for tool_call in step.step_details.tool_calls]
     else:
         print(f"❌ Run failed (Function Tools). Status: {run.status}")
         if run.last_error:
             print(f"   Error: {run.last_error.message}")
         return None
+    
+    for tool_call in tool_calls:
+        # Check for the correct function name
+        if tool_call.type == "function" and tool_call.function.name == LECTURE_TOOL_NAME:
+            print(f"✅ Function '{tool_call.function.name}' was called by the assistant.")
+            function_args_str = tool_call.function.arguments
+            print(f"📋 Raw Function Call Arguments (JSON string):\n{function_args_str}")
+            
+            # Validate with LectureSummary Pydantic model
+            try:
+                lecture_summary_obj = LectureSummary.model_validate_json(function_args_str)
+            except ValidationError as e_pydantic:
+                try:
+                    function_args_dict = json.loads(function_args_str)
+                except json.JSONDecodeError as e_json:
+                    print(f"❌ Failed to parse function arguments JSON: {e_json}")
+                    print(f"   Raw arguments string: {function_args_str}")
+                    return None # Cannot proceed if args are not JSON
+                print(f"❌ Pydantic validation failed for LectureSummary (function args): {e_pydantic}")
+                return function_args_dict # Return raw dict if Pydantic fails
+            print("\n✅ Parsed function arguments successfully.")
+            print("✅ Pydantic validation successful (LectureSummary for function args)!")
+            # Corrected print statements
+            print(f"📊 Topic: {lecture_summary_obj.topic}")
+            print(f"📊 Explanation (snippet): {lecture_summary_obj.explanation[:100]}...")
+            print(f"📊 Examples: {len(lecture_summary_obj.examples)} items")
+            print(f"📊 Key Points: {len(lecture_summary_obj.key_points)} items")
+            if lecture_summary_obj.difficulty:
+                print(f"📊 Difficulty: {lecture_summary_obj.difficulty}")
+            return lecture_summary_obj
+    
+    print(f"⚠️  No call to '{LECTURE_TOOL_NAME}' function found in run steps.")
+    messages = client.beta.threads.messages.list(thread_id=thread_id)
+    if messages.data and messages.data[0].content and messages.data[0].content[0].type == "text":
+         print(f"   Assistant's last message: {messages.data[0].content[0].text.value[:200]}...")
+    return None
 
 def compare_approaches(json_result, function_result):
     """Compare the results from both approaches for LectureSummary."""
+    from labkit.schemas import LectureSummary
+
     print("\n📊 Comparison of Approaches for LectureSummary Output")
     print("=" * 60) 
     
@@ -260,22 +302,106 @@ def compare_approaches(json_result, function_result):
     print("\n💡 Key Takeaways for Structured Lecture Summaries:")
     print("  • JSON Mode: Can work if the prompt is very specific about fields, but less reliable for schema adherence.")
     print("  • Function Tools (Strict): More robust for ensuring the output (function arguments) matches a predefined Pydantic schema like LectureSummary.")
-    print("  • Using Pydantic's `model_json_schema()` for function parameters is a good practice.")
+    print("  • Using Pydantic's `model_json_schema()` for function parameters is a good practice; compile it once and pass the tool per run.")
 
 def reset_assistant_tools(client: OpenAI, assistant_id: str):
-    """Reset assistant tools to its original state (likely just file_search)."""
-    print("\n🔄 Resetting assistant tools to default ('file_search')...")
+    """Make sure the assistant is back to its default tools (only updates it if something changed them)."""
+    print("\n🔄 Checking assistant tools (default: 'file_search')...")
     try:
-        client.beta.assistants.update(
-            assistant_id=assistant_id,
-            tools=[{"type": "file_search"}] # Assuming this is the default for Study Q&A Assistant
-        )
-        print("✅ Assistant tools reset successfully.")
+        if ensure_assistant_tools(client, assistant_id, DEFAULT_TOOLS):
+            print("✅ Assistant tools reset successfully.")
+        else:
+            print("✅ Assistant tools unchanged; no update needed.")
     except Exception as e:
         print(f"⚠️ Error resetting assistant tools: {e}")
 
+def read_topics(path: Path) -> Iterator[str]:
+    """Topics from a text file, one per line; blank lines and # comments are skipped."""
+    with open(path) as f:
+        for line in f:
+            topic = line.strip()
+            if topic and not topic.startswith("#"):
+                yield topic
+
+def build_summary_batch(path: Path, topics_path: Path, model: str) -> int:
+    """Write one JSON-mode chat completion request per topic; returns the number of requests."""
+    requests = (
+        batch_request(f"topic-{i}", {
+            "model": model,
+            "response_format": {"type": "json_object"},
+            "messages": [
+                {"role": "system", "content": JSON_MODE_INSTRUCTIONS},
+                {"role": "user", "content": lecture_summary_prompt(topic)},
+            ],
+        })
+        for i, topic in enumerate(read_topics(topics_path), 1)
+    )
+    return write_batch_file(path, requests)
+
+def print_batch_progress(batch):
+    counts = batch.request_counts
+    done = f"{counts.completed + counts.failed}/{counts.total}" if counts else "?"
+    print(f"  ⏳ Batch {batch.id}: {batch.status} ({done} requests)")
+
+def run_batch_summaries(client: OpenAI, assistant_id: str, args):
+    """Bulk mode: build/submit a LectureSummary batch (or resume --batch-id) and stream the validated results."""
+    from labkit.schemas import LectureSummary
+
+    print("📦 Generating Lecture Summaries with the Batch API")
+    print("-" * 40)
+    batch_id = args.batch_id
+    if not batch_id:
+        # The Batch API runs chat completions, so use the assistant's model and the JSON mode instructions.
+        model = client.beta.assistants.retrieve(assistant_id).model
+        requests_path = args.batch_output.with_suffix(".requests.jsonl")
+        count = build_summary_batch(requests_path, args.batch, model)
+        if not count:
+            print(f"❌ No topics found in {args.batch}")
+            return
+        batch = submit_batch(client, requests_path, metadata={"lab": "02_structured_output"})
+        batch_id = batch.id
+        print(f"✅ Submitted {count} requests ({model}) as batch {batch_id}; input: {requests_path}")
+        print(f"   Resume later with: python scripts/02_structured_output.py --batch-id {batch_id}")
+    
+    batch = wait_for_batch(client, batch_id, on_update=print_batch_progress)
+    if batch.status != "completed":
+        print(f"❌ Batch {batch_id} ended with status '{batch.status}'")
+        for error in (batch.errors.data if batch.errors else []) or []:
+            print(f"   {error.code}: {error.message}")
+        return
+    
+    valid = invalid = 0
+    with open(args.batch_output, "w") as out:
+        for item in iter_batch_results(client, batch, LectureSummary):
+            if item.value is not None:
+                out.write(json.dumps({"custom_id": item.custom_id, **item.value.model_dump()}) + "\n")
+                valid += 1
+            else:
+                print(f"  ⚠️  {item.custom_id}: {item.error}")
+                invalid += 1
+    print(f"\n✅ {valid} valid LectureSummary objects written to {args.batch_output}"
+          + (f"; {invalid} failed" if invalid else ""))
+    print_poll_summary()
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Structured Output Lab (LectureSummary)")
+    parser.add_argument("--cache", action="store_true",
+                        help="Serve the JSON mode summary from the local response cache (.response_cache.sqlite)")
+    parser.add_argument("--cache-ttl", type=float, default=168,
+                        help="Response cache TTL in hours")
+    parser.add_argument("--install-tools", action="store_true",
+                        help="Install the function tool on the assistant (skipped if already there) instead of passing it per run")
+    parser.add_argument("--batch", type=Path, default=None, metavar="TOPICS",
+                        help="Bulk mode: summarize every topic in this file (one per line) through the Batch API")
+    parser.add_argument("--batch-id", default=None,
+                        help="Bulk mode: wait for and collect an already submitted batch")
+    parser.add_argument("--batch-output", type=Path, default=Path("lecture_summaries.jsonl"),
+                        help="Validated LectureSummary objects, one JSON per line")
+    return parser.parse_args()
+
 def main():
     """Main function to run the structured output lab for LectureSummary."""
+    args = parse_args()
     print("🚀 OpenAI Practice Lab - Structured Output (LectureSummary Focus)")
     print("=" * 60) # Adjusted separator length
     
@@ -283,18 +409,29 @@ def main():
     assistant_id = load_assistant_id()
     print(f"✅ Using assistant: {assistant_id}")
     
+    if args.batch or args.batch_id:
+        run_batch_summaries(client, assistant_id, args)
+        report_telemetry()
+        return
+    
     json_mode_output = None
     function_tool_output = None
+    cache = ResponseCache(ttl_seconds=args.cache_ttl * 3600) if args.cache else None
+    thread_pool = ThreadPool(client, recycle=False)  # one-shot runs; their threads are deleted on exit
 
     try:
         # 1. Demonstrate JSON mode for LectureSummary
-        json_mode_output = demonstrate_json_mode(client, assistant_id)
+        json_mode_output = demonstrate_json_mode(client, assistant_id, cache=cache)
         
         # 2. Demonstrate function tools with strict schema for LectureSummary
-        function_tool_output = demonstrate_function_tools_strict(client, assistant_id)
+        function_tool_output = demonstrate_function_tools_strict(client, assistant_id, install_on_assistant=args.install_tools,
+                                                                  pool=thread_pool)
         
         # 3. Compare approaches
         compare_approaches(json_mode_output, function_tool_output)
+        if cache:
+            cache.print_stats()
+        report_telemetry()
         
         print(f"\n🎯 Lab Complete!")
         print(f"   Next suggestion: python scripts/03_rag_file_search.py (if you adapt it for lecture files)")
@@ -305,8 +442,9 @@ def main():
         import traceback
         traceback.print_exc() 
     finally:
-
-        reset_assistant_tools(client, assistant_id)
+        thread_pool.close()
+        if args.install_tools:  # by default the tools are passed per run and the assistant is never changed
+            reset_assistant_tools(client, assistant_id)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
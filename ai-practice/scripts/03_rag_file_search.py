@@ -6,33 +6,44 @@ Demonstrates end-to-end RAG using the Study Q&A Assistant's
 built-in file_search tool with an uploaded PDF about Algorithms and KMP.
 OpenAI hosts the vector store.
 
-Usage: python scripts/03_rag_file_search.py
+Usage: python scripts/03_rag_file_search.py [--concurrency <n>] [--query-timeout <seconds>] [--fresh-threads] [--fast]
+       [--cache [--cache-ttl <hours>]]
+       [--eval <questions.jsonl|.csv> [--eval-output <results.jsonl>] [--keep-threads]]
+       [--retrieval hosted|local [--top-k <k>] [--dense] [--offline] [--rebuild-index | --no-index]]
+       [--no-upload-cache] [--bulk | --sync [--store-name <name>] [--prune-files]]
+       [--workers <n>] [--batch-size <n>]
 """
 
-import os
+from __future__ import annotations
+
+import re
 import sys
 import json 
+import argparse
 import time 
-from typing import List, Optional
+from typing import TYPE_CHECKING, Callable, List, Optional
 from pathlib import Path
-from dotenv import load_dotenv
-from openai import OpenAI
+from labkit.client import get_client
+from labkit.polling import AdaptivePoller, PollTimeout, print_poll_summary
+from labkit.citations import CitationCoverage, FileNameResolver
+from labkit.evaluation import run_evaluation
+from labkit.index_store import LOCAL_INDEX_DIR, load_or_build_index
+from labkit.ingest import discover_documents, ingest_directory
+from labkit.local_retriever import LocalRetriever, format_context
+from labkit.rag import report_completed_query, run_queries_concurrently, run_usage
+from labkit.response_cache import ResponseCache, assistant_config, cache_key, vector_store_version
+from labkit.telemetry import report_telemetry
+from labkit.thread_pool import SETTLED_RUN_STATUSES, ThreadPool
+from labkit.upload_cache import UploadManifest, UploadedDocument, sha256_file
+from labkit.vs_sync import list_vector_store_file_ids, sync_vector_store
+
+if TYPE_CHECKING:
+    from openai import OpenAI
 
-# Load environment variables
-load_dotenv()
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent 
 DATA_DIR = PROJECT_ROOT / "data" # Your data directory with the KMP PDF
 
-def get_client():
-    """Initialize OpenAI client."""
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        print("❌ Error: OPENAI_API_KEY not found.")
-        sys.exit(1)
-    org_id = os.getenv("OPENAI_ORG")
-    return OpenAI(api_key=api_key, organization=org_id if org_id else None)
-
 def load_assistant_id():
     """Load assistant ID for the 'Study Q&A Assistant'."""
     assistant_file = PROJECT_ROOT / ".assistant" 
@@ -43,29 +54,42 @@ def load_assistant_id():
 
 def get_document_paths_from_data_dir():
     """
-    Finds PDF documents in your DATA_DIR for the RAG demonstration.
+    Finds documents in your DATA_DIR (recursively, every format file_search
+    accepts) for the RAG demonstration.
     """
-    print(f"🔍 Looking for PDF files in: {DATA_DIR}")
+    print(f"🔍 Looking for documents in: {DATA_DIR}")
     if not DATA_DIR.is_dir():
         print(f"❌ Error: Data directory '{DATA_DIR}' not found.")
         sys.exit(1)
 
-    pdf_files = list(DATA_DIR.glob("*.pdf")) 
+    document_paths = list(discover_documents(DATA_DIR))
 
-    if not pdf_files:
-        print(f"❌ No PDF files found in {DATA_DIR}. Please add your KMP algorithm PDF (or other lectures).")
+    if not document_paths:
+        print(f"❌ No supported documents found in {DATA_DIR}. Please add your KMP algorithm PDF (or other lectures).")
         sys.exit(1)
     
-    print(f"📄 Found {len(pdf_files)} PDF document(s) to use:")
-    for pdf_path in pdf_files:
-        print(f"  - {pdf_path.name}")
-    return pdf_files
+    print(f"📄 Found {len(document_paths)} document(s) to use:")
+    for document_path in document_paths:
+        print(f"  - {document_path.relative_to(DATA_DIR)}")
+    return document_paths
+
+def upload_documents(client: OpenAI, file_paths: List[Path], manifest: Optional[UploadManifest] = None):
+    """
+    Uploads your local documents to OpenAI for RAG.
 
-def upload_documents(client: OpenAI, file_paths: List[Path]):
-    """Uploads your local documents to OpenAI for RAG."""
+    With a manifest, documents whose SHA-256 is already known are not
+    re-uploaded; their recorded OpenAI file ID is reused instead.
+    """
     print("\n📤 Uploading your documents to OpenAI...")
     uploaded_openai_files = []
     for local_file_path in file_paths:
+        sha256 = sha256_file(local_file_path)
+        cached_entry = manifest.get(sha256) if manifest else None
+        if cached_entry:
+            uploaded_openai_files.append(UploadedDocument(cached_entry["file_id"], local_file_path, sha256, cached=True))
+            print(f"  ⏭️  Unchanged '{local_file_path.name}' -> cached OpenAI File ID: {cached_entry['file_id']}")
+            continue
+        
         print(f"  Uploading: {local_file_path.name}")
         try:
             with open(local_file_path, "rb") as file_data:
@@ -73,7 +97,10 @@ def upload_documents(client: OpenAI, file_paths: List[Path]):
                     file=file_data,
                     purpose="assistants" 
                 )
-            uploaded_openai_files.append(uploaded_file)
+            uploaded_openai_files.append(UploadedDocument(uploaded_file.id, local_file_path, sha256))
+            if manifest:
+                manifest.record_upload(sha256, local_file_path, uploaded_file.id)
+                manifest.save()
             print(f"  ✅ Uploaded '{local_file_path.name}' -> OpenAI File ID: {uploaded_file.id}")
         except Exception as e:
             print(f"  ❌ Error uploading {local_file_path.name}: {e}")
@@ -83,6 +110,42 @@ def upload_documents(client: OpenAI, file_paths: List[Path]):
         sys.exit(1)
     return uploaded_openai_files
 
+def reuse_cached_vector_store(client: OpenAI, uploaded_openai_files: List[UploadedDocument], manifest: UploadManifest):
+    """Returns the cached vector store if it still holds exactly these documents, else None."""
+    vector_store_id = manifest.shared_vector_store([doc.sha256 for doc in uploaded_openai_files])
+    if not vector_store_id:
+        return None
+    try:
+        vector_store = client.vector_stores.retrieve(vector_store_id=vector_store_id)
+        if vector_store.status != "expired" and vector_store.file_counts.completed == len(uploaded_openai_files):
+            print(f"\n♻️  Reusing cached Vector Store '{vector_store.name}' ({vector_store.id}) — nothing to re-embed.")
+            return vector_store
+        print(f"\nℹ️ Cached Vector Store {vector_store_id} is {vector_store.status}; creating a new one.")
+    except Exception as e:
+        print(f"\nℹ️ Cached Vector Store {vector_store_id} is no longer available ({e}); creating a new one.")
+    manifest.forget_vector_store(vector_store_id)
+    manifest.save()
+    return None
+
+def refresh_stale_uploads(client: OpenAI, uploaded_openai_files: List[UploadedDocument], manifest: UploadManifest):
+    """Re-uploads cached documents whose OpenAI file was deleted since it was recorded."""
+    stale_ids = []
+    for doc in uploaded_openai_files:
+        if not doc.cached:
+            continue
+        try:
+            client.files.retrieve(doc.id)
+        except Exception:
+            stale_ids.append(doc.id)
+    if not stale_ids:
+        return uploaded_openai_files
+    
+    print(f"  ℹ️ {len(stale_ids)} cached file(s) no longer exist on OpenAI; re-uploading.")
+    manifest.forget_file_ids(stale_ids)
+    stale_paths = [doc.path for doc in uploaded_openai_files if doc.id in stale_ids]
+    refreshed = upload_documents(client, stale_paths, manifest)
+    return [doc for doc in uploaded_openai_files if doc.id not in stale_ids] + refreshed
+
 def create_vector_store_with_files(client: OpenAI, uploaded_openai_files: List, vector_store_name_prefix: str = "KMP_Algorithm_VS"):
     """Creates a new vector store and adds the uploaded files to it."""
     # Add a timestamp to the vector store name for uniqueness
@@ -102,15 +165,24 @@ def create_vector_store_with_files(client: OpenAI, uploaded_openai_files: List,
         print(f"✅ Vector Store '{vector_store.name}' created with ID: {vector_store.id}")
         print(f"⏳ Waiting for files to be processed in the vector store...")
 
-        while True:
-            retrieved_vector_store = client.vector_stores.retrieve(vector_store_id=vector_store.id) # Corrected: removed .beta
-            if retrieved_vector_store.file_counts.in_progress == 0:
-                print(f"✅ All {retrieved_vector_store.file_counts.completed} files processed in Vector Store.")
-                if retrieved_vector_store.file_counts.failed > 0:
-                    print(f"⚠️  {retrieved_vector_store.file_counts.failed} files failed to process.")
-                break
-            print(f"  ... {retrieved_vector_store.file_counts.in_progress} files processing. Status: {retrieved_vector_store.status}")
-            time.sleep(5)
+        def report_progress(vs):
+            if vs.file_counts.in_progress > 0:
+                print(f"  ... {vs.file_counts.in_progress} files processing. Status: {vs.status}")
+
+        poller = AdaptivePoller("vector_stores.retrieve", baseline_interval=5.0, max_interval=15.0, deadline=1800.0)
+        try:
+            retrieved_vector_store = poller.poll(
+                lambda: client.vector_stores.retrieve(vector_store_id=vector_store.id), # Corrected: removed .beta
+                is_done=lambda vs: vs.file_counts.in_progress == 0,
+                on_update=report_progress
+            )
+        except PollTimeout as e:
+            retrieved_vector_store = e.last_result or client.vector_stores.retrieve(vector_store_id=vector_store.id)
+            print(f"⌛ {e}; {retrieved_vector_store.file_counts.in_progress} file(s) still processing. "
+                  f"Continuing: queries only see the files processed so far.")
+        print(f"✅ All {retrieved_vector_store.file_counts.completed} files processed in Vector Store.")
+        if retrieved_vector_store.file_counts.failed > 0:
+            print(f"⚠️  {retrieved_vector_store.file_counts.failed} files failed to process.")
         return vector_store # Return the original vector_store object which now has updated status
     except Exception as e:
         print(f"❌ Error creating or processing vector store: {e}")
@@ -136,112 +208,211 @@ def attach_vector_store_to_assistant(client: OpenAI, assistant_id: str, vector_s
         print(f"❌ Error attaching vector store to assistant: {e}")
         sys.exit(1)
 
-def demonstrate_rag_queries(client: OpenAI, assistant_id: str):
+RAG_QUERIES = [
+    "According to the document, what is an algorithm?",
+    "What are the three characteristics of a good algorithm mentioned in the text?",
+    "Explain the Knuth-Morris-Pratt (KMP) Algorithm in your own words, based on the document.",
+    "What problem does the KMP algorithm solve, as stated in the material?",
+    "How does the KMP algorithm work? Describe the two main phases mentioned.",
+    "What is the time complexity for the preprocessing (LPS table) phase of KMP?",
+    "What is the time complexity for the search phase of KMP?",
+    "What is the overall time complexity of the KMP algorithm according to the document?"
+]
+
+RAG_INSTRUCTIONS = "You are the Study Q&A Assistant. Answer questions strictly based on the KMP algorithm document provided. Use your file_search tool and provide citations."
+
+def build_rag_prompt(user_query: str) -> str:
+    """Wraps a question with the grounding request sent to the assistant."""
+    return f"{user_query}\n\nPlease answer based *only* on the information found in the uploaded KMP algorithm document. Cite specific information if possible."
+
+def print_cached_query(cached: dict) -> dict:
+    """Replays a cached query report and returns its result marked as cached."""
+    print("♻️ Served from response cache")
+    for line in cached["lines"]:
+        print(line)
+    return dict(cached["result"], cached=True)
+
+def demonstrate_rag_queries(client: OpenAI, assistant_id: str, concurrency: int = 1, query_timeout: Optional[float] = None,
+                            cache: Optional[ResponseCache] = None, cache_key_for: Optional[Callable[[str], str]] = None,
+                            recycle_threads: bool = True, fast: bool = False):
     """
     Asks questions relevant to the KMP Algorithm PDF content.
+
+    With concurrency > 1 the queries run on the async engine in labkit.rag,
+    at most `concurrency` at a time; reports are printed in query order.
+    With a response cache, previously answered queries are replayed locally
+    and only misses reach the API. Queries run on threads from a thread pool
+    (recycled unless recycle_threads=False), deleted together at the end.
+    With fast=True every query is one streamed create_and_run request whose
+    events carry the answer, citations and tool calls (also when serial).
     """
     print("\n🔍 Demonstrating RAG Queries (using KMP Algorithm PDF)")
     print("=" * 60)
     
-    queries = [
-        "According to the document, what is an algorithm?",
-        "What are the three characteristics of a good algorithm mentioned in the text?",
-        "Explain the Knuth-Morris-Pratt (KMP) Algorithm in your own words, based on the document.",
-        "What problem does the KMP algorithm solve, as stated in the material?",
-        "How does the KMP algorithm work? Describe the two main phases mentioned.",
-        "What is the time complexity for the preprocessing (LPS table) phase of KMP?",
-        "What is the time complexity for the search phase of KMP?",
-        "What is the overall time complexity of the KMP algorithm according to the document?"
-    ]
+    queries = RAG_QUERIES
+    cached = {}
+    if cache is not None:
+        for user_query in queries:
+            hit = cache.get(cache_key_for(user_query))
+            if hit:
+                cached[user_query] = hit
+    
+    def remember(user_query: str, result: dict, report_lines: List[str]):
+        if cache is not None and "response_length" in result:
+            cache.put(cache_key_for(user_query), {"result": result, "lines": report_lines})
+    
+    if concurrency > 1 or fast:
+        pending = [q for q in queries if q not in cached]
+        print(f"⚡ Running {len(pending)} queries with concurrency={concurrency}"
+              + (f", timeout={query_timeout:.0f}s per query" if query_timeout else "")
+              + (", one streamed create_and_run each" if fast else "")
+              + (f" ({len(cached)} served from cache)" if cached else ""))
+        start_time = time.time()
+        outcomes = dict(zip(pending, run_queries_concurrently(assistant_id, pending, build_rag_prompt, RAG_INSTRUCTIONS,
+                                                              concurrency=concurrency, query_timeout=query_timeout,
+                                                              recycle_threads=recycle_threads, fast=fast)))
+        query_results = []
+        for i, user_query in enumerate(queries, 1):
+            print(f"\n📝 Query {i}: {user_query}")
+            print("-" * 50)
+            if user_query in cached:
+                query_results.append(print_cached_query(cached[user_query]))
+                continue
+            result, report_lines = outcomes[user_query]
+            for line in report_lines:
+                print(line)
+            remember(user_query, result, report_lines)
+            query_results.append(result)
+        print(f"\n⏱️ {len(queries)} queries finished in {time.time() - start_time:.2f} seconds")
+        return query_results
     
     query_results = []
+    with ThreadPool(client, max_threads=1, recycle=recycle_threads) as pool:
+        for i, user_query in enumerate(queries, 1):
+            print(f"\n📝 Query {i}: {user_query}")
+            print("-" * 50)
+            if user_query in cached:
+                query_results.append(print_cached_query(cached[user_query]))
+                continue
+            query_results.append(run_rag_query(client, pool, assistant_id, user_query, remember))
+    pool.print_stats()
+    return query_results
+
+def run_rag_query(client: OpenAI, pool: ThreadPool, assistant_id: str, user_query: str,
+                  remember: Callable[[str, dict, List[str]], None]) -> dict:
+    """One serial RAG query on a thread leased from `pool`."""
+    report_lines = []
+    def emit(line: str):
+        print(line)
+        report_lines.append(line)
     
-    for i, user_query in enumerate(queries, 1):
-        print(f"\n📝 Query {i}: {user_query}")
-        print("-" * 50)
-        
-        thread = client.beta.threads.create(
-            messages=[{
-                "role": "user",
-                "content": f"{user_query}\n\nPlease answer based *only* on the information found in the uploaded KMP algorithm document. Cite specific information if possible."
-            }]
-        )
-        
-        print(f"🧵 Thread created: {thread.id}. Running assistant...")
-        try:
+    thread_id = "N/A"
+    try:
+        with pool.lease([{"role": "user", "content": build_rag_prompt(user_query)}]) as lease:
+            thread_id = lease.thread_id
+            emit(f"🧵 Thread leased: {thread_id}. Running assistant...")
             run = client.beta.threads.runs.create_and_poll(
-                thread_id=thread.id,
+                thread_id=thread_id,
                 assistant_id=assistant_id,
-                instructions="You are the Study Q&A Assistant. Answer questions strictly based on the KMP algorithm document provided. Use your file_search tool and provide citations."
+                instructions=RAG_INSTRUCTIONS,
+                **pool.run_options
             )
+            if run.status not in SETTLED_RUN_STATUSES:
+                lease.discard()
             
             if run.status == "completed":
-                messages = client.beta.threads.messages.list(thread_id=thread.id, order="asc", limit=20)
+                messages = client.beta.threads.messages.list(thread_id=thread_id, run_id=run.id, order="asc", limit=20)
                 assistant_response_message = next((msg for msg in reversed(messages.data) if msg.role == "assistant"), None)
                 
                 if assistant_response_message and assistant_response_message.content:
-                    # === START OF CORRECTED CITATION HANDLING ===
-                    full_response_text = ""
-                    citation_details_list = [] # To store details of each citation
-
-                    for content_block_idx, content_block in enumerate(assistant_response_message.content):
-                        if content_block.type == "text":
-                            # Append the raw text from this block to the full response
-                            full_response_text += content_block.text.value
-                            
-                            annotations = content_block.text.annotations
-                            if annotations:
-                                for ann_idx, annotation in enumerate(annotations):
-                                    # The text in the assistant's response that is being cited
-                                    text_segment_cited_by_assistant = annotation.text
-                                    file_id_of_source = None
-                                    
-                                    if hasattr(annotation, 'file_citation') and annotation.file_citation:
-                                        file_id_of_source = annotation.file_citation.file_id
-                                    elif hasattr(annotation, 'file_path') and annotation.file_path: # Older style
-                                        file_id_of_source = annotation.file_path.file_id
-                                    
-                                    if file_id_of_source:
-                                        citation_details_list.append(
-                                            f"  - Assistant's text \"{text_segment_cited_by_assistant[:70]}...\" is linked to Source File ID: {file_id_of_source}"
-                                        )
-                    
-                    print("🤖 Assistant Response:")
-                    print(full_response_text if full_response_text else "[No text content in assistant's message]") # Print the full combined response
-                    
-                    if citation_details_list:
-                        print("\n📚 Citation Details (Linking assistant's text to source files):")
-                        for detail in citation_details_list:
-                            print(detail)
-                    else:
-                        print("ℹ️ No direct file citations found in this response's annotations.")
-                    # === END OF CORRECTED CITATION HANDLING ===
-
-                    run_steps = client.beta.threads.runs.steps.list(thread_id=thread.id, run_id=run.id)
-                    file_search_tool_used = any(
-                        tc.type == "file_search" for step in run_steps.data if step.type == "tool_calls" and step.step_details for tc in step.step_details.tool_calls
-                    )
-                    print("🔍 file_search tool was used by the assistant." if file_search_tool_used else "⚠️ file_search tool was NOT explicitly used by the assistant for this query.")
-                    
-                    query_results.append({
-                        "query": user_query,
-                        "response_length": len(full_response_text),
-                        "file_search_used": file_search_tool_used,
-                        "citations_count": len(citation_details_list), # Use count of detailed citations
-                        "thread_id": thread.id
-                    })
-                else: 
-                    print("❌ Assistant provided no content in its message.")
-                    query_results.append({"query": user_query, "status": "NoContent", "thread_id": thread.id})
-            else:
+                    run_steps = client.beta.threads.runs.steps.list(thread_id=thread_id, run_id=run.id)
+                    result = report_completed_query(user_query, thread_id, assistant_response_message, run_steps, emit)
+                    result.update(run_usage(run))
+                    remember(user_query, result, report_lines)
+                    return result
+                print("❌ Assistant provided no content in its message.")
+                return {"query": user_query, "status": "NoContent", "thread_id": thread_id}
+            print(f"❌ Query run not completed. Status: {run.status}")
+            if run.last_error: print(f"  Error: {run.last_error.message}")
+            return {"query": user_query, "status": run.status, "thread_id": thread_id}
+    except Exception as e:
+        print(f"❌ Error during RAG query for '{user_query}': {e}")
+        import traceback
+        traceback.print_exc() # Print full traceback for detailed error
+        return {"query": user_query, "status": "Exception", "error": str(e), "thread_id": thread_id}
+
+LOCAL_RAG_INSTRUCTIONS = "You are the Study Q&A Assistant. Answer strictly from the numbered context passages in the user's message and cite them as [n]."
+
+def build_local_rag_prompt(user_query: str, context: str) -> str:
+    """Puts locally retrieved passages in front of the question."""
+    return f"Context passages:\n\n{context}\n\nQuestion: {user_query}\n\nAnswer using only the context above and cite passages as [n]."
+
+def demonstrate_local_rag_queries(client: Optional[OpenAI], assistant_id: Optional[str], retriever,
+                                  top_k: int = 5, offline: bool = False, recycle_threads: bool = True):
+    """
+    Answers the RAG queries from the local index instead of hosted file_search.
+
+    Only the final top-k context is sent to the model (file_search disabled for
+    the run); with offline=True no API call is made at all.
+    """
+    print(f"\n🔍 Demonstrating RAG Queries (local retrieval over {len(retriever.chunks)} chunks, top-{top_k})")
+    print("=" * 60)
+    
+    query_results = []
+    pool = None if offline else ThreadPool(client, max_threads=1, recycle=recycle_threads)
+    for i, user_query in enumerate(RAG_QUERIES, 1):
+        print(f"\n📝 Query {i}: {user_query}")
+        print("-" * 50)
+        
+        start_time = time.perf_counter()
+        results = retriever.search(user_query, k=top_k)
+        retrieval_ms = (time.perf_counter() - start_time) * 1000
+        sources = [f"{chunk.source} p.{chunk.page}" for _, chunk in results]
+        print(f"⚡ Retrieved {len(results)} chunk(s) in {retrieval_ms:.2f} ms:")
+        for score, chunk in results:
+            print(f"  - {score:.3f}  {chunk.source} p.{chunk.page}: {chunk.text[:70]}...")
+        
+        if offline:
+            query_results.append({
+                "query": user_query, "status": "Offline", "retrieval_ms": retrieval_ms,
+                "top_score": results[0][0] if results else 0.0, "sources": sources
+            })
+            continue
+        
+        try:
+            thread_id, run = pool.run(
+                assistant_id,
+                build_local_rag_prompt(user_query, format_context(results)),
+                instructions=LOCAL_RAG_INSTRUCTIONS,
+                tools=[]  # context is already in the prompt; skip hosted file_search
+            )
+            if run.status != "completed":
                 print(f"❌ Query run not completed. Status: {run.status}")
-                if run.last_error: print(f"  Error: {run.last_error.message}")
-                query_results.append({"query": user_query, "status": run.status, "thread_id": thread.id})
+                query_results.append({"query": user_query, "status": run.status, "thread_id": thread_id, "retrieval_ms": retrieval_ms})
+                continue
+            
+            messages = client.beta.threads.messages.list(thread_id=thread_id, run_id=run.id, order="desc", limit=1)
+            response_text = "".join(block.text.value for block in messages.data[0].content if block.type == "text")
+            cited_passages = set(re.findall(r"\[(\d+)\]", response_text))
+            print("🤖 Assistant Response:")
+            print(response_text)
+            print(f"📚 Cited passages: {', '.join(sorted(cited_passages, key=int)) or 'none'}")
+            
+            query_results.append({
+                "query": user_query,
+                "response_length": len(response_text),
+                "file_search_used": False,
+                "citations_count": len(cited_passages),
+                "thread_id": thread_id,
+                "retrieval_ms": retrieval_ms,
+                "sources": sources
+            })
         except Exception as e:
-            print(f"❌ Error during RAG query for '{user_query}': {e}")
-            import traceback
-            traceback.print_exc() # Print full traceback for detailed error
-            query_results.append({"query": user_query, "status": "Exception", "error": str(e), "thread_id": getattr(thread, 'id', 'N/A')})
+            print(f"❌ Error during local RAG query for '{user_query}': {e}")
+            query_results.append({"query": user_query, "status": "Exception", "error": str(e), "retrieval_ms": retrieval_ms})
+    if pool is not None:
+        pool.close()
+        pool.print_stats()
     return query_results
 
 def analyze_rag_performance(results: List[dict]):
@@ -250,6 +421,10 @@ def analyze_rag_performance(results: List[dict]):
     print("=" * 60)
     if not results: print("No results to analyze."); return
 
+    retrieval_times = [r["retrieval_ms"] for r in results if "retrieval_ms" in r]
+    if retrieval_times:
+        print(f"⚡ Local retrieval: avg {sum(retrieval_times) / len(retrieval_times):.2f} ms, max {max(retrieval_times):.2f} ms")
+
     successful_queries = [r for r in results if r.get("status", "completed") == "completed" and "response_length" in r]
     print(f"✅ Successful queries: {len(successful_queries)}/{len(results)}")
     
@@ -261,15 +436,25 @@ def analyze_rag_performance(results: List[dict]):
         print(f"📏 Avg response length: {avg_resp_len:.0f} chars")
         print(f"🔍 file_search used: {fs_usage_count}/{len(successful_queries)} queries")
         print(f"📚 Queries with citations: {queries_with_citations}/{len(successful_queries)}")
+        coverage = CitationCoverage()
+        for r in successful_queries:
+            if "citations" in r:
+                coverage.add(citation[0] for citation in r["citations"])
+        coverage.print_table(top=5)
         
         print("\n💡 KMP RAG Insights:")
         print("  • Assistant should answer based on your KMP algorithm PDF.")
         print("  • Verify citations point to the KMP document.")
         print("  • If file_search isn't used, query might be too general or unrelated to the PDF.")
 
-def cleanup_resources(client: OpenAI, vector_store_id: Optional[str], uploaded_openai_file_ids: List[str]):
-    """Cleans up Vector Store and uploaded OpenAI File objects."""
+def cleanup_resources(client: OpenAI, vector_store_id: Optional[str], uploaded_openai_file_ids: List[str],
+                      manifest: Optional[UploadManifest] = None):
+    """Cleans up Vector Store and uploaded OpenAI File objects (and forgets them in the upload cache)."""
     print("\n🧹 Cleaning up OpenAI resources...")
+    if manifest:
+        if vector_store_id: manifest.forget_vector_store(vector_store_id)
+        manifest.forget_file_ids(uploaded_openai_file_ids)
+        manifest.save()
     if vector_store_id:
         try:
             print(f"  🗑️ Deleting Vector Store: {vector_store_id}...")
@@ -287,8 +472,143 @@ def cleanup_resources(client: OpenAI, vector_store_id: Optional[str], uploaded_o
             except Exception as e: print(f"    ⚠️ Could not delete OpenAI File {file_id}: {e}")
     else: print("  ℹ️ No OpenAI File IDs for cleanup.")
 
+def prepare_vector_store(client: OpenAI, assistant_id: str, args, manifest: Optional[UploadManifest]):
+    """Uploads the documents and returns (vector_store, file_ids), via the bulk pipeline or the simple path."""
+    vector_store_name_prefix = f"VS_KMP_{assistant_id[:6]}"
+    
+    if args.sync:
+        store_name = args.store_name or vector_store_name_prefix
+        local_document_paths = get_document_paths_from_data_dir()
+        print(f"\n🔄 Syncing documents into long-lived Vector Store '{store_name}'...")
+        vector_store_obj, _ = sync_vector_store(
+            client, store_name, local_document_paths, manifest,
+            max_workers=args.workers, batch_size=args.batch_size, delete_removed_files=args.prune_files
+        )
+        return vector_store_obj, []
+    
+    if args.bulk:
+        print(f"\n📦 Bulk-ingesting {DATA_DIR} ({args.workers} workers, batches of {args.batch_size})...")
+        vector_store_obj, report = ingest_directory(
+            client, DATA_DIR, f"{vector_store_name_prefix}_{int(time.time())}",
+            max_workers=args.workers, batch_size=args.batch_size, manifest=manifest
+        )
+        report.print_summary()
+        return vector_store_obj, report.file_ids
+    
+    local_document_paths = get_document_paths_from_data_dir()
+    uploaded_openai_files = upload_documents(client, local_document_paths, manifest)
+
+    vector_store_obj = reuse_cached_vector_store(client, uploaded_openai_files, manifest) if manifest else None
+    if not vector_store_obj:
+        if manifest:
+            uploaded_openai_files = refresh_stale_uploads(client, uploaded_openai_files, manifest)
+        vector_store_obj = create_vector_store_with_files(client, uploaded_openai_files, vector_store_name_prefix=vector_store_name_prefix)
+        if manifest:
+            manifest.set_vector_store([doc.sha256 for doc in uploaded_openai_files], vector_store_obj.id)
+            manifest.save()
+    return vector_store_obj, [f.id for f in uploaded_openai_files]
+
+def parse_args(argv=None):
+    """Command-line options for the RAG lab."""
+    parser = argparse.ArgumentParser(description="RAG via file_search lab (KMP Algorithm document)")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="Max RAG queries in flight (1 = original serial loop)")
+    parser.add_argument("--query-timeout", type=float, default=None,
+                        help="Per-query timeout in seconds for concurrent mode")
+    parser.add_argument("--fresh-threads", action="store_true",
+                        help="Run each query on its own new thread instead of recycling pooled threads")
+    parser.add_argument("--fast", action="store_true",
+                        help="One streamed create_and_run request per query; answer, citations and tool use "
+                             "are read from the stream (no polling, messages.list or steps.list)")
+    parser.add_argument("--cache", action="store_true",
+                        help="Serve repeated queries from the local response cache (.response_cache.sqlite)")
+    parser.add_argument("--cache-ttl", type=float, default=168,
+                        help="Response cache TTL in hours")
+    parser.add_argument("--eval", type=Path, default=None, metavar="DATASET",
+                        help="Evaluate every question in a JSONL/CSV dataset instead of the demo queries (uses --concurrency)")
+    parser.add_argument("--eval-output", type=Path, default=None,
+                        help="Per-question results JSONL for --eval (default: <dataset>.results.jsonl)")
+    parser.add_argument("--keep-threads", action="store_true",
+                        help="--eval: keep each question's thread instead of deleting it after scoring")
+    parser.add_argument("--retrieval", choices=["hosted", "local"], default="hosted",
+                        help="hosted = file_search vector store; local = in-process BM25 index over data/")
+    parser.add_argument("--top-k", type=int, default=5,
+                        help="Chunks sent as context in local retrieval mode")
+    parser.add_argument("--dense", action="store_true",
+                        help="Local mode: add NumPy dense vectors to the BM25 score")
+    parser.add_argument("--offline", action="store_true",
+                        help="Local mode: only retrieve, never call the API")
+    parser.add_argument("--rebuild-index", action="store_true",
+                        help="Local mode: rebuild the memory-mapped index even if data/ is unchanged")
+    parser.add_argument("--no-index", action="store_true",
+                        help="Local mode: build the index in memory instead of using the on-disk mmap index")
+    parser.add_argument("--no-upload-cache", action="store_true",
+                        help="Ignore .upload_manifest.json and upload every document again")
+    parser.add_argument("--bulk", action="store_true",
+                        help="Use the parallel, resumable bulk ingestion pipeline (large corpora)")
+    parser.add_argument("--sync", action="store_true",
+                        help="Incrementally sync data/ into a named, long-lived vector store instead of creating one per run")
+    parser.add_argument("--store-name", default=None,
+                        help="Vector store name for --sync (default: VS_KMP_<assistant prefix>)")
+    parser.add_argument("--prune-files", action="store_true",
+                        help="--sync: also delete removed documents' files from the account, not just from the store")
+    parser.add_argument("--workers", type=int, default=8,
+                        help="Parallel uploads in bulk/sync mode")
+    parser.add_argument("--batch-size", type=int, default=100,
+                        help="Files per vector-store file batch in bulk/sync mode")
+    args = parser.parse_args(argv)
+    if args.sync and args.no_upload_cache:
+        parser.error("--sync diffs the store against .upload_manifest.json; it cannot be combined with --no-upload-cache")
+    return args
+
+def run_local_rag_lab(args):
+    """RAG against the local index: no uploads, no vector store, and with --offline no API calls."""
+    print("🚀 OpenAI Practice Lab - RAG with local retrieval")
+    print("=" * 60)
+    
+    start_time = time.perf_counter()
+    if args.no_index:
+        retriever = LocalRetriever.from_directory(DATA_DIR, dense=args.dense)
+        action = "Indexed in memory"
+    else:
+        retriever, rebuilt = load_or_build_index(DATA_DIR, dense=args.dense, rebuild=args.rebuild_index)
+        action = f"{'Built and mapped' if rebuilt else 'Mapped'} on-disk index ({LOCAL_INDEX_DIR.name}):"
+    print(f"📚 {action} {len(retriever.chunks)} chunks from {DATA_DIR} in {time.perf_counter() - start_time:.3f}s"
+          + (" (BM25 + dense)" if args.dense else " (BM25)"))
+    
+    client = assistant_id = None
+    if not args.offline:
+        client = get_client()
+        assistant_id = load_assistant_id()
+        print(f"✅ Using Study Q&A Assistant: {assistant_id}")
+    
+    rag_results = demonstrate_local_rag_queries(client, assistant_id, retriever, top_k=args.top_k, offline=args.offline,
+                                                recycle_threads=not args.fresh_threads)
+    analyze_rag_performance(rag_results)
+    report_telemetry()
+
+def run_dataset_evaluation(client: OpenAI, assistant_id: str, args, manifest: Optional[UploadManifest]):
+    """Answer every question of args.eval and report retrieval/citation/answer rates, latency and cost."""
+    output_path = args.eval_output or args.eval.with_suffix(".results.jsonl")
+    concurrency = max(args.concurrency, 1)
+    known_names = {entry["file_id"]: entry["filename"] for entry in manifest.files.values()} if manifest else {}
+    print(f"\n🧪 Evaluating {args.eval} with {concurrency} queries in flight → {output_path}")
+    summary = run_evaluation(
+        assistant_id, args.eval, build_rag_prompt, RAG_INSTRUCTIONS, output_path,
+        concurrency=concurrency, query_timeout=args.query_timeout,
+        resolve_filename=FileNameResolver(client, known_names), delete_threads=not args.keep_threads,
+        fast=args.fast,
+    )
+    summary.print_summary()
+    print(f"📁 Per-question results: {output_path}; summary: {output_path.with_suffix('.summary.json')}")
+    report_telemetry()
+
 def main():
     """Main RAG lab function for KMP Algorithm document."""
+    args = parse_args()
+    if args.retrieval == "local":
+        run_local_rag_lab(args)
+        return
     print("🚀 OpenAI Practice Lab - RAG with KMP Algorithm PDF")
     print("=" * 60)
     
@@ -298,25 +618,40 @@ def main():
     
     created_vector_store_id = None
     openai_file_ids_this_session = []
+    manifest = None if args.no_upload_cache else UploadManifest()
     
     try:
-        local_document_paths = get_document_paths_from_data_dir()
-        if not local_document_paths: return
-        
-        uploaded_openai_files = upload_documents(client, local_document_paths)
-        if not uploaded_openai_files: return
-        openai_file_ids_this_session = [f.id for f in uploaded_openai_files]
-
-        vector_store_obj = create_vector_store_with_files(client, uploaded_openai_files, vector_store_name_prefix=f"VS_KMP_{assistant_id[:6]}")
+        vector_store_obj, openai_file_ids_this_session = prepare_vector_store(client, assistant_id, args, manifest)
         if not vector_store_obj: return
         created_vector_store_id = vector_store_obj.id
         
         attach_vector_store_to_assistant(client, assistant_id, created_vector_store_id)
-        rag_results = demonstrate_rag_queries(client, assistant_id)
+        
+        if args.eval:
+            run_dataset_evaluation(client, assistant_id, args, manifest)
+            return
+        
+        cache = cache_key_for = None
+        if args.cache:
+            cache = ResponseCache(ttl_seconds=args.cache_ttl * 3600)
+            config = assistant_config(client, assistant_id)
+            store_version = vector_store_version(list_vector_store_file_ids(client, created_vector_store_id))
+            cache_key_for = lambda q: cache_key(config, build_rag_prompt(q), store_version, instructions=RAG_INSTRUCTIONS)
+        
+        rag_results = demonstrate_rag_queries(client, assistant_id, concurrency=args.concurrency, query_timeout=args.query_timeout,
+                                              cache=cache, cache_key_for=cache_key_for,
+                                              recycle_threads=not args.fresh_threads, fast=args.fast)
         analyze_rag_performance(rag_results)
+        if cache:
+            cache.print_stats()
+        print_poll_summary()
+        report_telemetry()
         
         print(f"\n🎯 Lab Complete! Assistant should now use your KMP PDF.")
-        print(f"   Vector Store '{created_vector_store_id}' will auto-expire.")
+        if args.sync:
+            print(f"   Vector Store '{created_vector_store_id}' stays attached; re-run with --sync to apply changes.")
+        else:
+            print(f"   Vector Store '{created_vector_store_id}' will auto-expire.")
         
     except Exception as e:
         print(f"❌ Unexpected error in main RAG flow: {e}")
@@ -324,23 +659,26 @@ def main():
         traceback.print_exc()
         
     finally:
-        print("\n--- Resource Cleanup ---")
-        if created_vector_store_id or openai_file_ids_this_session:
-            cleanup_choice = input(f"🤔 Clean up VS '{created_vector_store_id}' & {len(openai_file_ids_this_session)} files? (y/N): ").lower().strip()
-            if cleanup_choice == 'y':
-                cleanup_resources(client, created_vector_store_id, openai_file_ids_this_session)
-        else: print("ℹ️ No new VS or OpenAI files to clean from this session.")
+        if args.sync:
+            print("\nℹ️ Keeping the synced Vector Store attached (no cleanup for --sync runs).")
+        else:
+            print("\n--- Resource Cleanup ---")
+            if created_vector_store_id or openai_file_ids_this_session:
+                cleanup_choice = input(f"🤔 Clean up VS '{created_vector_store_id}' & {len(openai_file_ids_this_session)} files? (y/N): ").lower().strip()
+                if cleanup_choice == 'y':
+                    cleanup_resources(client, created_vector_store_id, openai_file_ids_this_session, manifest)
+            else: print("ℹ️ No new VS or OpenAI files to clean from this session.")
         
-        if created_vector_store_id: # Only try to detach if a VS was created and attached
-            try:
-                print(f"\n🔧 Detaching Vector Store {created_vector_store_id} from assistant {assistant_id}...")
-                client.beta.assistants.update(
-                    assistant_id=assistant_id,
-                    tool_resources={"file_search": {"vector_store_ids": []}} 
-                )
-                print("✅ Assistant's file_search tool resources reset.")
-            except Exception as e:
-                print(f"⚠️  Could not reset assistant tool_resources: {e}")
+            if created_vector_store_id: # Only try to detach if a VS was created and attached
+                try:
+                    print(f"\n🔧 Detaching Vector Store {created_vector_store_id} from assistant {assistant_id}...")
+                    client.beta.assistants.update(
+                        assistant_id=assistant_id,
+                        tool_resources={"file_search": {"vector_store_ids": []}} 
+                    )
+                    print("✅ Assistant's file_search tool resources reset.")
+                except Exception as e:
+                    print(f"⚠️  Could not reset assistant tool_resources: {e}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
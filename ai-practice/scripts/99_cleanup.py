@@ -6,18 +6,37 @@ Deletes lab-related threads, OpenAI files (for assistants), vector stores,
 and optionally the main lab assistant. Also cleans up known local temporary files.
 Helps maintain a clean OpenAI account and manage costs.
 
-Usage: python scripts/99_cleanup.py [--max-age <hours>] [--delete-assistant]
+Threads, files and vector stores are swept by labkit/sweeper.py: the whole
+listing is paged through with cursors, deletes run in parallel under a rate
+limit (429s are retried) and progress is saved in .sweep_state.json so an
+interrupted sweep resumes where it stopped.
+
+By default the candidates come from the local resource ledger
+(.resource_ledger.sqlite, see labkit/ledger.py) that every script appends to,
+so only resources created by the lab are looked at; `--source account` walks
+the whole account listing instead (e.g. for resources created before the
+ledger existed).
+
+Usage: python scripts/99_cleanup.py [--max-age <hours>] [--delete-assistant] [--dry-run]
+       [--source ledger|account] [--only threads,files,vector_stores] [--workers <n>]
+       [--rate <deletes/s>] [--restart] [--yes]
 """
 
-import os
-import sys
+from __future__ import annotations
+
+import argparse
 import time
 from pathlib import Path
-from dotenv import load_dotenv
-from openai import OpenAI
+from typing import TYPE_CHECKING, List, Optional
+from labkit.client import get_client
+from labkit.ledger import RESOURCE_LEDGER_FILE, ResourceLedger, get_ledger
+from labkit.sweeper import (SWEEP_STATE_FILE, Sweeper, SweepKind, file_kind, ledger_kind, list_threads,
+                            print_sweep_result, thread_kind, vector_store_kind)
+from labkit.telemetry import report_telemetry
+
+if TYPE_CHECKING:
+    from openai import OpenAI
 
-# Load environment variables
-load_dotenv()
 
 # --- Configuration: Define paths relative to the project root ---
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
@@ -30,76 +49,51 @@ SAMPLE_MD_LLM = DATA_DIR / "intro_to_llms.md"
 SAMPLE_MD_API = DATA_DIR / "api_best_practices.md"
 # -------------------------------------------------------------
 
-def get_client():
-    """Initialize OpenAI client."""
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        print("❌ Error: OPENAI_API_KEY not found.")
-        sys.exit(1)
-    org_id = os.getenv("OPENAI_ORG")
-    return OpenAI(api_key=api_key, organization=org_id if org_id else None)
-
-def cleanup_threads(client: OpenAI, max_age_hours=24):
-    """Clean up old threads."""
-    print("🧹 Cleaning up threads...")
-    deleted_count = 0
+def run_sweep(sweeper: Sweeper, kind: SweepKind, max_age_hours=24, dry_run=False, resume=True):
+    """List `kind` page by page and delete (or plan to delete) everything older than max_age_hours."""
+    print(f"\n🧹 {'Planning' if dry_run else 'Cleaning up'} {kind.name.replace('_', ' ')}...")
     try:
-        threads = client.beta.threads.list(limit=100)
-        current_time = int(time.time())
-        for thread_item in threads.data:
-            age_hours = (current_time - thread_item.created_at) / 3600
-            if age_hours > max_age_hours:
-                try:
-                    client.beta.threads.delete(thread_item.id)
-                    print(f"  🗑️ Deleted thread: {thread_item.id} (age: {age_hours:.1f}h)")
-                    deleted_count += 1
-                except Exception as e:
-                    print(f"  ⚠️ Could not delete thread {thread_item.id}: {e}")
-        print(f"✅ Deleted {deleted_count} threads older than {max_age_hours} hours.")
+        result = sweeper.sweep(kind, max_age_hours, dry_run=dry_run, resume=resume)
     except Exception as e:
-        print(f"❌ Error listing/cleaning threads: {e}")
+        print(f"❌ Error listing/cleaning {kind.name}: {e}")
+        return None
+    print_sweep_result(result, max_age_hours, dry_run)
+    return result
+
+def cleanup_threads(client: OpenAI, max_age_hours=24, sweeper: Optional[Sweeper] = None,
+                    ledger: Optional[ResourceLedger] = None, **options):
+    """Clean up old threads (from the ledger, or from the account where the API allows listing them)."""
+    kind = thread_kind(client)
+    if ledger is not None:
+        kind = ledger_kind(ledger, kind)
+    return run_sweep(sweeper or Sweeper(), kind, max_age_hours, **options)
 
-def cleanup_openai_files(client: OpenAI, max_age_hours=24):
+def cleanup_openai_files(client: OpenAI, max_age_hours=24, sweeper: Optional[Sweeper] = None,
+                         ledger: Optional[ResourceLedger] = None, **options):
     """Clean up 'assistants' purpose files uploaded to OpenAI."""
-    print("\n🧹 Cleaning up OpenAI 'assistants' purpose files...")
-    deleted_count = 0
-    try:
-        openai_files = client.files.list(purpose="assistants")
-        current_time = int(time.time())
-        for file_obj in openai_files.data:
-            age_hours = (current_time - file_obj.created_at) / 3600
-            if age_hours > max_age_hours:
-                try:
-                    client.files.delete(file_obj.id)
-                    print(f"  🗑️ Deleted OpenAI file: {file_obj.id} ({file_obj.filename}) (age: {age_hours:.1f}h)")
-                    deleted_count += 1
-                except Exception as e:
-                    print(f"  ⚠️ Could not delete OpenAI file {file_obj.id}: {e}")
-        print(f"✅ Deleted {deleted_count} 'assistants' purpose files from OpenAI older than {max_age_hours} hours.")
-    except Exception as e:
-        print(f"❌ Error listing/cleaning OpenAI files: {e}")
+    kind = file_kind(client, purpose="assistants")
+    if ledger is not None:
+        kind = ledger_kind(ledger, kind, purpose="assistants")
+    return run_sweep(sweeper or Sweeper(), kind, max_age_hours, **options)
 
-def cleanup_vector_stores(client: OpenAI, max_age_hours=24):
-    """Clean up old vector stores."""
-    print("\n🧹 Cleaning up Vector Stores...")
-    deleted_count = 0
+def attached_vector_store_ids(client: OpenAI) -> List[str]:
+    """Vector stores the lab assistant currently uses; the sweep never deletes these."""
+    if not ASSISTANT_ID_FILE.exists():
+        return []
     try:
-        vector_stores = client.beta.vector_stores.list(limit=100)
-        current_time = int(time.time())
-        for vs in vector_stores.data:
-            if hasattr(vs, 'created_at') and vs.created_at is not None:
-                age_hours = (current_time - vs.created_at) / 3600
-                if age_hours > max_age_hours:
-                    try:
-                        client.beta.vector_stores.delete(vs.id)
-                        print(f"  🗑️ Deleted Vector Store: {vs.id} (Name: {vs.name or 'N/A'}, Age: {age_hours:.1f}h)")
-                        deleted_count += 1
-                    except Exception as e:
-                        print(f"  ⚠️ Could not delete Vector Store {vs.id}: {e}")
-            # Optional: Add name-based deletion logic for VS without created_at if needed
-        print(f"✅ Deleted {deleted_count} Vector Stores older than {max_age_hours} hours.")
-    except Exception as e:
-        print(f"❌ Error listing/cleaning Vector Stores: {e}")
+        assistant = client.beta.assistants.retrieve(ASSISTANT_ID_FILE.read_text().strip())
+    except Exception:
+        return []
+    file_search = assistant.tool_resources.file_search if assistant.tool_resources else None
+    return list(file_search.vector_store_ids or []) if file_search else []
+
+def cleanup_vector_stores(client: OpenAI, max_age_hours=24, sweeper: Optional[Sweeper] = None,
+                          ledger: Optional[ResourceLedger] = None, **options):
+    """Clean up old vector stores (except the ones attached to the lab assistant)."""
+    kind = vector_store_kind(client, keep_ids=attached_vector_store_ids(client))
+    if ledger is not None:
+        kind = ledger_kind(ledger, kind)
+    return run_sweep(sweeper or Sweeper(), kind, max_age_hours, **options)
 
 def cleanup_lab_assistant(client: OpenAI, keep_assistant_flag=True):
     """Optionally cleans up the main lab assistant."""
@@ -161,21 +155,39 @@ def cleanup_local_lab_files():
 
     print(f"✅ Cleaned up {deleted_local_count} specified local files.")
 
-def show_current_usage(client: OpenAI):
+def show_account_usage(client: OpenAI):
+    """First-page counts of the account listings."""
+    try:
+        print(f"🧵 Threads: {count_listing(lambda: list_threads(client))}")
+    except Exception:
+        print("🧵 Threads: not listable with this API key")
+    print(f"📄 Assistant files on OpenAI: {count_listing(lambda: client.files.list(purpose='assistants', limit=100))}")
+    print(f"🗂️  Vector Stores: {count_listing(lambda: client.vector_stores.list(limit=100))}")
+
+def count_listing(list_page) -> str:
+    """Size of the first page of a listing, e.g. "37" or "100+"."""
+    page = list_page()
+    return f"{len(page.data)}{'+' if page.has_next_page() else ''}"
+
+def show_ledger_usage(ledger: ResourceLedger):
+    """Resources the lab created and has not deleted yet, from the local ledger (no API calls)."""
+    counts = ledger.counts()
+    labels = {"threads": "🧵 Threads", "files": "📄 Files", "vector_stores": "🗂️  Vector Stores"}
+    for kind, label in labels.items():
+        entry = counts[kind]
+        age = f", oldest {(time.time() - entry['oldest']) / 3600:.1f}h old" if entry["oldest"] else ""
+        print(f"{label}: {entry['live']} live ({entry['deleted']} deleted{age})")
+
+def show_current_usage(client: OpenAI, ledger: Optional[ResourceLedger] = None):
     """Displays a snapshot of current OpenAI resource usage."""
     print("\n📊 Current OpenAI Resource Usage Snapshot")
     print("=" * 40)
     try:
-        threads_count = len(client.beta.threads.list(limit=100).data)
-        print(f"🧵 Threads (up to 100): {threads_count}")
-        
-        all_files = client.files.list().data
-        assistant_files_count = len([f for f in all_files if f.purpose == "assistants"])
-        print(f"📄 Assistant files on OpenAI: {assistant_files_count} (out of {len(all_files)} total)")
-        
-        vs_count = len(client.beta.vector_stores.list(limit=100).data)
-        print(f"🗂️  Vector Stores (up to 100): {vs_count}")
-        
+        if ledger is not None:
+            print(f"(created by the lab scripts, from {ledger.path.name})")
+            show_ledger_usage(ledger)
+        else:
+            show_account_usage(client)
         if ASSISTANT_ID_FILE.exists():
             print(f"🤖 Lab Assistant ID (local file): {ASSISTANT_ID_FILE.read_text().strip()}")
         else:
@@ -183,43 +195,74 @@ def show_current_usage(client: OpenAI):
     except Exception as e:
         print(f"❌ Error fetching usage: {e}")
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Delete stale lab threads, files and vector stores")
+    parser.add_argument("--max-age", type=float, default=24, help="Delete resources older than this many hours")
+    parser.add_argument("--delete-assistant", action="store_true", help="Also delete the lab assistant")
+    parser.add_argument("--dry-run", action="store_true", help="Only list what would be deleted")
+    parser.add_argument("--source", choices=["ledger", "account"], default="ledger",
+                        help=f"Sweep what the lab recorded in {RESOURCE_LEDGER_FILE.name} (default) "
+                             "or list the whole account")
+    parser.add_argument("--only", default="threads,files,vector_stores",
+                        help="Comma-separated kinds to sweep (threads, files, vector_stores)")
+    parser.add_argument("--workers", type=int, default=8, help="Parallel deletes")
+    parser.add_argument("--rate", type=float, default=20.0, help="Max deletes per second across workers")
+    parser.add_argument("--restart", action="store_true",
+                        help=f"Ignore saved cursors in {SWEEP_STATE_FILE.name} and sweep from the oldest object")
+    parser.add_argument("--yes", action="store_true", help="Do not ask for confirmation")
+    return parser.parse_args()
+
 def main():
     """Main cleanup orchestration function."""
+    args = parse_args()
     print("🚀 OpenAI Study Q&A Lab - Cleanup Utility")
     print("=" * 50)
     
-    should_delete_assistant = "--delete-assistant" in sys.argv
-    age_threshold_hours = 24
-    if "--max-age" in sys.argv:
-        try:
-            idx = sys.argv.index("--max-age") + 1
-            if idx < len(sys.argv): age_threshold_hours = int(sys.argv[idx])
-            else: raise ValueError("Missing value for --max-age")
-        except (ValueError, IndexError):
-            print(f"⚠️ Invalid --max-age. Using default: {age_threshold_hours} hours.")
+    age_threshold_hours = args.max_age
+    kinds = {k.strip() for k in args.only.split(",") if k.strip()}
     
     client = get_client()
-    show_current_usage(client)
-    
-    print(f"\n🤔 This will attempt to delete OpenAI resources older than {age_threshold_hours} hours.")
-    if should_delete_assistant:
-        print("   ⚠️ WARNING: The --delete-assistant flag is active! The lab assistant will be deleted.")
+    ledger = get_ledger() if args.source == "ledger" else None
+    show_current_usage(client, ledger)
     
-    confirm = input("Proceed with cleanup? (y/N): ").lower().strip()
-    if confirm != 'y':
-        print("❌ Cleanup cancelled by user."); return
+    sweeper = Sweeper(workers=args.workers, rate=args.rate)
+    options = {"dry_run": args.dry_run, "resume": not args.restart, "ledger": ledger}
+    if args.dry_run:
+        print(f"\n📝 Dry run: listing resources older than {age_threshold_hours} hours, nothing is deleted.")
+    else:
+        print(f"\n🤔 This will attempt to delete OpenAI resources older than {age_threshold_hours} hours "
+              f"({args.workers} workers, ≤{args.rate:g} deletes/s).")
+        if args.delete_assistant:
+            print("   ⚠️ WARNING: The --delete-assistant flag is active! The lab assistant will be deleted.")
+        
+        confirm = "y" if args.yes else input("Proceed with cleanup? (y/N): ").lower().strip()
+        if confirm != 'y':
+            print("❌ Cleanup cancelled by user."); return
     
     print("\n🚀 Starting cleanup operations...")
-    cleanup_threads(client, age_threshold_hours)
-    cleanup_openai_files(client, age_threshold_hours)
-    cleanup_vector_stores(client, age_threshold_hours) # Will use corrected calls
-    cleanup_lab_assistant(client, keep_assistant_flag=not should_delete_assistant)
+    if "threads" in kinds:
+        cleanup_threads(client, age_threshold_hours, sweeper, **options)
+    if "files" in kinds:
+        cleanup_openai_files(client, age_threshold_hours, sweeper, **options)
+    if "vector_stores" in kinds:
+        cleanup_vector_stores(client, age_threshold_hours, sweeper, **options)
+    if args.dry_run:
+        print()
+        report_telemetry()
+        return
+    cleanup_lab_assistant(client, keep_assistant_flag=not args.delete_assistant)
     cleanup_local_lab_files()
     
     print("\n🎯 Cleanup process finished.")
     print("\n📊 Post-Cleanup Resource Usage Snapshot:")
-    show_current_usage(client) # Will use corrected calls
-    print("\n💡 Tip: Run regularly. Use `--max-age <hours>` and `--delete-assistant` for control.")
+    if ledger is not None:
+        purged = ledger.purge_deleted()
+        if purged:
+            print(f"\n🧾 Dropped {purged} ledger rows for resources deleted over a week ago")
+    show_current_usage(client, ledger)
+    print()
+    report_telemetry()
+    print("\n💡 Tip: Run regularly. Use `--max-age <hours>`, `--dry-run` and `--delete-assistant` for control.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+lab — one entry point for the lab scripts.
+
+    python scripts/lab.py init                        # 00_init_assistant.py
+    python scripts/lab.py run [--parallel-runs 6]     # 01_responses_api.py
+    python scripts/lab.py structured [--batch-topics] # 02_structured_output.py
+    python scripts/lab.py rag [--concurrency 8]       # 03_rag_file_search.py
+    python scripts/lab.py cleanup [--dry-run]         # 99_cleanup.py
+
+Everything after the subcommand is handed to the script's own options
+(`lab rag --help` lists them). Only the chosen script is imported, and only
+once the command line is parsed; .env is read on first use by
+labkit.config, so `lab --help` needs nothing beyond argparse. The scripts
+themselves import openai when they build a client, not at import time.
+Measure with `python benchmarks/startup_times.py`.
+"""
+
+import argparse
+import importlib.util
+import sys
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+COMMANDS = {
+    "init": ("00_init_assistant.py", "Create or reuse the lab assistant"),
+    "run": ("01_responses_api.py", "Threads → runs → streaming walk-through"),
+    "structured": ("02_structured_output.py", "JSON mode, strict function tools and the Batch API"),
+    "rag": ("03_rag_file_search.py", "Upload documents and query them with file_search"),
+    "cleanup": ("99_cleanup.py", "Delete stale threads, files and vector stores"),
+}
+
+
+def load_script(filename: str):
+    """Import a numbered lab script (not importable by name) as a module."""
+    name = "lab_" + filename.split("_")[0]
+    spec = importlib.util.spec_from_file_location(name, SCRIPTS_DIR / filename)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="lab", description="OpenAI Practice Lab scripts")
+    commands = parser.add_subparsers(dest="command", metavar="command", required=True)
+    for name, (filename, summary) in COMMANDS.items():
+        # add_help=False: `lab <command> --help` is answered by the script's own parser.
+        commands.add_parser(name, help=f"{summary} ({filename})", add_help=False)
+    return parser.parse_known_args(argv)
+
+
+def main(argv=None):
+    args, rest = parse_args(argv)
+    if str(SCRIPTS_DIR) not in sys.path:
+        sys.path.insert(0, str(SCRIPTS_DIR))  # for `import labkit` when lab.py is run from elsewhere
+    sys.argv = [f"lab {args.command}", *rest]
+    load_script(COMMANDS[args.command][0]).main()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+"""
+labkit — shared helpers for the OpenAI Practice Lab scripts.
+
+The numbered scripts in scripts/ import from this package so that client
+setup and other cross-cutting plumbing lives in one place.
+"""
@@ -0,0 +1,123 @@
+"""
+Batch API helpers for bulk structured output.
+
+Generating one summary per interactive run pays a thread, a run and a poll
+loop per topic. The Batch API takes a JSONL file of requests instead, runs
+them asynchronously (within a 24h window, at half the price) and returns a
+JSONL file of responses. The flow:
+  * write_batch_file() streams request lines to disk (no list of N requests),
+  * submit_batch() uploads the file (purpose "batch") and creates the job,
+  * wait_for_batch() polls with the AdaptivePoller, which learns how long
+    batch jobs take and stays quiet until then,
+  * iter_batch_results() streams the output and error files line by line
+    and validates each response straight into a Pydantic model.
+
+The Batch API serves chat completions, not Assistants runs, so the requests
+carry the assistant's model and instructions themselves.
+
+Usage:
+    write_batch_file(path, (batch_request(f"topic-{i}", body) for i, body in ...))
+    batch = wait_for_batch(client, submit_batch(client, path).id)
+    for item in iter_batch_results(client, batch, LectureSummary): ...
+"""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, Optional, Type
+
+from labkit.polling import AdaptivePoller
+
+if TYPE_CHECKING:
+    from pydantic import BaseModel
+
+CHAT_COMPLETIONS_URL = "/v1/chat/completions"
+TERMINAL_BATCH_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def batch_request(custom_id: str, body: dict, url: str = CHAT_COMPLETIONS_URL) -> dict:
+    """One line of a batch input file."""
+    return {"custom_id": custom_id, "method": "POST", "url": url, "body": body}
+
+
+def write_batch_file(path: Path, requests: Iterable[dict]) -> int:
+    """Write requests as JSONL one at a time; returns how many were written."""
+    count = 0
+    with open(path, "w") as f:
+        for request in requests:
+            f.write(json.dumps(request) + "\n")
+            count += 1
+    return count
+
+
+def submit_batch(client, path: Path, endpoint: str = CHAT_COMPLETIONS_URL, metadata: Optional[dict] = None):
+    """Upload a batch input file and start the batch job."""
+    with open(path, "rb") as f:
+        input_file = client.files.create(file=f, purpose="batch")
+    return client.batches.create(
+        input_file_id=input_file.id,
+        endpoint=endpoint,
+        completion_window="24h",
+        metadata=metadata,
+    )
+
+
+def wait_for_batch(client, batch_id: str, on_update: Optional[Callable[[object], None]] = None,
+                   poller: Optional[AdaptivePoller] = None):
+    """Poll a batch until it reaches a terminal status and return it."""
+    # Batches take minutes to hours: start at 2s, back off to a minute, no deadline (the API expires them).
+    poller = poller or AdaptivePoller("batches.retrieve", min_interval=2.0, max_interval=60.0,
+                                      baseline_interval=10.0, deadline=None)
+    return poller.poll(lambda: client.batches.retrieve(batch_id),
+                       is_done=lambda b: b.status in TERMINAL_BATCH_STATUSES, on_update=on_update)
+
+
+def iter_file_lines(client, file_id: str) -> Iterator[str]:
+    """Stream a JSONL file from the Files API without loading it into memory."""
+    with client.files.with_streaming_response.content(file_id) as response:
+        for line in response.iter_lines():
+            if line.strip():
+                yield line
+
+
+@dataclass
+class BatchItem:
+    """One batch result: a validated object or the reason there is none."""
+    custom_id: str
+    value: Optional[BaseModel] = None
+    error: Optional[str] = None
+
+
+def parse_batch_line(line: str, model: Type[BaseModel]) -> BatchItem:
+    """Turn one output/error file line into a BatchItem validated against `model`."""
+    from pydantic import ValidationError
+
+    record = json.loads(line)
+    custom_id = record.get("custom_id", "?")
+    if record.get("error"):
+        error = record["error"]
+        return BatchItem(custom_id, error=f"{error.get('code')}: {error.get('message')}")
+    response = record.get("response") or {}
+    body = response.get("body") or {}
+    if response.get("status_code") != 200:
+        message = (body.get("error") or {}).get("message", "no error message")
+        return BatchItem(custom_id, error=f"HTTP {response.get('status_code')}: {message}")
+    try:
+        content = body["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError):
+        return BatchItem(custom_id, error="response has no message content")
+    try:
+        return BatchItem(custom_id, value=model.model_validate_json(content))
+    except ValidationError as e:
+        return BatchItem(custom_id, error=f"validation failed: {e.error_count()} error(s), first: {e.errors()[0]['msg']}")
+
+
+def iter_batch_results(client, batch, model: Type[BaseModel]) -> Iterator[BatchItem]:
+    """Yield a BatchItem for every line of the batch's output file, then of its error file."""
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if not file_id:
+            continue
+        for line in iter_file_lines(client, file_id):
+            yield parse_batch_line(line, model)
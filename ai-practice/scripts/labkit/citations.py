@@ -0,0 +1,182 @@
+"""
+Citation extraction, filename resolution and per-document coverage.
+
+For bulk evaluation the per-answer citation handling has to stay cheap:
+  * extract_citations() walks a message's text blocks once and maps every
+    annotation to a Citation (file_id, chunk, character span in the joined
+    answer, quoted marker) without hasattr probing: the annotation's `type`
+    names the attribute that holds its file reference,
+  * FileNameResolver turns file IDs into filenames from the upload manifest
+    first, then one files.list page for all unknown IDs at once, and only
+    then a files.retrieve per ID still missing; every answer is cached,
+  * CitationCoverage aggregates thousands of answers into parallel
+    array('q') counters indexed by document: citations, answers citing the
+    document, and expected-source hits, so memory grows with the number of
+    documents rather than answers.
+
+Usage:
+    text, citations = extract_citations(message)
+    coverage.add([resolve(c.file_id) or c.file_id for c in citations], expected="kmp.pdf")
+"""
+
+import re
+import threading
+from array import array
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# File search markers look like 【4:0†source】: <search call>:<result index>†<label>.
+_MARKER_RE = re.compile(r"【(\d+:\d+)†[^】]*】")
+
+
+class Citation(NamedTuple):
+    """One file citation in an answer; start/end index the joined answer text."""
+    file_id: str
+    chunk: Optional[str]
+    start: int
+    end: int
+    quote: str
+
+    def as_row(self) -> list:
+        """Compact JSON form: [file_id, chunk, start, end]."""
+        return [self.file_id, self.chunk, self.start, self.end]
+
+
+def extract_citations(message) -> Tuple[str, List[Citation]]:
+    """Join the text blocks of a message and list its file citations, in one pass."""
+    parts: List[str] = []
+    citations: List[Citation] = []
+    offset = 0
+    for block in message.content:
+        if block.type != "text":
+            continue
+        text = block.text
+        for annotation in text.annotations or ():
+            reference = getattr(annotation, annotation.type, None)  # .file_citation / .file_path
+            file_id = getattr(reference, "file_id", None)
+            if not file_id:
+                continue
+            marker = _MARKER_RE.match(annotation.text or "")
+            citations.append(Citation(file_id, marker.group(1) if marker else None,
+                                      offset + (annotation.start_index or 0), offset + (annotation.end_index or 0),
+                                      annotation.text or ""))
+        parts.append(text.value)
+        offset += len(text.value)
+    return "".join(parts), citations
+
+
+def unique_file_ids(citations: Iterable[Citation]) -> List[str]:
+    """Cited file IDs in first-citation order."""
+    return list(dict.fromkeys(citation.file_id for citation in citations))
+
+
+class FileNameResolver:
+    """Callable file_id -> filename (None when unknown), cached for the life of the resolver."""
+
+    def __init__(self, client, known: Optional[Dict[str, str]] = None, purpose: str = "assistants",
+                 prefetch_limit: int = 100):
+        self.client = client
+        self.purpose = purpose
+        self.prefetch_limit = prefetch_limit
+        self.names: Dict[str, Optional[str]] = dict(known or {})
+        self.api_calls = 0
+        self._prefetched = False
+        self._lock = threading.Lock()
+
+    def _prefetch(self):
+        # One page of the most recent uploads usually names every document a vector store cites.
+        self._prefetched = True
+        self.api_calls += 1
+        try:
+            page = self.client.files.list(purpose=self.purpose, limit=self.prefetch_limit, order="desc")
+        except Exception:
+            return
+        for file in page.data:
+            self.names.setdefault(file.id, file.filename)
+
+    def __call__(self, file_id: str) -> Optional[str]:
+        with self._lock:
+            if file_id in self.names:
+                return self.names[file_id]
+            if not self._prefetched:
+                self._prefetch()
+                if file_id in self.names:
+                    return self.names[file_id]
+            self.api_calls += 1
+            try:
+                self.names[file_id] = self.client.files.retrieve(file_id).filename
+            except Exception:
+                self.names[file_id] = None
+            return self.names[file_id]
+
+
+class CitationCoverage:
+    """Per-document citation counters over many answers (parallel arrays indexed by document)."""
+
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.documents: List[str] = []
+        self.citations = array("q")   # citations of the document
+        self.answers = array("q")     # answers citing it at least once
+        self.expected = array("q")    # answers expecting it as their source
+        self.hits = array("q")        # ... and citing it
+        self.total_answers = 0
+        self.answers_with_citations = 0
+
+    def _slot(self, document: str) -> int:
+        slot = self.index.get(document)
+        if slot is None:
+            slot = self.index[document] = len(self.documents)
+            self.documents.append(document)
+            for counter in (self.citations, self.answers, self.expected, self.hits):
+                counter.append(0)
+        return slot
+
+    def add(self, cited_documents: Iterable[str], expected: Optional[str] = None):
+        """Count one answer: the document of each of its citations and, optionally, its expected source."""
+        self.total_answers += 1
+        cited = set()
+        for document in cited_documents:
+            slot = self._slot(document)
+            self.citations[slot] += 1
+            cited.add(slot)
+        for slot in cited:
+            self.answers[slot] += 1
+        self.answers_with_citations += bool(cited)
+        if expected:
+            slot = self._slot(expected)
+            self.expected[slot] += 1
+            self.hits[slot] += slot in cited
+
+    def rows(self) -> List[dict]:
+        """One dict per document, most-cited first."""
+        order = sorted(range(len(self.documents)), key=lambda slot: (-self.answers[slot], -self.expected[slot]))
+        total = self.total_answers or 1
+        return [{
+            "document": self.documents[slot],
+            "answers": self.answers[slot],
+            "answer_share": self.answers[slot] / total,
+            "citations": self.citations[slot],
+            "expected": self.expected[slot],
+            "recall": (self.hits[slot] / self.expected[slot]) if self.expected[slot] else None,
+        } for slot in order]
+
+    def as_dict(self) -> dict:
+        return {
+            "answers": self.total_answers,
+            "answers_with_citations": self.answers_with_citations,
+            "documents": self.rows(),
+        }
+
+    def print_table(self, top: int = 10):
+        rows = self.rows()
+        if not rows:
+            return
+        print(f"📚 Citation coverage ({len(rows)} documents, {self.answers_with_citations}/{self.total_answers} "
+              f"answers cite something):")
+        print(f"   {'document':<40} {'answers':>8} {'share':>7} {'cites':>7} {'recall':>7}")
+        for row in rows[:top]:
+            recall = f"{row['recall']:.0%}" if row["recall"] is not None else "-"
+            print(f"   {row['document'][:40]:<40} {row['answers']:>8} {row['answer_share']:>7.1%} "
+                  f"{row['citations']:>7} {recall:>7}")
+        if len(rows) > top:
+            print(f"   ... {len(rows) - top} more")
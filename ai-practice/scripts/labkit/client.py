@@ -0,0 +1,169 @@
+"""
+Shared OpenAI client layer for the lab scripts.
+
+Every script used to build its own OpenAI(...) in its own get_client(). This
+module owns one tuned, keep-alive HTTP connection pool per process and hands
+out sync and async clients built from the same ClientConfig, so batch runs
+reuse warm connections instead of paying a TLS handshake per request.
+
+Configuration (all optional, read from the environment / .env via labkit.config):
+    OPENAI_API_KEY               required
+    OPENAI_ORG                   organization id
+    OPENAI_BASE_URL              alternative endpoint (e.g. a local mock server)
+    OPENAI_TIMEOUT               total request timeout in seconds (default 60)
+    OPENAI_CONNECT_TIMEOUT       connect timeout in seconds (default 5)
+    OPENAI_MAX_RETRIES           SDK retries with exponential backoff (default 3)
+    OPENAI_CONNECT_RETRIES       transport-level retries on connect errors (default 2)
+    OPENAI_POOL_SIZE             max open connections (default 20)
+    OPENAI_KEEPALIVE_CONNECTIONS idle connections kept warm (default 10)
+    OPENAI_KEEPALIVE_EXPIRY      seconds an idle connection stays open (default 30)
+    OPENAI_TELEMETRY             record per-call latency/tokens in labkit.telemetry (default 1)
+    OPENAI_LEDGER                record created threads/files/vector stores in labkit.ledger (default 1)
+    OPENAI_RATE_LIMITS           pace requests by the x-ratelimit-* headers in labkit.rate_limits (default 1)
+    OPENAI_RPM / OPENAI_TPM      requests / tokens per minute to pace at before the first headers arrive
+    OPENAI_RATE_HEADROOM         share of the reported limits to use (default 0.9)
+
+Docs: https://github.com/openai/openai-python#configuring-the-http-client
+"""
+
+import os
+import sys
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+from labkit.config import env_flag, env_float, env_int, load_env
+
+
+@dataclass(frozen=True)
+class ClientConfig:
+    """Connection, timeout and retry settings shared by sync and async clients."""
+    api_key: str
+    organization: Optional[str] = None
+    base_url: Optional[str] = None
+    timeout: float = 60.0
+    connect_timeout: float = 5.0
+    max_retries: int = 3
+    connect_retries: int = 2
+    pool_size: int = 20
+    keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    telemetry: bool = True
+    ledger: bool = True
+    rate_limits: bool = True
+    rpm: Optional[int] = None
+    tpm: Optional[int] = None
+    rate_headroom: float = 0.9
+
+    @classmethod
+    def from_env(cls) -> "ClientConfig":
+        """Build a config from environment variables (and .env), exiting if the API key is missing."""
+        load_env()
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            print("❌ Error: OPENAI_API_KEY not found in environment variables.")
+            print("   Please copy .env.example to .env and add your API key.")
+            sys.exit(1)
+
+        return cls(
+            api_key=api_key,
+            organization=os.getenv("OPENAI_ORG") or None,
+            base_url=os.getenv("OPENAI_BASE_URL") or None,
+            timeout=env_float("OPENAI_TIMEOUT", cls.timeout),
+            connect_timeout=env_float("OPENAI_CONNECT_TIMEOUT", cls.connect_timeout),
+            max_retries=env_int("OPENAI_MAX_RETRIES", cls.max_retries),
+            connect_retries=env_int("OPENAI_CONNECT_RETRIES", cls.connect_retries),
+            pool_size=env_int("OPENAI_POOL_SIZE", cls.pool_size),
+            keepalive_connections=env_int("OPENAI_KEEPALIVE_CONNECTIONS", cls.keepalive_connections),
+            keepalive_expiry=env_float("OPENAI_KEEPALIVE_EXPIRY", cls.keepalive_expiry),
+            telemetry=env_flag("OPENAI_TELEMETRY"),
+            ledger=env_flag("OPENAI_LEDGER"),
+            rate_limits=env_flag("OPENAI_RATE_LIMITS"),
+            rpm=env_int("OPENAI_RPM", 0) or None,
+            tpm=env_int("OPENAI_TPM", 0) or None,
+            rate_headroom=env_float("OPENAI_RATE_HEADROOM", cls.rate_headroom),
+        )
+
+    def _httpx_options(self):
+        import httpx
+
+        limits = httpx.Limits(
+            max_connections=self.pool_size,
+            max_keepalive_connections=self.keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+        timeout = httpx.Timeout(self.timeout, connect=self.connect_timeout)
+        return limits, timeout
+
+    def _client_kwargs(self) -> dict:
+        client_kwargs = {
+            "api_key": self.api_key,
+            "max_retries": self.max_retries,
+        }
+        if self.organization:
+            client_kwargs["organization"] = self.organization
+        if self.base_url:
+            client_kwargs["base_url"] = self.base_url
+        return client_kwargs
+
+    def build_client(self):
+        """Create a sync OpenAI client on a dedicated keep-alive connection pool."""
+        import httpx
+        from openai import DefaultHttpxClient, OpenAI
+
+        limits, timeout = self._httpx_options()
+        transport = httpx.HTTPTransport(limits=limits, retries=self.connect_retries)
+        if self.telemetry:
+            from labkit.transports import instrument
+            transport = instrument(transport)
+        if self.rate_limits:
+            from labkit.rate_limits import get_scheduler
+            from labkit.transports import pace
+            transport = pace(transport, get_scheduler(self.rpm, self.tpm, self.rate_headroom))
+        if self.ledger:
+            from labkit.transports import track
+            transport = track(transport)
+        http_client = DefaultHttpxClient(timeout=timeout, transport=transport)
+        return OpenAI(http_client=http_client, timeout=timeout, **self._client_kwargs())
+
+    def build_async_client(self):
+        """Create an AsyncOpenAI client with the same pool, timeout and retry settings."""
+        import httpx
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+        limits, timeout = self._httpx_options()
+        transport = httpx.AsyncHTTPTransport(limits=limits, retries=self.connect_retries)
+        if self.telemetry:
+            from labkit.transports import instrument_async
+            transport = instrument_async(transport)
+        if self.rate_limits:
+            from labkit.rate_limits import get_scheduler
+            from labkit.transports import pace_async
+            transport = pace_async(transport, get_scheduler(self.rpm, self.tpm, self.rate_headroom))
+        if self.ledger:
+            from labkit.transports import track_async
+            transport = track_async(transport)
+        http_client = DefaultAsyncHttpxClient(timeout=timeout, transport=transport)
+        return AsyncOpenAI(http_client=http_client, timeout=timeout, **self._client_kwargs())
+
+
+@lru_cache(maxsize=1)
+def get_config() -> ClientConfig:
+    """Return the process-wide client configuration."""
+    return ClientConfig.from_env()
+
+
+@lru_cache(maxsize=1)
+def get_client():
+    """Return the process-wide sync client; all callers share one connection pool."""
+    return get_config().build_client()
+
+
+def get_async_client():
+    """
+    Return a new AsyncOpenAI client built from the shared configuration.
+
+    Async connection pools are bound to the event loop that first uses them,
+    so create one per asyncio.run(...) and reuse it for the whole batch.
+    """
+    return get_config().build_async_client()
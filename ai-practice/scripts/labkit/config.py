@@ -0,0 +1,51 @@
+"""
+Environment loading shared by the lab scripts and the `lab` CLI.
+
+Every script used to call load_dotenv() at import time, so even `--help`
+paid for importing python-dotenv and parsing .env. Configuration is now read
+on first use instead:
+  * load_env() loads the project's .env once per process (python-dotenv is
+    only imported when a .env file exists); variables already set in the
+    environment win, as with load_dotenv(),
+  * env_int(), env_float() and env_flag() read typed settings after it,
+  * labkit.client.get_config() calls load_env() before building the shared
+    ClientConfig, so scripts never have to.
+"""
+
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+
+
+@lru_cache(maxsize=None)
+def load_env(path: Optional[Path] = None) -> bool:
+    """Load .env (the working directory's, else the project's) once; True when a file was loaded."""
+    candidates = [path] if path else [Path.cwd() / ".env", PROJECT_ROOT / ".env"]
+    env_file = next((candidate for candidate in candidates if candidate.is_file()), None)
+    if env_file is None:
+        return False
+    from dotenv import load_dotenv
+
+    return load_dotenv(env_file)
+
+
+def env_int(name: str, default: int) -> int:
+    load_env()
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def env_float(name: str, default: float) -> float:
+    load_env()
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def env_flag(name: str, default: bool = True) -> bool:
+    """False for 0/false/no, True for anything else; `default` when unset."""
+    load_env()
+    value = os.getenv(name)
+    return default if value is None else value.strip().lower() not in ("0", "false", "no")
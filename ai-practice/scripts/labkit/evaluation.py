@@ -0,0 +1,267 @@
+"""
+Batch evaluation of RAG questions from a dataset file.
+
+A regression sweep over thousands of questions in one command:
+  * load_questions() streams rows from JSONL or CSV (columns: question,
+    optional id, expected_answer, expected_source) without loading the file,
+  * evaluate_async() keeps at most `concurrency` queries in flight with a
+    fixed pool of workers pulling from that stream,
+  * every result is appended to a JSONL file as soon as it finishes, and the
+    aggregate (EvalSummary) keeps only counters and a latency Histogram, so
+    memory stays flat however long the dataset is,
+  * the summary reports retrieval-hit rate, citation rate, answer match rate
+    (when expected answers are given), latency percentiles and cost per query,
+    plus per-document citation coverage (labkit.citations.CitationCoverage);
+    cited file IDs are named through a cached FileNameResolver.
+
+Usage (from 03_rag_file_search.py):
+    python scripts/03_rag_file_search.py --eval questions.jsonl --concurrency 16
+"""
+
+import asyncio
+import csv
+import json
+import re
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional
+
+from labkit.citations import CitationCoverage
+from labkit.client import get_async_client
+from labkit.pricing import cost_usd
+from labkit.rag import run_query_async, stream_query_async
+from labkit.telemetry import Histogram
+from labkit.thread_pool import AsyncThreadPool
+
+ANSWER_MATCH_THRESHOLD = 0.6  # share of expected-answer words that must appear in the response
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+@dataclass
+class EvalQuestion:
+    """One dataset row."""
+    id: str
+    question: str
+    expected_answer: Optional[str] = None
+    expected_source: Optional[str] = None
+
+
+def _row_to_question(row: dict, line_number: int) -> Optional[EvalQuestion]:
+    question = (row.get("question") or row.get("query") or "").strip()
+    if not question:
+        return None
+    return EvalQuestion(
+        id=str(row.get("id") or line_number),
+        question=question,
+        expected_answer=(row.get("expected_answer") or row.get("answer") or None),
+        expected_source=(row.get("expected_source") or row.get("source") or None),
+    )
+
+
+def load_questions(path: Path) -> Iterator[EvalQuestion]:
+    """Yield questions from a .jsonl or .csv file one row at a time (blank/invalid rows are skipped)."""
+    if path.suffix.lower() == ".csv":
+        with open(path, newline="") as f:
+            for line_number, row in enumerate(csv.DictReader(f), 1):
+                question = _row_to_question(row, line_number)
+                if question:
+                    yield question
+        return
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                print(f"  ⚠️  Skipping invalid JSON on line {line_number} of {path.name}")
+                continue
+            question = _row_to_question(row if isinstance(row, dict) else {"question": row}, line_number)
+            if question:
+                yield question
+
+
+def answer_recall(response: str, expected: str) -> float:
+    """Share of the expected answer's words that appear in the response."""
+    expected_words = set(_WORD_RE.findall(expected.lower()))
+    if not expected_words:
+        return 0.0
+    return len(expected_words & set(_WORD_RE.findall(response.lower()))) / len(expected_words)
+
+
+class EvalSummary:
+    """Running aggregates over evaluated questions (constant memory)."""
+
+    def __init__(self):
+        self.total = 0
+        self.completed = 0
+        self.failed = 0
+        self.retrieval_hits = 0
+        self.with_citations = 0
+        self.file_search_used = 0
+        self.expected_answers = 0
+        self.answer_matches = 0
+        self.answer_recall_sum = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self.priced = 0
+        self.latency = Histogram()
+        self.coverage = CitationCoverage()
+        self.seconds = 0.0
+
+    def add(self, row: dict):
+        self.total += 1
+        self.latency.observe(row["latency_s"])
+        if row.get("status", "completed") != "completed" or "response_length" not in row:
+            self.failed += 1
+            return
+        self.completed += 1
+        documents = row.get("cited_sources") or [citation[0] for citation in row.get("citations", [])]
+        self.coverage.add(documents, row.get("expected_source"))
+        self.file_search_used += row["file_search_used"]
+        self.with_citations += row["citations_count"] > 0
+        self.retrieval_hits += row["retrieval_hit"]
+        if "answer_recall" in row:
+            self.expected_answers += 1
+            self.answer_recall_sum += row["answer_recall"]
+            self.answer_matches += row["answer_match"]
+        self.prompt_tokens += row.get("prompt_tokens", 0)
+        self.completion_tokens += row.get("completion_tokens", 0)
+        if row.get("cost_usd") is not None:
+            self.cost += row["cost_usd"]
+            self.priced += 1
+
+    def as_dict(self) -> dict:
+        done = self.completed or 1
+        return {
+            "questions": self.total,
+            "completed": self.completed,
+            "failed": self.failed,
+            "retrieval_hit_rate": self.retrieval_hits / done,
+            "citation_rate": self.with_citations / done,
+            "file_search_rate": self.file_search_used / done,
+            "answer_match_rate": (self.answer_matches / self.expected_answers) if self.expected_answers else None,
+            "mean_answer_recall": (self.answer_recall_sum / self.expected_answers) if self.expected_answers else None,
+            "latency_p50_s": self.latency.quantile(0.50),
+            "latency_p95_s": self.latency.quantile(0.95),
+            "latency_p99_s": self.latency.quantile(0.99),
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cost_usd": self.cost if self.priced else None,
+            "cost_per_query_usd": (self.cost / self.priced) if self.priced else None,
+            "seconds": self.seconds,
+            "questions_per_s": self.total / self.seconds if self.seconds else 0.0,
+            "citation_coverage": self.coverage.as_dict(),
+        }
+
+    def print_summary(self):
+        s = self.as_dict()
+        print(f"\n📊 Evaluation: {s['completed']}/{s['questions']} completed, {s['failed']} failed "
+              f"in {s['seconds']:.1f}s ({s['questions_per_s']:.2f} questions/s)")
+        print(f"🎯 Retrieval hit rate: {s['retrieval_hit_rate']:.1%}   📚 Citation rate: {s['citation_rate']:.1%}   "
+              f"🔍 file_search used: {s['file_search_rate']:.1%}")
+        if s["answer_match_rate"] is not None:
+            print(f"✅ Answer match rate: {s['answer_match_rate']:.1%} "
+                  f"(mean recall of expected words {s['mean_answer_recall']:.1%}, {self.expected_answers} with expected answers)")
+        print(f"⏱️  Latency p50 {s['latency_p50_s']:.2f}s, p95 {s['latency_p95_s']:.2f}s, p99 {s['latency_p99_s']:.2f}s")
+        tokens_per_query = (s["prompt_tokens"] + s["completion_tokens"]) / (self.completed or 1)
+        if s["cost_usd"] is not None:
+            print(f"💰 {tokens_per_query:.0f} tokens/query, ${s['cost_per_query_usd']:.5f} per query, ${s['cost_usd']:.4f} total")
+        else:
+            print(f"💰 {tokens_per_query:.0f} tokens/query (no price known for this model)")
+        self.coverage.print_table()
+
+
+def score_row(question: EvalQuestion, result: dict, latency: float,
+              resolve_filename: Optional[Callable[[str], Optional[str]]]) -> dict:
+    """Flatten a query result into one output row with the evaluation fields."""
+    row = {"id": question.id, "question": question.question, "latency_s": round(latency, 3), **result}
+    row.pop("query", None)
+    if "response_length" not in result:
+        return row
+    cited = result.get("cited_file_ids", [])
+    if resolve_filename:
+        # One name per citation (repeats included) so coverage counts every citation.
+        row["cited_sources"] = [(resolve_filename(citation[0]) or citation[0]).lower()
+                                for citation in result.get("citations", [])]
+    if question.expected_source and resolve_filename:
+        row["expected_source"] = Path(question.expected_source).name.lower()
+        row["retrieval_hit"] = row["expected_source"] in row["cited_sources"]
+    else:
+        row["retrieval_hit"] = bool(result["file_search_used"] and cited)
+    if question.expected_answer:
+        recall = answer_recall(result.get("response", ""), question.expected_answer)
+        row["answer_recall"] = round(recall, 3)
+        row["answer_match"] = recall >= ANSWER_MATCH_THRESHOLD
+    row["cost_usd"] = cost_usd(result.get("model"), result.get("prompt_tokens", 0), result.get("completion_tokens", 0))
+    return row
+
+
+async def evaluate_async(assistant_id: str, questions: Iterable[EvalQuestion], build_prompt: Callable[[str], str],
+                         instructions: str, output_path: Path, concurrency: int = 8,
+                         query_timeout: Optional[float] = None,
+                         resolve_filename: Optional[Callable[[str], Optional[str]]] = None,
+                         delete_threads: bool = True, fast: bool = False, progress_every: int = 50) -> EvalSummary:
+    """Run every question with `concurrency` workers, appending one JSONL row per result to output_path."""
+    client = get_async_client()
+    # Recycled threads unless they are kept for inspection (or made by fast-path create_and_run):
+    # then one fresh thread per question.
+    pool = AsyncThreadPool(client, max_threads=max(1, concurrency), recycle=delete_threads and not fast,
+                           delete=delete_threads)
+    run_query = stream_query_async if fast else run_query_async
+    summary = EvalSummary()
+    pending = iter(questions)
+    start = time.monotonic()
+
+    async def evaluate_one(question: EvalQuestion) -> dict:
+        state = {"thread_id": "N/A"}
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(
+                run_query(client, pool, assistant_id, question.question, build_prompt(question.question),
+                          instructions, lambda line: None, state),
+                timeout=query_timeout,
+            )
+        except asyncio.TimeoutError:
+            result = {"status": "Timeout", "error": f"timed out after {query_timeout}s", "thread_id": state["thread_id"]}
+        except Exception as e:
+            result = {"status": "Exception", "error": str(e), "thread_id": state["thread_id"]}
+        latency = time.monotonic() - started
+        if resolve_filename:
+            # The resolver is sync and may call files.retrieve/list on a cache miss; off the loop,
+            # that blocks one worker thread instead of every concurrent query.
+            return await asyncio.to_thread(score_row, question, result, latency, resolve_filename)
+        return score_row(question, result, latency, resolve_filename)
+
+    with open(output_path, "w") as out:
+        async def worker():
+            for question in pending:  # workers share one iterator; next() never awaits, so no lock needed
+                row = await evaluate_one(question)
+                out.write(json.dumps(row) + "\n")
+                out.flush()
+                summary.add(row)
+                if progress_every and summary.total % progress_every == 0:
+                    elapsed = time.monotonic() - start
+                    print(f"  ... {summary.total} questions ({summary.failed} failed, "
+                          f"{summary.total / elapsed:.2f}/s, p95 {summary.latency.quantile(0.95):.1f}s)")
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+        finally:
+            await pool.close()
+            await client.close()
+    pool.print_stats()
+    summary.seconds = time.monotonic() - start
+    return summary
+
+
+def run_evaluation(assistant_id: str, dataset: Path, build_prompt: Callable[[str], str], instructions: str,
+                   output_path: Path, **kwargs) -> EvalSummary:
+    """Synchronous entry point: evaluate a dataset file and write <output>.summary.json next to the results."""
+    summary = asyncio.run(evaluate_async(assistant_id, load_questions(dataset), build_prompt, instructions,
+                                         output_path, **kwargs))
+    summary_path = output_path.with_suffix(".summary.json")
+    summary_path.write_text(json.dumps({"dataset": str(dataset), **summary.as_dict()}, indent=2))
+    return summary
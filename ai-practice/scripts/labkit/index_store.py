@@ -0,0 +1,243 @@
+"""
+Memory-mapped persistent index for the local retriever.
+
+Rebuilding the BM25 index from data/ on every run makes startup grow with the
+corpus. write_index() stores a built LocalRetriever as flat binary files, and
+MappedIndex.open() maps them with np.memmap: nothing is parsed or copied at
+start-up, pages are faulted in on demand, and several processes reading the
+same index share one copy in the OS page cache.
+
+Layout of an index directory:
+    meta.json            counts, BM25 parameters, source fingerprint, source names
+    chunk_offsets.u64    n+1 byte offsets into chunks.bin
+    chunks.bin           UTF-8 chunk texts, concatenated
+    chunk_source.u32     per-chunk index into meta["sources"]
+    chunk_page.u32       per-chunk page number
+    doc_lengths.u32      per-chunk token count
+    term_offsets.u64     T+1 byte offsets into terms.bin
+    terms.bin            UTF-8 vocabulary, sorted (binary-searched in place)
+    idf.f32              per-term IDF
+    posting_offsets.u64  T+1 offsets into the posting arrays
+    posting_docs.u32     chunk ids, grouped by term
+    posting_tfs.u32      term frequencies, parallel to posting_docs
+    embeddings.f32       optional n x dim dense matrix
+
+Requires numpy.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from labkit.local_retriever import Chunk, LOCAL_EXTENSIONS, LocalRetriever, hashed_embedding, tokenize
+from labkit.ingest import discover_documents
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+LOCAL_INDEX_DIR = PROJECT_ROOT / ".local_index"
+INDEX_FORMAT_VERSION = 1
+
+
+def _np():
+    try:
+        import numpy as np
+    except ImportError:
+        raise RuntimeError("numpy is required for the memory-mapped index: pip install numpy")
+    return np
+
+
+def fingerprint_sources(paths: Iterable[Path]) -> str:
+    """Cheap change detector for the indexed documents: names, sizes and mtimes."""
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        stat = path.stat()
+        digest.update(f"{path}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+
+def write_index(retriever: LocalRetriever, index_dir: Path, fingerprint: str = ""):
+    """Serialise a built retriever into index_dir (written to a temp dir, then swapped in)."""
+    np = _np()
+    tmp_dir = index_dir.with_name(index_dir.name + ".tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    tmp_dir.mkdir(parents=True)
+
+    def dump(name: str, values, dtype):
+        np.asarray(values, dtype=dtype).tofile(tmp_dir / name)
+
+    sources = sorted({c.source for c in retriever.chunks})
+    source_ids = {name: i for i, name in enumerate(sources)}
+    texts = [c.text.encode() for c in retriever.chunks]
+    with open(tmp_dir / "chunks.bin", "wb") as f:
+        for text in texts:
+            f.write(text)
+    dump("chunk_offsets.u64", np.concatenate([[0], np.cumsum([len(t) for t in texts])]), np.uint64)
+    dump("chunk_source.u32", [source_ids[c.source] for c in retriever.chunks], np.uint32)
+    dump("chunk_page.u32", [c.page for c in retriever.chunks], np.uint32)
+    dump("doc_lengths.u32", retriever.bm25.doc_lengths, np.uint32)
+
+    terms = sorted(retriever.bm25.postings)
+    encoded_terms = [t.encode() for t in terms]
+    with open(tmp_dir / "terms.bin", "wb") as f:
+        for term in encoded_terms:
+            f.write(term)
+    dump("term_offsets.u64", np.concatenate([[0], np.cumsum([len(t) for t in encoded_terms])]), np.uint64)
+    dump("idf.f32", [retriever.bm25.idf[t] for t in terms], np.float32)
+
+    postings = [retriever.bm25.postings[t] for t in terms]
+    dump("posting_offsets.u64", np.concatenate([[0], np.cumsum([len(p) for p in postings])]), np.uint64)
+    dump("posting_docs.u32", [doc for plist in postings for doc, _ in plist], np.uint32)
+    dump("posting_tfs.u32", [tf for plist in postings for _, tf in plist], np.uint32)
+
+    dim = 0
+    if retriever.matrix is not None:
+        matrix = np.ascontiguousarray(retriever.matrix, dtype=np.float32)
+        dim = matrix.shape[1]
+        matrix.tofile(tmp_dir / "embeddings.f32")
+
+    meta = {
+        "version": INDEX_FORMAT_VERSION,
+        "n_chunks": len(retriever.chunks),
+        "n_terms": len(terms),
+        "dim": dim,
+        "k1": retriever.bm25.k1,
+        "b": retriever.bm25.b,
+        "avg_length": retriever.bm25.avg_length,
+        "dense_weight": retriever.dense_weight,
+        "fingerprint": fingerprint,
+        "sources": sources,
+    }
+    (tmp_dir / "meta.json").write_text(json.dumps(meta, indent=2))
+
+    # Swap directories; readers holding the old maps keep the old inodes alive.
+    old_dir = index_dir.with_name(index_dir.name + ".old")
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if index_dir.exists():
+        os.replace(index_dir, old_dir)
+    os.replace(tmp_dir, index_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+class _ChunkView:
+    """Sequence of Chunk objects decoded lazily from the mapped files."""
+
+    def __init__(self, index: "MappedIndex"):
+        self._index = index
+
+    def __len__(self) -> int:
+        return self._index.n_chunks
+
+    def __getitem__(self, i: int) -> Chunk:
+        idx = self._index
+        start, end = int(idx.chunk_offsets[i]), int(idx.chunk_offsets[i + 1])
+        text = bytes(idx.chunks_blob[start:end]).decode()
+        return Chunk(i, idx.sources[int(idx.chunk_source[i])], int(idx.chunk_page[i]), text)
+
+
+class MappedIndex:
+    """Read-only BM25 (+ optional dense) index backed by np.memmap views."""
+
+    def __init__(self, index_dir: Path):
+        np = _np()
+        self.index_dir = index_dir
+        self.meta = json.loads((index_dir / "meta.json").read_text())
+        if self.meta.get("version") != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported index version in {index_dir}: {self.meta.get('version')}")
+        self.n_chunks = self.meta["n_chunks"]
+        self.sources: List[str] = self.meta["sources"]
+        self.k1, self.b, self.avg_length = self.meta["k1"], self.meta["b"], self.meta["avg_length"]
+        self.dense_weight = self.meta.get("dense_weight", 0.3)
+
+        def mapped(name: str, dtype, shape=None):
+            path = index_dir / name
+            if path.stat().st_size == 0:
+                return np.zeros(0, dtype=dtype)
+            return np.memmap(path, dtype=dtype, mode="r", shape=shape)
+
+        self.chunks_blob = mapped("chunks.bin", np.uint8)
+        self.chunk_offsets = mapped("chunk_offsets.u64", np.uint64)
+        self.chunk_source = mapped("chunk_source.u32", np.uint32)
+        self.chunk_page = mapped("chunk_page.u32", np.uint32)
+        self.doc_lengths = mapped("doc_lengths.u32", np.uint32)
+        self.terms_blob = mapped("terms.bin", np.uint8)
+        self.term_offsets = mapped("term_offsets.u64", np.uint64)
+        self.idf = mapped("idf.f32", np.float32)
+        self.posting_offsets = mapped("posting_offsets.u64", np.uint64)
+        self.posting_docs = mapped("posting_docs.u32", np.uint32)
+        self.posting_tfs = mapped("posting_tfs.u32", np.uint32)
+        self.matrix = None
+        if self.meta["dim"]:
+            self.matrix = mapped("embeddings.f32", np.float32, shape=(self.n_chunks, self.meta["dim"]))
+        self.chunks = _ChunkView(self)
+
+    @classmethod
+    def open(cls, index_dir: Path = LOCAL_INDEX_DIR) -> "MappedIndex":
+        return cls(index_dir)
+
+    def _term(self, i: int) -> bytes:
+        return bytes(self.terms_blob[int(self.term_offsets[i]):int(self.term_offsets[i + 1])])
+
+    def term_id(self, term: str) -> Optional[int]:
+        """Binary search the sorted vocabulary in place."""
+        target = term.encode()
+        lo, hi = 0, self.meta["n_terms"]
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._term(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < self.meta["n_terms"] and self._term(lo) == target else None
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[float, Chunk]]:
+        """Top-k chunks as (score, chunk); same scoring as LocalRetriever.search()."""
+        np = _np()
+        query_tokens = tokenize(query)
+        scores = np.zeros(self.n_chunks, dtype=np.float64)
+        for term in set(query_tokens):
+            t = self.term_id(term)
+            if t is None:
+                continue
+            start, end = int(self.posting_offsets[t]), int(self.posting_offsets[t + 1])
+            docs = self.posting_docs[start:end]
+            tfs = self.posting_tfs[start:end].astype(np.float64)
+            norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[docs] / (self.avg_length or 1))
+            np.add.at(scores, docs, float(self.idf[t]) * tfs * (self.k1 + 1) / (tfs + norm))
+
+        candidates = np.flatnonzero(scores)
+        if self.matrix is not None and self.n_chunks:
+            top_bm25 = float(scores.max()) or 1.0
+            cosine = np.asarray(self.matrix @ hashed_embedding(query_tokens, self.meta["dim"]))
+            dense_top = np.argsort(cosine)[-k * 4:]
+            blended = np.zeros_like(scores)
+            blended[candidates] = (1 - self.dense_weight) * scores[candidates] / top_bm25
+            blended[dense_top] += self.dense_weight * cosine[dense_top]
+            scores = blended
+            candidates = np.union1d(candidates, dense_top)
+
+        if candidates.size > k:
+            # Keep everything tied with the k-th best so ties resolve by chunk id, as in LocalRetriever.
+            kth_best = np.partition(scores[candidates], -k)[-k]
+            candidates = candidates[scores[candidates] >= kth_best]
+        ranked = candidates[np.lexsort((candidates, -scores[candidates]))][:k]
+        return [(float(scores[i]), self.chunks[int(i)]) for i in ranked]
+
+
+def load_or_build_index(data_dir: Path, index_dir: Path = LOCAL_INDEX_DIR, dense: bool = False,
+                        rebuild: bool = False) -> Tuple[MappedIndex, bool]:
+    """Open the on-disk index, rebuilding it first if the documents changed; returns (index, rebuilt)."""
+    paths = list(discover_documents(data_dir, LOCAL_EXTENSIONS))
+    fingerprint = fingerprint_sources(paths)
+    meta_path = index_dir / "meta.json"
+    if not rebuild and meta_path.exists():
+        try:
+            meta = json.loads(meta_path.read_text())
+            if (meta.get("version") == INDEX_FORMAT_VERSION and meta.get("fingerprint") == fingerprint
+                    and bool(meta.get("dim")) == dense):
+                return MappedIndex.open(index_dir), False
+        except ValueError:
+            pass
+    write_index(LocalRetriever.from_paths(paths, dense=dense), index_dir, fingerprint)
+    return MappedIndex.open(index_dir), True
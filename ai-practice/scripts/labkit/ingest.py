@@ -0,0 +1,259 @@
+"""
+Parallel, resumable bulk ingestion into a vector store.
+
+Pipeline for large document directories:
+  1. discover_documents() walks the tree recursively for every format
+     file_search accepts.
+  2. Files are hashed and uploaded by a bounded thread pool. Each upload
+     streams from an open file handle, so no file is ever read whole into
+     memory. File IDs reused from the manifest or checkpoint are checked
+     first and re-uploaded when the file was deleted remotely.
+  3. Uploaded file IDs are attached in vector-store file batches of
+     `batch_size` instead of one huge file_ids list. Batches are created
+     without waiting, so embedding overlaps the remaining uploads; all of
+     them are polled once the last upload is done.
+  4. Every finished upload and attached batch is appended to a JSONL
+     checkpoint (.ingest_checkpoint_<root hash>.jsonl, one per document
+     root), so a crash at file 2,000 resumes from file 2,001 with the same
+     vector store.
+
+Docs: https://platform.openai.com/docs/api-reference/vector-stores-file-batches
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+
+from labkit.polling import AdaptivePoller
+from labkit.upload_cache import UploadManifest, sha256_file
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+
+# Formats accepted by file_search.
+# Docs: https://platform.openai.com/docs/assistants/tools/file-search#supported-files
+SUPPORTED_EXTENSIONS = {
+    ".pdf", ".md", ".txt", ".docx", ".pptx", ".html", ".json", ".tex",
+    ".c", ".cpp", ".cs", ".css", ".go", ".java", ".js", ".php", ".py",
+    ".rb", ".sh", ".ts",
+}
+
+
+def discover_documents(root: Path, extensions: Iterable[str] = SUPPORTED_EXTENSIONS,
+                       recursive: bool = True) -> Iterator[Path]:
+    """Yield supported documents under root in a stable (sorted) order, skipping hidden files."""
+    extensions = {ext.lower() for ext in extensions}
+    candidates = root.rglob("*") if recursive else root.glob("*")
+    for path in sorted(candidates):
+        if path.is_file() and path.suffix.lower() in extensions and not path.name.startswith("."):
+            yield path
+
+
+def checkpoint_path_for(root: Path) -> Path:
+    """Checkpoint file of one document root, so ingesting another directory never resumes this one."""
+    digest = hashlib.sha256(str(root.resolve()).encode()).hexdigest()[:12]
+    return PROJECT_ROOT / f".ingest_checkpoint_{digest}.jsonl"
+
+
+class IngestCheckpoint:
+    """Append-only JSONL log of uploads and attached batches for one ingestion."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.vector_store_id: Optional[str] = None
+        self.uploaded: Dict[str, str] = {}  # sha256 -> file_id
+        self.attached: Set[str] = set()     # file_ids already in the vector store
+        self._lock = threading.Lock()
+        if path.exists():
+            for line in path.read_text().splitlines():
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # torn last line from a crash
+                self._apply(record)
+
+    def _apply(self, record: dict):
+        event = record.get("event")
+        if event == "vector_store":
+            self.vector_store_id = record["vector_store_id"]
+        elif event == "uploaded":
+            self.uploaded[record["sha256"]] = record["file_id"]
+        elif event == "attached":
+            self.attached.update(record["file_ids"])
+
+    def append(self, record: dict):
+        with self._lock:
+            self._apply(record)
+            with open(self.path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    def clear(self):
+        if self.path.exists():
+            self.path.unlink()
+
+
+@dataclass
+class IngestReport:
+    """Counts and throughput for one bulk ingestion."""
+    discovered: int = 0
+    skipped: int = 0
+    uploaded: int = 0
+    failed: int = 0
+    bytes_uploaded: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+    file_ids: List[str] = field(default_factory=list)
+
+    def print_summary(self):
+        mb = self.bytes_uploaded / 1e6
+        rate = mb / self.seconds if self.seconds else 0.0
+        files_rate = self.uploaded / self.seconds if self.seconds else 0.0
+        print(f"📦 Ingested {self.discovered} documents in {self.seconds:.1f}s: "
+              f"{self.uploaded} uploaded, {self.skipped} skipped, {self.failed} failed, {self.batches} batch(es)")
+        print(f"🚚 Throughput: {mb:.1f} MB at {rate:.2f} MB/s, {files_rate:.1f} files/s")
+
+
+def _file_exists(client, file_id: str) -> bool:
+    import openai
+
+    try:
+        client.files.retrieve(file_id)
+    except openai.NotFoundError:
+        return False
+    return True
+
+
+def _upload_one(client, path: Path, checkpoint: IngestCheckpoint, manifest: Optional[UploadManifest]):
+    sha256 = sha256_file(path)
+    file_id = checkpoint.uploaded.get(sha256)
+    if file_id is None and manifest is not None:
+        entry = manifest.get(sha256)
+        file_id = entry["file_id"] if entry else None
+    if file_id is not None and (file_id in checkpoint.attached or _file_exists(client, file_id)):
+        return path, sha256, file_id, 0
+    with open(path, "rb") as file_data:  # streamed by the HTTP client, never read whole
+        uploaded_file = client.files.create(file=(path.name, file_data), purpose="assistants")
+    checkpoint.append({"event": "uploaded", "sha256": sha256, "file_id": uploaded_file.id, "path": str(path)})
+    return path, sha256, uploaded_file.id, path.stat().st_size
+
+
+def wait_for_file_batches(client, vector_store_id: str, batches: list) -> list:
+    """Poll every in-progress batch until it is processed; they embed concurrently, so this takes about the slowest one."""
+    poller = AdaptivePoller("vector_stores.file_batches.retrieve", baseline_interval=5.0, max_interval=15.0, deadline=3600.0)
+    finished = []
+    for batch in batches:
+        if batch.status == "in_progress":
+            batch = poller.poll(
+                lambda batch_id=batch.id: client.vector_stores.file_batches.retrieve(
+                    batch_id=batch_id, vector_store_id=vector_store_id),
+                is_done=lambda b: b.status != "in_progress"
+            )
+        if batch.file_counts.failed:
+            print(f"  ⚠️  {batch.file_counts.failed} file(s) in batch {batch.id} failed to process.")
+        finished.append(batch)
+    return finished
+
+
+def bulk_ingest(client, paths: Iterable[Path], vector_store_id: str, checkpoint: IngestCheckpoint,
+                manifest: Optional[UploadManifest] = None, max_workers: int = 8,
+                batch_size: int = 100, progress_every: int = 25) -> IngestReport:
+    """Upload `paths` with bounded parallelism and attach them to `vector_store_id` in batches."""
+    report = IngestReport()
+    start = time.monotonic()
+    to_attach: List[str] = []
+    attached_shas: List[str] = []
+    batches = []
+
+    def flush(force: bool = False):
+        """Create file batches for what is queued, without waiting for them to be embedded."""
+        nonlocal to_attach
+        while to_attach and (force or len(to_attach) >= batch_size):
+            chunk, to_attach = to_attach[:batch_size], to_attach[batch_size:]
+            batches.append(client.vector_stores.file_batches.create(vector_store_id=vector_store_id, file_ids=chunk))
+            checkpoint.append({"event": "attached", "vector_store_id": vector_store_id, "file_ids": chunk})
+            report.batches += 1
+            if manifest is not None:
+                manifest.save()  # keep the recorded uploads even if a later step crashes
+
+    def handle(future, path: Path):
+        try:
+            _, sha256, file_id, size = future.result()
+        except Exception as e:
+            report.failed += 1
+            print(f"  ❌ Error uploading {path}: {e}")
+            return
+        report.file_ids.append(file_id)
+        if size:
+            report.uploaded += 1
+            report.bytes_uploaded += size
+        else:
+            report.skipped += 1
+        if manifest is not None and (manifest.get(sha256) or {}).get("file_id") != file_id:
+            manifest.record_upload(sha256, path, file_id)  # new upload, or a re-upload of a deleted file
+        if file_id not in checkpoint.attached and file_id not in to_attach:
+            to_attach.append(file_id)
+        attached_shas.append(sha256)
+        done = report.uploaded + report.skipped + report.failed
+        if done % progress_every == 0:
+            elapsed = time.monotonic() - start
+            print(f"  ... {done}/{report.discovered}+ files ({report.uploaded} uploaded, "
+                  f"{report.bytes_uploaded / 1e6 / max(elapsed, 1e-9):.2f} MB/s)")
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest") as pool:
+        in_flight = {}
+        for path in paths:
+            report.discovered += 1
+            in_flight[pool.submit(_upload_one, client, path, checkpoint, manifest)] = path
+            if len(in_flight) >= max_workers * 2:  # bounded window: never queue the whole corpus
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    handle(future, in_flight.pop(future))
+                flush()
+        for future in list(in_flight):
+            handle(future, in_flight.pop(future))
+    flush(force=True)
+    wait_for_file_batches(client, vector_store_id, batches)
+    if manifest is not None:
+        ready = [sha for sha in attached_shas if manifest.get(sha)["file_id"] in checkpoint.attached]
+        manifest.set_vector_store(ready, vector_store_id)
+        manifest.save()
+
+    report.seconds = time.monotonic() - start
+    return report
+
+
+def ingest_directory(client, root: Path, vector_store_name: str, max_workers: int = 8, batch_size: int = 100,
+                     manifest: Optional[UploadManifest] = None, checkpoint_path: Optional[Path] = None):
+    """
+    Ingest every supported document under root into a vector store, resuming an interrupted run.
+
+    Returns (vector_store, report). The checkpoint is removed once everything is attached.
+    """
+    checkpoint = IngestCheckpoint(checkpoint_path or checkpoint_path_for(root))
+    if checkpoint.vector_store_id:
+        print(f"🔁 Resuming ingestion into Vector Store {checkpoint.vector_store_id} "
+              f"({len(checkpoint.uploaded)} files already uploaded)")
+        vector_store_id = checkpoint.vector_store_id
+    else:
+        vector_store = client.vector_stores.create(
+            name=vector_store_name,
+            expires_after={"anchor": "last_active_at", "days": 1}
+        )
+        vector_store_id = vector_store.id
+        checkpoint.append({"event": "vector_store", "vector_store_id": vector_store_id})
+        print(f"🗂️  Created Vector Store '{vector_store_name}' ({vector_store_id})")
+
+    report = bulk_ingest(client, discover_documents(root), vector_store_id, checkpoint, manifest,
+                         max_workers=max_workers, batch_size=batch_size)
+    if report.failed == 0:
+        checkpoint.clear()
+    else:
+        print(f"⚠️  {report.failed} file(s) failed; re-run to retry them (checkpoint kept at {checkpoint.path}).")
+    return client.vector_stores.retrieve(vector_store_id=vector_store_id), report
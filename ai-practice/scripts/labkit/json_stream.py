@@ -0,0 +1,203 @@
+"""
+Incremental validation of streamed JSON against a Pydantic model.
+
+JSON mode answers arrive as text deltas. Instead of waiting for the whole
+message, stripping code fences and round-tripping through json.loads and
+Model(**data), IncrementalJSONValidator scans each delta once:
+  * leading whitespace and a ```json fence are skipped; any other text
+    before the opening brace is a violation right away,
+  * every top-level field is validated as soon as its value is complete,
+    with a cached per-field TypeAdapter on the raw JSON slice
+    (validate_json, no intermediate dict),
+  * when the object closes, missing required fields are reported and the
+    whole object is validated once with Model.model_validate_json.
+
+A violation raises SchemaViolation. Inside a StreamPipeline, the
+schema_validator consumer turns it into StreamAborted, which stops the stream
+and cancels the run, so tokens past the first bad field are not paid for.
+pydantic itself is only imported once a model is validated.
+
+Usage:
+    validator = IncrementalJSONValidator(LectureSummary)
+    result = await stream_run(client, [schema_validator(validator)], thread_id=..., assistant_id=...)
+    summary = validator.finish()   # the validated model, or SchemaViolation
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import re
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Optional, Type
+
+from labkit.streaming import StreamAborted, TextDelta
+
+if TYPE_CHECKING:
+    from pydantic import BaseModel, TypeAdapter, ValidationError
+
+_FENCE_RE = re.compile(r"```[A-Za-z]*")
+
+
+class SchemaViolation(ValueError):
+    """Streamed output that cannot become a valid model instance."""
+
+    def __init__(self, message: str, field: Optional[str] = None):
+        super().__init__(f"{field}: {message}" if field else message)
+        self.field = field
+
+
+@lru_cache(maxsize=None)
+def field_adapters(model: Type[BaseModel]) -> Dict[str, TypeAdapter]:
+    """One TypeAdapter per model field, built once per model."""
+    from pydantic import TypeAdapter
+
+    return {name: TypeAdapter(info.annotation) for name, info in model.model_fields.items()}
+
+
+def _first_error(error: ValidationError) -> str:
+    first = error.errors()[0]
+    location = ".".join(str(part) for part in first.get("loc", ()))
+    return f"{first['msg']}" + (f" (at {location})" if location else "")
+
+
+class IncrementalJSONValidator:
+    """Feed text deltas with feed(); get the validated model from finish()."""
+
+    def __init__(self, model: Type[BaseModel]):
+        self.model = model
+        self.adapters = field_adapters(model)
+        self.required = {name for name, info in model.model_fields.items() if info.is_required()}
+        self.forbid_extra = model.model_config.get("extra") == "forbid"
+        self.valid_fields: Dict[str, object] = {}
+        self.chars = 0
+        self._prefix = ""
+        self._text = io.StringIO()   # the object text from its opening brace
+        self._pos = 0                # offset of the next character in _text
+        self._started = self._closed = False
+        self._depth = 0
+        self._in_string = self._escape = False
+        self._key_start: Optional[int] = None
+        self._key: Optional[str] = None
+        self._value_start: Optional[int] = None
+        self._value: Optional[BaseModel] = None
+
+    def feed(self, text: str):
+        """Consume one delta; raises SchemaViolation as soon as the output goes wrong."""
+        self.chars += len(text)
+        if self._closed:
+            return  # a closing fence or trailing whitespace
+        if not self._started:
+            brace = text.find("{")
+            self._check_prefix(self._prefix + (text if brace < 0 else text[:brace]))
+            if brace < 0:
+                self._prefix += text
+                return
+            self._started = True
+            text = text[brace:]
+        start = self._pos
+        self._text.write(text)
+        self._scan(text, start)
+
+    def _check_prefix(self, prefix: str):
+        stripped = prefix.lstrip()
+        if not stripped or "```".startswith(stripped):
+            return
+        fence, newline, rest = stripped.partition("\n")
+        if _FENCE_RE.fullmatch(fence.rstrip()) and not rest.strip():
+            return
+        raise SchemaViolation(f"expected a JSON object, got {stripped[:40]!r}")
+
+    def _scan(self, text: str, start: int):
+        for offset, char in enumerate(text):
+            pos = start + offset
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._key_start is not None and self._key is None:
+                        self._key = json.loads(self._slice(self._key_start, pos + 1))
+                        self._check_key(self._key)
+                continue
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1 and self._value_start is None and self._key is None:
+                    self._key_start = pos
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._complete_field(pos)
+                    self._close(pos + 1)
+                    return
+            elif self._depth == 1 and char == ":" and self._key is not None:
+                self._value_start = pos + 1
+            elif self._depth == 1 and char == ",":
+                self._complete_field(pos)
+        self._pos = start + len(text)
+
+    def _slice(self, start: int, end: int) -> str:
+        text = self._text.getvalue()
+        return text[start:end]
+
+    def _check_key(self, key: str):
+        if key not in self.adapters and self.forbid_extra:
+            raise SchemaViolation("unexpected field", key)
+
+    def _complete_field(self, end: int):
+        if self._key is None or self._value_start is None:
+            self._key_start = self._key = self._value_start = None
+            return
+        key, raw = self._key, self._slice(self._value_start, end)
+        self._key_start = self._key = self._value_start = None
+        adapter = self.adapters.get(key)
+        if adapter is None:
+            return
+        from pydantic import ValidationError
+
+        try:
+            self.valid_fields[key] = adapter.validate_json(raw)
+        except ValidationError as e:
+            raise SchemaViolation(_first_error(e), key) from None
+
+    def _close(self, end: int):
+        self._closed = True
+        missing = sorted(self.required - self.valid_fields.keys())
+        if missing:
+            raise SchemaViolation(f"missing required field(s): {', '.join(missing)}")
+        from pydantic import ValidationError
+
+        try:
+            self._value = self.model.model_validate_json(self._slice(0, end))
+        except ValidationError as e:
+            raise SchemaViolation(_first_error(e)) from None
+
+    def finish(self) -> BaseModel:
+        """The validated model; SchemaViolation if the stream ended before the object closed."""
+        if not self._started:
+            raise SchemaViolation("no JSON object in the output")
+        if not self._closed:
+            raise SchemaViolation(f"output ended inside the JSON object after {self.chars} characters")
+        return self._value
+
+
+def validate_text(model: Type[BaseModel], text: str) -> BaseModel:
+    """Validate a complete (possibly fenced) answer through the same path as a stream."""
+    validator = IncrementalJSONValidator(model)
+    validator.feed(text)
+    return validator.finish()
+
+
+async def schema_validator(validator: IncrementalJSONValidator):
+    """Consumer feeding text deltas to `validator`; aborts the stream on the first violation."""
+    while True:
+        event = yield
+        if isinstance(event, TextDelta):
+            try:
+                validator.feed(event.text)
+            except SchemaViolation as e:
+                raise StreamAborted(str(e)) from e
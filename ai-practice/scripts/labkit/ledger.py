@@ -0,0 +1,193 @@
+"""
+Local ledger of the API resources the lab scripts create.
+
+Cleanup and usage reports used to list every thread, file and vector store
+on the account and filter by created_at, which costs O(account size) list
+calls and cannot see threads at all (there is no public thread listing).
+Instead, the shared clients wrap their HTTP transport with LedgerTransport
+(labkit.transports), which records every resource as it is created and marks
+it when deleted:
+  * POST /threads, POST /threads/runs (the run's thread), POST /files and
+    POST /vector_stores append (id, kind, created_at, script, label, purpose),
+  * DELETE /threads|files|vector_stores/{id} answering 2xx or 404 marks the
+    row deleted, so deletes made anywhere (evaluation, 99_cleanup, ...) keep
+    the ledger current.
+
+The ledger is a small SQLite file (.resource_ledger.sqlite) indexed by
+(kind, created_at), so 99_cleanup.py pages through only what we created,
+oldest first, and usage is a COUNT(*). Streamed create-and-run responses
+are not buffered here; labkit.rag records their threads from the stream's
+run-created event instead.
+"""
+
+import json
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+RESOURCE_LEDGER_FILE = PROJECT_ROOT / ".resource_ledger.sqlite"
+LEDGER_KINDS = ("threads", "files", "vector_stores")
+_MAX_CREATE_BODY = 64 * 1024  # create responses are tiny; never buffer anything bigger
+
+
+@dataclass
+class LedgerEntry:
+    """One recorded resource; quacks like the API object for the sweeper (id, created_at)."""
+    id: str
+    kind: str
+    created_at: int
+    script: str
+    label: Optional[str] = None
+    purpose: Optional[str] = None
+
+    def describe(self) -> str:
+        return f"{self.id} ({self.label})" if self.label else self.id
+
+
+@dataclass
+class LedgerPage:
+    """A page of ledger entries with the has_next_page() of an SDK cursor page."""
+    data: List[LedgerEntry]
+    more: bool
+
+    def has_next_page(self) -> bool:
+        return self.more
+
+
+class ResourceLedger:
+    """SQLite table of created resources, written from any thread."""
+
+    def __init__(self, path: Path = RESOURCE_LEDGER_FILE, script: Optional[str] = None):
+        self.path = path
+        self.script = script or (Path(sys.argv[0]).stem if sys.argv and sys.argv[0] else "python")
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # Opened on first use so processes that create nothing never touch the file.
+        if self._db is None:
+            self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS resources ("
+                " id TEXT PRIMARY KEY, kind TEXT NOT NULL, created_at INTEGER NOT NULL,"
+                " script TEXT, label TEXT, purpose TEXT, deleted_at REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS resources_live ON resources(kind, deleted_at, created_at, id)")
+            self._db.commit()
+        return self._db
+
+    def record(self, kind: str, resource_id: str, created_at: Optional[int] = None,
+               label: Optional[str] = None, purpose: Optional[str] = None):
+        with self._lock:
+            db = self._connect()
+            db.execute(
+                "INSERT OR IGNORE INTO resources (id, kind, created_at, script, label, purpose)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (resource_id, kind, int(created_at or time.time()), self.script, label, purpose),
+            )
+            db.commit()
+
+    def mark_deleted(self, resource_id: str):
+        with self._lock:
+            db = self._connect()
+            db.execute("UPDATE resources SET deleted_at = ? WHERE id = ? AND deleted_at IS NULL",
+                       (time.time(), resource_id))
+            db.commit()
+
+    def page(self, kind: str, after: Optional[str] = None, limit: int = 100,
+             purpose: Optional[str] = None) -> LedgerPage:
+        """Live entries of `kind`, oldest first, after the entry `after` (keyset pagination)."""
+        sql = "SELECT id, kind, created_at, script, label, purpose FROM resources WHERE kind = ? AND deleted_at IS NULL"
+        params: list = [kind]
+        if purpose is not None:
+            sql += " AND purpose = ?"
+            params.append(purpose)
+        with self._lock:
+            db = self._connect()
+            anchor = db.execute("SELECT created_at, id FROM resources WHERE id = ?", (after,)).fetchone() if after else None
+            if anchor is not None:  # an unknown cursor restarts from the oldest entry
+                sql += " AND (created_at > ? OR (created_at = ? AND id > ?))"
+                params += [anchor[0], anchor[0], anchor[1]]
+            sql += " ORDER BY created_at, id LIMIT ?"
+            rows = db.execute(sql, params + [limit + 1]).fetchall()
+        return LedgerPage([LedgerEntry(*row) for row in rows[:limit]], more=len(rows) > limit)
+
+    def counts(self) -> Dict[str, Dict[str, Optional[int]]]:
+        """Per kind: live and deleted counts and the oldest live created_at."""
+        summary = {kind: {"live": 0, "deleted": 0, "oldest": None} for kind in LEDGER_KINDS}
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT kind, deleted_at IS NULL, COUNT(*), MIN(created_at) FROM resources GROUP BY kind, deleted_at IS NULL"
+            ).fetchall()
+        for kind, live, count, oldest in rows:
+            entry = summary.setdefault(kind, {"live": 0, "deleted": 0, "oldest": None})
+            if live:
+                entry["live"], entry["oldest"] = count, oldest
+            else:
+                entry["deleted"] = count
+        return summary
+
+    def purge_deleted(self, older_than_seconds: float = 7 * 24 * 3600) -> int:
+        """Drop rows for resources deleted more than `older_than_seconds` ago."""
+        with self._lock:
+            db = self._connect()
+            cursor = db.execute("DELETE FROM resources WHERE deleted_at < ?", (time.time() - older_than_seconds,))
+            db.commit()
+        return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_ledger: Optional[ResourceLedger] = None
+
+
+def get_ledger() -> ResourceLedger:
+    """The process-wide ledger backed by .resource_ledger.sqlite."""
+    global _ledger
+    if _ledger is None:
+        _ledger = ResourceLedger()
+    return _ledger
+
+
+def _api_segments(path: str) -> List[str]:
+    return [s for s in path.split("/") if s and s != "v1"]
+
+
+def _observe(ledger: ResourceLedger, request, response) -> bool:
+    """Record creates and deletes; returns True when the body must be read first."""
+    segments = _api_segments(request.url.path)
+    if request.method == "DELETE":
+        if len(segments) == 2 and segments[0] in LEDGER_KINDS and (response.is_success or response.status_code == 404):
+            ledger.mark_deleted(segments[1])
+        return False
+    # A body of unknown length (chunked or compressed) is never buffered here.
+    length = response.headers.get("content-length")
+    return (request.method == "POST" and response.is_success
+            and segments in (["threads"], ["threads", "runs"], ["files"], ["vector_stores"])
+            and "json" in response.headers.get("content-type", "")
+            and length is not None and length.isdigit() and int(length) <= _MAX_CREATE_BODY)
+
+
+def _record_created(ledger: ResourceLedger, request, response):
+    try:
+        body = json.loads(response.content)
+    except ValueError:
+        return
+    segments = _api_segments(request.url.path)
+    if segments == ["threads", "runs"]:
+        if body.get("thread_id"):
+            ledger.record("threads", body["thread_id"], body.get("created_at"), label=body.get("assistant_id"))
+    elif body.get("id"):
+        ledger.record(segments[0], body["id"], body.get("created_at"),
+                      label=body.get("filename") or body.get("name"), purpose=body.get("purpose"))
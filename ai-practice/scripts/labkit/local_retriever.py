@@ -0,0 +1,166 @@
+"""
+Local, offline retrieval engine.
+
+An in-process alternative to the hosted file_search tool for iterating on
+retrieval quality without network round trips:
+  * extract_text() pulls text out of the documents in data/ (PDFs via pypdf,
+    plain-text formats directly),
+  * chunk_text() splits it into overlapping word windows,
+  * BM25Index ranks chunks lexically; with NumPy installed, a hashed
+    bag-of-words embedding adds an optional dense score,
+  * LocalRetriever.search() answers top-k queries in milliseconds.
+
+Optional dependencies: pypdf (PDF text), numpy (dense vectors).
+"""
+
+import hashlib
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from labkit.ingest import discover_documents
+
+TEXT_EXTENSIONS = {".md", ".txt", ".html", ".json", ".tex", ".py", ".c", ".cpp", ".java", ".js", ".ts"}
+LOCAL_EXTENSIONS = TEXT_EXTENSIONS | {".pdf"}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased alphanumeric tokens."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+def extract_text(path: Path) -> List[Tuple[int, str]]:
+    """Return (page_number, text) pairs; plain-text files are a single page 1."""
+    if path.suffix.lower() == ".pdf":
+        try:
+            from pypdf import PdfReader
+        except ImportError:
+            raise RuntimeError("pypdf is required to index PDFs locally: pip install pypdf")
+        reader = PdfReader(str(path))
+        return [(i, page.extract_text() or "") for i, page in enumerate(reader.pages, 1)]
+    return [(1, path.read_text(errors="ignore"))]
+
+
+def chunk_text(text: str, chunk_words: int = 200, overlap_words: int = 50) -> List[str]:
+    """Split text into windows of `chunk_words` words, each overlapping the previous by `overlap_words`."""
+    words = text.split()
+    if not words:
+        return []
+    step = max(1, chunk_words - overlap_words)
+    chunks = []
+    for start in range(0, len(words), step):
+        chunks.append(" ".join(words[start:start + chunk_words]))
+        if start + chunk_words >= len(words):
+            break
+    return chunks
+
+
+@dataclass
+class Chunk:
+    """One retrievable passage and where it came from."""
+    chunk_id: int
+    source: str
+    page: int
+    text: str
+
+
+class BM25Index:
+    """Okapi BM25 over an in-memory inverted index."""
+
+    def __init__(self, documents: List[List[str]], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_lengths = [len(tokens) for tokens in documents]
+        self.avg_length = (sum(self.doc_lengths) / len(documents)) if documents else 0.0
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        for doc_id, tokens in enumerate(documents):
+            for term, tf in Counter(tokens).items():
+                self.postings[term].append((doc_id, tf))
+        n = len(documents)
+        self.idf = {
+            term: math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self.postings.items()
+        }
+
+    def scores(self, query_tokens: Iterable[str]) -> Dict[int, float]:
+        scores: Dict[int, float] = defaultdict(float)
+        for term in set(query_tokens):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / (self.avg_length or 1))
+                scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+
+def hashed_embedding(tokens: List[str], dim: int = 512):
+    """Signed hashing-trick embedding of unigrams and bigrams, L2-normalised (NumPy float32)."""
+    import numpy as np
+
+    vector = np.zeros(dim, dtype=np.float32)
+    features = tokens + [f"{a}_{b}" for a, b in zip(tokens, tokens[1:])]
+    for feature in features:
+        digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+        h = int.from_bytes(digest, "little")
+        vector[h % dim] += 1.0 if (h >> 63) & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class LocalRetriever:
+    """BM25 retrieval with an optional dense (NumPy) re-scoring term."""
+
+    def __init__(self, chunks: List[Chunk], dense: bool = False, dense_weight: float = 0.3,
+                 embed: Optional[Callable[[List[str]], object]] = None):
+        self.chunks = chunks
+        tokenized = [tokenize(c.text) for c in chunks]
+        self.bm25 = BM25Index(tokenized)
+        self.dense_weight = dense_weight
+        self.embed = embed or hashed_embedding
+        self.matrix = None
+        if dense:
+            import numpy as np
+            self.matrix = np.vstack([self.embed(tokens) for tokens in tokenized]) if chunks else None
+
+    @classmethod
+    def from_paths(cls, paths: Iterable[Path], chunk_words: int = 200, overlap_words: int = 50, **kwargs):
+        chunks: List[Chunk] = []
+        for path in paths:
+            for page, text in extract_text(path):
+                for piece in chunk_text(text, chunk_words, overlap_words):
+                    chunks.append(Chunk(len(chunks), path.name, page, piece))
+        return cls(chunks, **kwargs)
+
+    @classmethod
+    def from_directory(cls, root: Path, **kwargs):
+        return cls.from_paths(discover_documents(root, LOCAL_EXTENSIONS), **kwargs)
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[float, Chunk]]:
+        """Top-k chunks for the query as (score, chunk), best first."""
+        query_tokens = tokenize(query)
+        scores = self.bm25.scores(query_tokens)
+        if self.matrix is not None and len(self.chunks):
+            # Blend max-normalised BM25 with cosine similarity over every chunk.
+            top_bm25 = max(scores.values()) if scores else 1.0
+            cosine = self.matrix @ self.embed(query_tokens)
+            blended = {i: (1 - self.dense_weight) * s / top_bm25 for i, s in scores.items()}
+            for i in cosine.argsort()[-k * 4:]:
+                blended[int(i)] = blended.get(int(i), 0.0) + self.dense_weight * float(cosine[i])
+            scores = blended
+        best = heapq.nlargest(k, scores.items(), key=lambda item: (item[1], -item[0]))  # ties by chunk id
+        return [(score, self.chunks[i]) for i, score in best]
+
+
+def format_context(results: List[Tuple[float, Chunk]]) -> str:
+    """Render retrieved chunks as a numbered context block for the model prompt."""
+    return "\n\n".join(
+        f"[{n}] ({chunk.source}, page {chunk.page})\n{chunk.text}"
+        for n, (_, chunk) in enumerate(results, 1)
+    )
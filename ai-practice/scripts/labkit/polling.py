@@ -0,0 +1,247 @@
+"""
+Adaptive polling scheduler.
+
+Replaces fixed-interval `while ...: time.sleep(n)` loops. The poller backs off
+exponentially (with jitter, a cap and a deadline) and learns how long each
+kind of operation usually takes, so it sleeps through the quiet part of a wait
+and polls densely around the expected completion time.
+
+Learned durations are kept in .poll_stats.json at the project root so they
+carry over between runs; the file is rewritten every `save_every`
+observations and once at exit, not after every poll. Counters compare the polls issued with what the old
+fixed-interval loop would have needed and estimate the latency saved.
+
+Usage:
+    poller = AdaptivePoller("runs.retrieve", baseline_interval=1.0)
+    run = poller.poll(lambda: client.beta.threads.runs.retrieve(...),
+                      is_done=lambda r: r.status not in ("queued", "in_progress"))
+"""
+
+import asyncio
+import atexit
+import json
+import math
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+POLL_STATS_FILE = PROJECT_ROOT / ".poll_stats.json"
+
+
+class PollTimeout(TimeoutError):
+    """Raised when an operation is still pending at the poller's deadline."""
+
+    def __init__(self, operation: str, deadline: float, last_result=None):
+        super().__init__(f"{operation} did not finish within {deadline:.0f}s")
+        self.last_result = last_result
+
+
+@dataclass
+class PollCounters:
+    """Per-operation counters: polls issued vs. a fixed-interval baseline."""
+    waits: int = 0
+    polls: int = 0
+    baseline_polls: int = 0
+    latency_saved: float = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "waits": self.waits,
+            "polls": self.polls,
+            "baseline_polls": self.baseline_polls,
+            "latency_saved_s": round(self.latency_saved, 3),
+        }
+
+
+class DurationStats:
+    """Exponentially weighted average of observed durations per operation, persisted as JSON."""
+
+    def __init__(self, path: Optional[Path] = POLL_STATS_FILE, alpha: float = 0.3, save_every: int = 20):
+        self.path = path
+        self.alpha = alpha
+        self.save_every = save_every
+        self._lock = threading.Lock()
+        self._expected: Dict[str, float] = {}
+        self._unsaved = 0
+        if path and path.exists():
+            try:
+                self._expected = {k: float(v) for k, v in json.loads(path.read_text()).items()}
+            except (ValueError, OSError):
+                self._expected = {}
+        if path:
+            atexit.register(self.save)
+
+    def expected(self, operation: str) -> Optional[float]:
+        return self._expected.get(operation)
+
+    def observe(self, operation: str, duration: float):
+        with self._lock:
+            previous = self._expected.get(operation)
+            if previous is None:
+                self._expected[operation] = duration
+            else:
+                self._expected[operation] = (1 - self.alpha) * previous + self.alpha * duration
+            self._unsaved += 1
+            if self._unsaved >= self.save_every:
+                self._save_locked()
+
+    def save(self):
+        """Write pending observations (temp file + rename, so readers never see a partial file)."""
+        with self._lock:
+            self._save_locked()
+
+    def _save_locked(self):
+        if not self.path or not self._unsaved:
+            return
+        tmp_path = self.path.with_suffix(f"{self.path.suffix}.{os.getpid()}.tmp")
+        try:
+            tmp_path.write_text(json.dumps(self._expected, indent=2, sort_keys=True))
+            os.replace(tmp_path, self.path)
+            self._unsaved = 0
+        except OSError:
+            pass
+
+
+_default_stats: Optional[DurationStats] = None
+_default_stats_lock = threading.Lock()
+_counters: Dict[str, PollCounters] = {}
+_counters_lock = threading.Lock()
+
+
+def default_stats() -> DurationStats:
+    """Return the shared, file-backed duration stats."""
+    global _default_stats
+    with _default_stats_lock:
+        if _default_stats is None:
+            _default_stats = DurationStats()
+    return _default_stats
+
+
+def set_default_stats(stats: DurationStats):
+    """Replace the shared stats (e.g. with DurationStats(path=None) to keep benchmarks off disk)."""
+    global _default_stats
+    _default_stats = stats
+
+
+def reset_poll_counters():
+    """Forget the counters collected so far in this process."""
+    with _counters_lock:
+        _counters.clear()
+
+
+def poll_counters() -> Dict[str, dict]:
+    """Snapshot of the counters for every operation polled in this process."""
+    with _counters_lock:
+        return {op: c.as_dict() for op, c in _counters.items()}
+
+
+def print_poll_summary():
+    """Print polls issued vs. the fixed-interval baseline for each operation."""
+    for operation, c in poll_counters().items():
+        print(f"📈 {operation}: {c['polls']} polls over {c['waits']} wait(s) "
+              f"(fixed interval: ~{c['baseline_polls']}), est. latency saved {c['latency_saved_s']:.2f}s")
+
+
+class AdaptivePoller:
+    """Backoff-with-jitter poller that concentrates polls around the learned completion time."""
+
+    def __init__(self, operation: str, min_interval: float = 0.25, max_interval: float = 10.0,
+                 factor: float = 1.6, jitter: float = 0.2, deadline: Optional[float] = 600.0,
+                 baseline_interval: float = 1.0, stats: Optional[DurationStats] = None):
+        self.operation = operation
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.factor = factor
+        self.jitter = jitter
+        self.deadline = deadline
+        self.baseline_interval = baseline_interval
+        self.stats = stats if stats is not None else default_stats()
+
+    def next_interval(self, elapsed: float, overdue_polls: int, expected: Optional[float]) -> float:
+        """
+        Seconds to wait before the next poll.
+
+        `overdue_polls` counts polls already made past the expected duration
+        (or all polls when nothing has been learned yet) and drives the backoff.
+        """
+        if expected is not None and elapsed < expected:
+            # Halve the remaining distance to the expected finish: sparse early, dense near it.
+            interval = (expected - elapsed) / 2
+        else:
+            interval = self.min_interval * (self.factor ** overdue_polls)
+        interval = min(self.max_interval, max(self.min_interval, interval))
+        interval *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        if self.deadline is not None:
+            interval = max(0.0, min(interval, self.deadline - elapsed))
+        return interval
+
+    def record(self, polls: int, elapsed: float, previous_poll_at: float):
+        """Learn from a finished wait and update the counters."""
+        # Assume completion happened midway between the last two polls; learn that
+        # and compare with when a fixed-interval loop would have noticed it.
+        completed_at = (previous_poll_at + elapsed) / 2
+        self.stats.observe(self.operation, completed_at)
+        baseline_polls = max(1, math.ceil(completed_at / self.baseline_interval))
+        baseline_detected_at = baseline_polls * self.baseline_interval
+        with _counters_lock:
+            c = _counters.setdefault(self.operation, PollCounters())
+            c.waits += 1
+            c.polls += polls
+            c.baseline_polls += baseline_polls
+            c.latency_saved += baseline_detected_at - elapsed
+
+    def poll(self, fetch: Callable, is_done: Callable[[object], bool],
+             on_update: Optional[Callable[[object], None]] = None):
+        """Call fetch() until is_done(result); raises PollTimeout at the deadline."""
+        expected = self.stats.expected(self.operation)
+        start = time.monotonic()
+        previous_poll_at = 0.0
+        attempt = overdue = 0
+        result = None
+        while True:
+            elapsed = time.monotonic() - start
+            if self.deadline is not None and elapsed >= self.deadline:
+                raise PollTimeout(self.operation, self.deadline, result)
+            time.sleep(self.next_interval(elapsed, overdue, expected))
+            poll_at = time.monotonic() - start
+            result = fetch()
+            attempt += 1
+            if expected is None or poll_at >= expected:
+                overdue += 1
+            if on_update:
+                on_update(result)
+            if is_done(result):
+                self.record(attempt, poll_at, previous_poll_at)
+                return result
+            previous_poll_at = poll_at
+
+    async def apoll(self, fetch: Callable, is_done: Callable[[object], bool],
+                    on_update: Optional[Callable[[object], None]] = None):
+        """Async variant of poll(); fetch() must return an awaitable."""
+        expected = self.stats.expected(self.operation)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        previous_poll_at = 0.0
+        attempt = overdue = 0
+        result = None
+        while True:
+            elapsed = loop.time() - start
+            if self.deadline is not None and elapsed >= self.deadline:
+                raise PollTimeout(self.operation, self.deadline, result)
+            await asyncio.sleep(self.next_interval(elapsed, overdue, expected))
+            poll_at = loop.time() - start
+            result = await fetch()
+            attempt += 1
+            if expected is None or poll_at >= expected:
+                overdue += 1
+            if on_update:
+                on_update(result)
+            if is_done(result):
+                self.record(attempt, poll_at, previous_poll_at)
+                return result
+            previous_poll_at = poll_at
@@ -0,0 +1,45 @@
+"""
+Token prices for cost accounting.
+
+Prices are USD per 1M tokens (input, output) for the models the labs use.
+They change over time: check https://openai.com/api/pricing and override
+with OPENAI_PRICE_INPUT / OPENAI_PRICE_OUTPUT (USD per 1M tokens) when needed.
+"""
+
+import os
+from typing import Optional, Tuple
+
+from labkit.config import load_env
+
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4-turbo": (10.00, 30.00),
+    "gpt-3.5-turbo": (0.50, 1.50),
+}
+
+
+def price_for(model: Optional[str]) -> Optional[Tuple[float, float]]:
+    """(input, output) USD per 1M tokens; dated snapshots match their base model."""
+    load_env()
+    override_in, override_out = os.getenv("OPENAI_PRICE_INPUT"), os.getenv("OPENAI_PRICE_OUTPUT")
+    if override_in and override_out:
+        return float(override_in), float(override_out)
+    if not model:
+        return None
+    # Longest prefix wins, so "gpt-4o-mini-2024-07-18" is not priced as "gpt-4o".
+    for name in sorted(MODEL_PRICES, key=len, reverse=True):
+        if model.startswith(name):
+            return MODEL_PRICES[name]
+    return None
+
+
+def cost_usd(model: Optional[str], prompt_tokens: int, completion_tokens: int) -> Optional[float]:
+    """Cost of one call, or None for a model without a known price."""
+    price = price_for(model)
+    if price is None:
+        return None
+    return (prompt_tokens * price[0] + completion_tokens * price[1]) / 1_000_000
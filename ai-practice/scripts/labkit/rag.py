@@ -0,0 +1,208 @@
+"""
+Concurrent RAG query engine.
+
+Runs a list of file_search questions against the assistant on one event loop
+with a bounded number of queries in flight, a per-query timeout and results
+collected in input order. Each query produces the same result dict as the
+serial loop in 03_rag_file_search.py, plus the lines that loop would have
+printed, so callers can replay the report in order. Queries run on threads
+leased from an AsyncThreadPool (recycled by default), which deletes them in
+bulk when the batch is done.
+
+With fast=True each query is a single streamed create_and_run request: the
+answer, its citation annotations and the file_search tool calls are read
+from the completed message and run step events, so the runs.create /
+polling / messages.list / steps.list round trips are skipped.
+
+Docs: https://platform.openai.com/docs/assistants/tools/file-search
+"""
+
+import asyncio
+import sqlite3
+import traceback
+from typing import Callable, List, Optional, Tuple
+
+from labkit.citations import extract_citations, unique_file_ids
+from labkit.client import get_async_client, get_config
+from labkit.ledger import get_ledger
+from labkit.streaming import RunStarted, stream_create_and_run
+from labkit.thread_pool import SETTLED_RUN_STATUSES, AsyncThreadPool
+
+
+def file_search_was_used(run_steps) -> bool:
+    """Return True if any tool_calls step of the run invoked file_search (a steps page or a list of steps)."""
+    return any(
+        tc.type == "file_search"
+        for step in getattr(run_steps, "data", run_steps) if step.type == "tool_calls" and step.step_details
+        for tc in step.step_details.tool_calls
+    )
+
+
+def report_completed_query(user_query: str, thread_id: str, message, run_steps, emit: Callable[[str], None]) -> dict:
+    """Print the answer, citations and tool usage for a completed run and build its result dict."""
+    full_response_text, citations = extract_citations(message)
+
+    emit("🤖 Assistant Response:")
+    emit(full_response_text if full_response_text else "[No text content in assistant's message]")
+
+    if citations:
+        emit("\n📚 Citation Details (Linking assistant's text to source files):")
+        for citation in citations:
+            emit(f"  - Assistant's text \"{citation.quote[:70]}...\" (chars {citation.start}-{citation.end}"
+                 + (f", chunk {citation.chunk}" if citation.chunk else "") + f") is linked to Source File ID: {citation.file_id}")
+    else:
+        emit("ℹ️ No direct file citations found in this response's annotations.")
+
+    file_search_tool_used = file_search_was_used(run_steps)
+    emit("🔍 file_search tool was used by the assistant." if file_search_tool_used else "⚠️ file_search tool was NOT explicitly used by the assistant for this query.")
+
+    return {
+        "query": user_query,
+        "response_length": len(full_response_text),
+        "file_search_used": file_search_tool_used,
+        "citations_count": len(citations),
+        "cited_file_ids": unique_file_ids(citations),
+        "citations": [citation.as_row() for citation in citations],
+        "response": full_response_text,
+        "thread_id": thread_id
+    }
+
+
+def run_usage(run) -> dict:
+    """Model and token usage of a finished run, for cost accounting."""
+    usage = getattr(run, "usage", None)
+    return {
+        "model": getattr(run, "model", None),
+        "prompt_tokens": usage.prompt_tokens if usage else 0,
+        "completion_tokens": usage.completion_tokens if usage else 0,
+    }
+
+
+async def run_query_async(client, pool: AsyncThreadPool, assistant_id: str, user_query: str, prompt: str,
+                          instructions: str, emit: Callable[[str], None], state: dict) -> dict:
+    """Async counterpart of one iteration of the serial RAG loop, on a thread leased from `pool`."""
+    async with pool.lease([{"role": "user", "content": prompt}]) as lease:
+        thread_id = state["thread_id"] = lease.thread_id
+        emit(f"🧵 Thread leased: {thread_id}. Running assistant...")
+
+        run = await client.beta.threads.runs.create_and_poll(
+            thread_id=thread_id,
+            assistant_id=assistant_id,
+            instructions=instructions,
+            **pool.run_options
+        )
+        if run.status not in SETTLED_RUN_STATUSES:
+            lease.discard()
+
+        if run.status != "completed":
+            emit(f"❌ Query run not completed. Status: {run.status}")
+            if run.last_error: emit(f"  Error: {run.last_error.message}")
+            return {"query": user_query, "status": run.status, "thread_id": thread_id}
+
+        messages = await client.beta.threads.messages.list(thread_id=thread_id, run_id=run.id, order="asc", limit=20)
+        assistant_response_message = next((msg for msg in reversed(messages.data) if msg.role == "assistant"), None)
+        if not (assistant_response_message and assistant_response_message.content):
+            emit("❌ Assistant provided no content in its message.")
+            return {"query": user_query, "status": "NoContent", "thread_id": thread_id}
+
+        run_steps = await client.beta.threads.runs.steps.list(thread_id=thread_id, run_id=run.id)
+    result = report_completed_query(user_query, thread_id, assistant_response_message, run_steps, emit)
+    result.update(run_usage(run))
+    return result
+
+
+async def _thread_recorder(state: dict, assistant_id: str):
+    """
+    Stream consumer noting the thread a streamed create_and_run made, as soon as the run exists.
+
+    The ledger transport does not buffer SSE responses, so the thread is also
+    recorded here; 99_cleanup.py finds it even if the pool's delete never happens.
+    """
+    while True:
+        event = yield
+        if isinstance(event, RunStarted) and event.run is not None:
+            state["thread_id"] = event.run.thread_id
+            if get_config().ledger:
+                try:
+                    get_ledger().record("threads", event.run.thread_id, event.run.created_at, label=assistant_id)
+                except sqlite3.Error as e:
+                    print(f"⚠️  Resource ledger not updated: {e}")
+
+
+async def stream_query_async(client, pool: AsyncThreadPool, assistant_id: str, user_query: str, prompt: str,
+                             instructions: str, emit: Callable[[str], None], state: dict) -> dict:
+    """Fast path: one streamed create_and_run request; the result is harvested from its events."""
+    try:
+        stream = await stream_create_and_run(
+            client,
+            [_thread_recorder(state, assistant_id)],
+            assistant_id=assistant_id,
+            thread={"messages": [{"role": "user", "content": prompt}]},
+            instructions=instructions,
+        )
+    finally:
+        if state.get("thread_id", "N/A") != "N/A":
+            pool.retire(state["thread_id"])  # deleted with the pool, also after a timeout
+    thread_id = state.get("thread_id", "N/A")
+    emit(f"🧵 Thread {thread_id} created and run in one streamed request.")
+
+    run = stream.run
+    if stream.status != "completed":
+        emit(f"❌ Query run not completed. Status: {stream.status}")
+        if run is not None and run.last_error: emit(f"  Error: {run.last_error.message}")
+        for error in stream.errors: emit(f"  Error: {error}")
+        return {"query": user_query, "status": stream.status or "StreamEnded", "thread_id": thread_id}
+
+    assistant_response_message = next((msg for msg in reversed(stream.messages) if msg.role == "assistant"), None)
+    if not (assistant_response_message and assistant_response_message.content):
+        emit("❌ Assistant provided no content in its message.")
+        return {"query": user_query, "status": "NoContent", "thread_id": thread_id}
+
+    result = report_completed_query(user_query, thread_id, assistant_response_message, stream.steps, emit)
+    result.update(run_usage(run))
+    return result
+
+
+async def run_queries_async(assistant_id: str, queries: List[str], build_prompt: Callable[[str], str],
+                            instructions: str, concurrency: int = 4, query_timeout: Optional[float] = None,
+                            recycle_threads: bool = True, fast: bool = False) -> List[Tuple[dict, List[str]]]:
+    """Run all queries with at most `concurrency` in flight; return (result, report lines) in input order."""
+    client = get_async_client()
+    pool = AsyncThreadPool(client, max_threads=concurrency, recycle=recycle_threads and not fast)
+    run_query = stream_query_async if fast else run_query_async
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run_one(user_query: str) -> Tuple[dict, List[str]]:
+        lines: List[str] = []
+        state = {"thread_id": "N/A"}
+        async with semaphore:
+            try:
+                result = await asyncio.wait_for(
+                    run_query(client, pool, assistant_id, user_query, build_prompt(user_query),
+                              instructions, lines.append, state),
+                    timeout=query_timeout,
+                )
+            except asyncio.TimeoutError:
+                lines.append(f"⏱️ Query timed out after {query_timeout:.0f}s")
+                result = {"query": user_query, "status": "Timeout", "error": f"timed out after {query_timeout}s", "thread_id": state["thread_id"]}
+            except Exception as e:
+                lines.append(f"❌ Error during RAG query for '{user_query}': {e}")
+                lines.append(traceback.format_exc().rstrip())
+                result = {"query": user_query, "status": "Exception", "error": str(e), "thread_id": state["thread_id"]}
+        return result, lines
+
+    try:
+        return await asyncio.gather(*(run_one(q) for q in queries))
+    finally:
+        await pool.close()
+        pool.print_stats()
+        await client.close()
+
+
+def run_queries_concurrently(assistant_id: str, queries: List[str], build_prompt: Callable[[str], str],
+                             instructions: str, concurrency: int = 4, query_timeout: Optional[float] = None,
+                             recycle_threads: bool = True, fast: bool = False) -> List[Tuple[dict, List[str]]]:
+    """Synchronous entry point for the concurrent engine."""
+    return asyncio.run(run_queries_async(assistant_id, queries, build_prompt, instructions,
+                                         concurrency=concurrency, query_timeout=query_timeout,
+                                         recycle_threads=recycle_threads, fast=fast))
@@ -0,0 +1,202 @@
+"""
+Client-side pacing driven by the API's rate-limit headers.
+
+Concurrent runs, polls, uploads and cleanup deletes used to fire as fast as
+they could, hit 429s, and leave recovery to the SDK's blind retries, which
+stretched tail latency. The shared clients now wrap their HTTP transport
+with RateLimitTransport (labkit.transports), which sends every request through one process-wide
+RateLimitScheduler:
+  * two continuously refilled token buckets, requests/min and tokens/min,
+    sized to `headroom` (default 90%) of the limits so throughput sits just
+    under them instead of oscillating around them,
+  * every response's x-ratelimit-limit-*, x-ratelimit-remaining-* headers
+    resync the buckets (limits start unknown, i.e. unpaced, unless OPENAI_RPM
+    / OPENAI_TPM seed them),
+  * a request reserves one request plus an estimate of its tokens (JSON body
+    size plus its completion allowance, model endpoints only) and sleeps
+    until the reservation is covered, so waiting callers queue in order,
+  * a 429 drains the exhausted bucket for its retry-after, so every caller,
+    sync or async, backs off together instead of each retrying blindly.
+
+print_pacing_summary() reports how often and how long calls were held back.
+"""
+
+import asyncio
+import json
+import re
+import threading
+import time
+from typing import Optional
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+_MODEL_ENDPOINTS = ("/runs", "/chat/completions", "/responses", "/embeddings", "/completions")
+COMPLETION_ALLOWANCE = 256  # tokens reserved for the reply when a request does not cap it
+
+
+def parse_duration(value: Optional[str]) -> Optional[float]:
+    """Seconds in a reset header: '6m0s' -> 360.0, '20ms' -> 0.02, '1.5' -> 1.5."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts) if parts else None
+
+
+def _header_float(headers, name: str) -> Optional[float]:
+    try:
+        return float(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class Bucket:
+    """One per-minute limit: refilled continuously, resynced from response headers."""
+
+    def __init__(self, name: str, limit: Optional[float] = None, headroom: float = 0.9):
+        self.name = name
+        self.headroom = headroom
+        self.limit: Optional[float] = None
+        self.level = 0.0
+        self.updated = time.monotonic()
+        if limit:
+            self.set_limit(limit)
+
+    @property
+    def capacity(self) -> float:
+        return self.limit * self.headroom
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / 60.0
+
+    def set_limit(self, limit: float):
+        first = self.limit is None
+        self.limit = limit
+        self.level = self.capacity if first else min(self.level, self.capacity)
+
+    def _refill(self, now: float):
+        if self.limit:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take `amount` (the level may go negative); returns the seconds until it is covered."""
+        self._refill(now)
+        if not self.limit or amount <= 0:
+            return 0.0
+        self.level -= min(amount, self.capacity)  # one oversized request must not block forever
+        return max(0.0, -self.level / self.rate)
+
+    def sync(self, limit: float, remaining: Optional[float], now: float):
+        """Adopt the server's limit; never assume more is left than the server says."""
+        self._refill(now)
+        if limit != self.limit:
+            self.set_limit(limit)
+        if remaining is not None:
+            self.level = min(self.level, remaining - limit * (1 - self.headroom))
+
+    def drain(self, seconds: float, now: float):
+        """Back off: nothing is available for `seconds`."""
+        self._refill(now)
+        if self.limit:
+            self.level = min(self.level, 0.0) - seconds * self.rate
+
+
+class RateLimitScheduler:
+    """Requests/min and tokens/min buckets shared by every client in the process."""
+
+    def __init__(self, rpm: Optional[int] = None, tpm: Optional[int] = None, headroom: float = 0.9):
+        self.requests = Bucket("requests", rpm, headroom)
+        self.tokens = Bucket("tokens", tpm, headroom)
+        self.lock = threading.Lock()
+        self.calls = self.paced = self.throttled = 0
+        self.waited = 0.0
+
+    def reserve(self, tokens: int = 0) -> float:
+        """Reserve one request and `tokens`; returns how long the caller must wait before sending."""
+        with self.lock:
+            now = time.monotonic()
+            wait = max(self.requests.reserve(1, now), self.tokens.reserve(tokens, now))
+            self.calls += 1
+            if wait > 0:
+                self.paced += 1
+                self.waited += wait
+        return wait
+
+    def acquire(self, tokens: int = 0):
+        wait = self.reserve(tokens)
+        if wait:
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: int = 0):
+        wait = self.reserve(tokens)
+        if wait:
+            await asyncio.sleep(wait)
+
+    def observe(self, status_code: int, headers):
+        """Resync both buckets from a response; on 429, drain the exhausted one for its retry-after."""
+        with self.lock:
+            now = time.monotonic()
+            for bucket in (self.requests, self.tokens):
+                limit = _header_float(headers, f"x-ratelimit-limit-{bucket.name}")
+                if limit:
+                    bucket.sync(limit, _header_float(headers, f"x-ratelimit-remaining-{bucket.name}"), now)
+            if status_code != 429:
+                return
+            self.throttled += 1
+            exhausted = [b for b in (self.requests, self.tokens)
+                         if _header_float(headers, f"x-ratelimit-remaining-{b.name}") == 0] or [self.requests]
+            for bucket in exhausted:
+                seconds = _header_float(headers, "retry-after-ms")
+                seconds = seconds / 1000 if seconds is not None else (
+                    _header_float(headers, "retry-after")
+                    or parse_duration(headers.get(f"x-ratelimit-reset-{bucket.name}")) or 1.0)
+                bucket.drain(seconds, now)
+
+    def summary(self) -> str:
+        limits = ", ".join(f"{b.limit:.0f} {b.name}/min" for b in (self.requests, self.tokens) if b.limit)
+        return (f"🚦 Rate limits ({limits or 'not reported'}): {self.paced}/{self.calls} calls paced, "
+                f"{self.waited:.1f}s total wait, {self.throttled} × 429")
+
+
+_scheduler: Optional[RateLimitScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler(rpm: Optional[int] = None, tpm: Optional[int] = None, headroom: float = 0.9) -> RateLimitScheduler:
+    """The process-wide scheduler; the first call's settings win."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RateLimitScheduler(rpm, tpm, headroom)
+    return _scheduler
+
+
+def print_pacing_summary():
+    """Print the pacing line when this process paced or was throttled at all."""
+    if _scheduler is not None and (_scheduler.paced or _scheduler.throttled):
+        print(_scheduler.summary())
+
+
+def estimate_tokens(request) -> int:
+    """Tokens a request may consume: 0 except for model calls (JSON body ~4 chars/token + reply allowance)."""
+    import httpx  # already loaded: requests only reach here from labkit.transports
+
+    path = request.url.path
+    if request.method != "POST" or not path.endswith(_MODEL_ENDPOINTS):
+        return 0
+    try:
+        body = request.content
+    except httpx.RequestNotRead:  # streamed upload body; not a model call
+        return 0
+    completion = COMPLETION_ALLOWANCE
+    try:
+        payload = json.loads(body) if body else {}
+        completion = payload.get("max_completion_tokens") or payload.get("max_tokens") or completion
+    except (ValueError, AttributeError):
+        pass
+    return len(body) // 4 + int(completion)
@@ -0,0 +1,130 @@
+"""
+Opt-in local response cache for deterministic lab queries.
+
+Identical prompts (the eight KMP questions, the "Recursion in Programming"
+summary, ...) are served from a SQLite file (.response_cache.sqlite) instead
+of paying full latency and tokens on every run. Entries are keyed by a hash
+of everything that can change the answer:
+  * assistant ID and config (model, temperature, top_p, instructions, tools),
+  * the vector store contents version (hash of its file IDs),
+  * run-level options (instructions, response_format, ...),
+  * the whitespace-normalised prompt.
+
+Entries expire after a TTL and the least recently used ones are evicted once
+the cache holds more than `max_entries`. Hit/miss counts are kept per process.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+RESPONSE_CACHE_FILE = PROJECT_ROOT / ".response_cache.sqlite"
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so formatting-only differences hit the same entry."""
+    return " ".join(prompt.split())
+
+
+def assistant_config(client, assistant_id: str) -> dict:
+    """The assistant settings that influence an answer (one retrieve call)."""
+    assistant = client.beta.assistants.retrieve(assistant_id)
+    return {
+        "id": assistant.id,
+        "model": assistant.model,
+        "temperature": assistant.temperature,
+        "top_p": assistant.top_p,
+        "instructions": assistant.instructions,
+        "tools": sorted(tool.type for tool in assistant.tools),
+    }
+
+
+def vector_store_version(file_ids: Iterable[str]) -> str:
+    """Content version of a vector store: a hash of its sorted file IDs."""
+    return hashlib.sha256("\n".join(sorted(file_ids)).encode()).hexdigest()[:16]
+
+
+def cache_key(config: dict, prompt: str, vector_store_version: str = "", **run_options) -> str:
+    """Stable hash of assistant config, store version, run options and normalised prompt."""
+    payload = {
+        "assistant": config,
+        "vector_store_version": vector_store_version,
+        "run_options": run_options,
+        "prompt": normalize_prompt(prompt),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class ResponseCache:
+    """SQLite-backed TTL + LRU cache of JSON-serialisable responses."""
+
+    def __init__(self, path: Path = RESPONSE_CACHE_FILE, ttl_seconds: float = 7 * 24 * 3600,
+                 max_entries: int = 5000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses(last_access)")
+        self._db.commit()
+
+    def get(self, key: str) -> Optional[dict]:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, value: dict):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now),
+            )
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._db.commit()
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cursor = self._db.execute("DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            self._db.commit()
+        return cursor.rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def print_stats(self):
+        lookups = self.hits + self.misses
+        rate = (100 * self.hits / lookups) if lookups else 0.0
+        print(f"🗃️  Response cache: {self.hits} hit(s), {self.misses} miss(es) ({rate:.0f}% hit rate), "
+              f"{len(self)} entries in {self.path.name}")
+
+    def close(self):
+        self._db.close()
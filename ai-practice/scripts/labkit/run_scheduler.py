@@ -0,0 +1,260 @@
+"""
+Multiplexed run poller.
+
+Tracks many (thread_id, run_id) handles with one event loop instead of one
+blocking `while run.status in [...]` loop per run. Handles are polled in
+due-time order, with priority breaking ties among those that are due, and
+every retrieve draws from one global requests-per-second budget. Each handle
+gets a future that resolves with the final Run once it leaves the
+queued/in_progress states.
+
+Poll intervals come from labkit.polling.AdaptivePoller, so the scheduler
+shares the learned "runs.retrieve" duration with the single-run poller.
+
+Usage (from async code):
+    async with RunScheduler(requests_per_second=5) as scheduler:
+        futures = [scheduler.track(t, r) for t, r in handles]
+        runs = await asyncio.gather(*futures)
+
+Usage (from sync code, one background thread for all runs):
+    with BackgroundRunScheduler(requests_per_second=5) as scheduler:
+        futures = [scheduler.track(t, r) for t, r in handles]
+        runs = [f.result() for f in futures]
+"""
+
+import asyncio
+import heapq
+import itertools
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from labkit.client import get_async_client
+from labkit.polling import AdaptivePoller
+
+PENDING_RUN_STATUSES = ("queued", "in_progress", "cancelling")
+
+
+@dataclass(order=True)
+class _Entry:
+    due: float
+    priority: int
+    seq: int
+    handle: "RunHandle" = field(compare=False)
+
+
+@dataclass
+class RunHandle:
+    """One tracked run and its polling state."""
+    thread_id: str
+    run_id: str
+    priority: int
+    future: asyncio.Future
+    started_at: float
+    polls: int = 0
+    overdue_polls: int = 0
+    errors: int = 0
+    previous_poll_at: float = 0.0
+
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens per second, bursting up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated_at: Optional[float] = None
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            if self.updated_at is not None:
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+            self.updated_at = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class RunScheduler:
+    """Polls many runs on one event loop under a global requests-per-second budget."""
+
+    def __init__(self, client=None, requests_per_second: float = 5.0, max_errors: int = 5,
+                 poller: Optional[AdaptivePoller] = None):
+        self._client = client
+        self._owns_client = client is None
+        self.bucket = TokenBucket(requests_per_second)
+        self.max_errors = max_errors
+        self.poller = poller or AdaptivePoller("runs.retrieve", deadline=None)
+        self._heap = []
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: Dict[asyncio.Task, RunHandle] = {}
+        self._closed = False
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def start(self):
+        """Start the polling loop on the running event loop."""
+        if self._client is None:
+            self._client = get_async_client()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def close(self):
+        """Stop polling; in-flight polls are cancelled and awaited, unresolved futures are cancelled."""
+        self._closed = True
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        inflight = dict(self._inflight)
+        for task in inflight:
+            task.cancel()
+        await asyncio.gather(*inflight, return_exceptions=True)
+        for handle in inflight.values():
+            handle.future.cancel()
+        for entry in self._heap:
+            entry.handle.future.cancel()
+        self._heap.clear()
+        if self._owns_client and self._client is not None:
+            await self._client.close()
+
+    @property
+    def pending(self) -> int:
+        return len(self._heap) + len(self._inflight)
+
+    def track(self, thread_id: str, run_id: str, priority: int = 0) -> asyncio.Future:
+        """Start tracking a run; lower priority numbers are polled first when several are due."""
+        loop = asyncio.get_running_loop()
+        handle = RunHandle(thread_id, run_id, priority, loop.create_future(), started_at=loop.time())
+        self._schedule(handle, loop.time())
+        return handle.future
+
+    def _schedule(self, handle: RunHandle, now: float):
+        if self._closed:
+            handle.future.cancel()
+            return
+        expected = self.poller.stats.expected(self.poller.operation)
+        delay = self.poller.next_interval(now - handle.started_at, handle.overdue_polls, expected)
+        heapq.heappush(self._heap, _Entry(now + delay, handle.priority, next(self._seq), handle))
+        self._wakeup.set()
+
+    def _pop_next_due(self, now: float) -> Optional[RunHandle]:
+        """Among entries already due, pick the one with the best priority."""
+        if not self._heap or self._heap[0].due > now:
+            return None
+        due = []
+        while self._heap and self._heap[0].due <= now:
+            due.append(heapq.heappop(self._heap))
+        best = min(due, key=lambda e: (e.priority, e.due, e.seq))
+        for entry in due:
+            if entry is not best:
+                heapq.heappush(self._heap, entry)
+        return best.handle
+
+    async def _loop(self):
+        loop = asyncio.get_running_loop()
+        # Checked as well as cancelled: before Python 3.12, wait_for can swallow a
+        # cancel that arrives as the wakeup event is set, and the loop would never end.
+        while not self._closed:
+            self._wakeup.clear()
+            now = loop.time()
+            handle = self._pop_next_due(now)
+            if handle is None:
+                timeout = (self._heap[0].due - now) if self._heap else None
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            if handle.future.done():  # cancelled by the caller
+                continue
+            await self.bucket.acquire()
+            task = loop.create_task(self._poll(handle))
+            self._inflight[task] = handle
+            task.add_done_callback(lambda done: self._inflight.pop(done, None))
+
+    async def _poll(self, handle: RunHandle):
+        loop = asyncio.get_running_loop()
+        poll_at = loop.time() - handle.started_at
+        try:
+            run = await self._client.beta.threads.runs.retrieve(thread_id=handle.thread_id, run_id=handle.run_id)
+        except Exception as e:
+            handle.errors += 1
+            if handle.errors >= self.max_errors:
+                if not handle.future.done():
+                    handle.future.set_exception(e)
+                return
+            handle.overdue_polls += 1
+            self._schedule(handle, loop.time())
+            return
+
+        handle.polls += 1
+        expected = self.poller.stats.expected(self.poller.operation)
+        if expected is None or poll_at >= expected:
+            handle.overdue_polls += 1
+        if run.status in PENDING_RUN_STATUSES:
+            handle.previous_poll_at = poll_at
+            self._schedule(handle, loop.time())
+            return
+
+        self.poller.record(handle.polls, poll_at, handle.previous_poll_at)
+        if not handle.future.done():
+            handle.future.set_result(run)
+
+
+class BackgroundRunScheduler:
+    """Runs a RunScheduler on one daemon thread and hands out concurrent.futures.Future objects."""
+
+    def __init__(self, requests_per_second: float = 5.0, **scheduler_kwargs):
+        self._scheduler_kwargs = dict(requests_per_second=requests_per_second, **scheduler_kwargs)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._scheduler: Optional[RunScheduler] = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="run-scheduler", daemon=True)
+        self._thread.start()
+
+        async def _start():
+            self._scheduler = RunScheduler(**self._scheduler_kwargs)
+            self._scheduler.start()
+
+        asyncio.run_coroutine_threadsafe(_start(), self._loop).result()
+
+    def track(self, thread_id: str, run_id: str, priority: int = 0):
+        """Track a run from any thread; returns a concurrent.futures.Future resolving to the final Run."""
+
+        async def _track():
+            return await self._scheduler.track(thread_id, run_id, priority)
+
+        return asyncio.run_coroutine_threadsafe(_track(), self._loop)
+
+    def close(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._scheduler.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._loop = None
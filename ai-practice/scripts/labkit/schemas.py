@@ -0,0 +1,20 @@
+"""
+Pydantic models for the structured-output lab.
+
+Shared by the interactive demos in 02_structured_output.py and its bulk
+Batch API mode, so both validate against the same schema.
+"""
+
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+
+class LectureSummary(BaseModel):
+    """Structured explanation of a lecture topic."""
+    topic: str = Field(description="The name of the topic being explained")
+    explanation: str = Field(description="Simple and clear explanation of the topic")
+    examples: List[str] = Field(description="Practical examples related to the topic")
+    key_points: List[str] = Field(description="Main takeaways or important ideas")
+    difficulty: Optional[str] = Field(None, description="Difficulty level: Beginner, Intermediate, or Advanced") # Made optional explicit
+    resources: Optional[List[str]] = Field(None, description="Suggested resources to learn more") # Made optional explicit
@@ -0,0 +1,417 @@
+"""
+Streaming event pipeline for Assistants runs.
+
+StreamPipeline reads an (async) run event stream once and:
+  * dispatches each raw SDK event by name through a table of handlers that
+    turn it into small typed events (TextDelta, ToolCallDelta, RunFinished,
+    StreamError, MessageCompleted, StepCompleted),
+  * accumulates the answer in a TextBuffer (io.StringIO, no quadratic
+    string concatenation),
+  * keeps the completed messages (with their citation annotations) and run
+    steps (with their tool calls), so callers need no messages.list or
+    runs.steps.list after the stream,
+  * fans every typed event out to pluggable consumers,
+  * measures time-to-first-token and tokens/sec for the stream.
+
+stream_run() streams a run on an existing thread; stream_create_and_run()
+creates the thread and the run in the same request.
+
+A consumer may raise StreamAborted to stop early (e.g. on a schema
+violation, see labkit.json_stream): the pipeline closes the HTTP stream and
+stream_run() cancels the run so no more tokens are generated.
+
+Consumers are async generators that receive events through asend():
+
+    async def my_consumer():
+        while True:
+            event = yield
+            ...
+
+Ready-made consumers: stdout_consumer, file_sink, token_counter and
+fanout_consumer (Server-Sent Events / WebSocket fan-out via Broadcaster).
+
+Docs: https://platform.openai.com/docs/api-reference/assistants-streaming/events
+"""
+
+import asyncio
+import io
+import json
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import AsyncGenerator, Callable, Dict, Iterable, List, Optional
+
+Consumer = AsyncGenerator[None, object]
+
+
+class StreamAborted(Exception):
+    """Raised by a consumer to stop the stream; the message becomes the abort reason."""
+
+
+@dataclass
+class RunStarted:
+    """The run was created (carries its id for cancellation)."""
+    run: object = None
+
+
+@dataclass
+class TextDelta:
+    """A piece of assistant text."""
+    text: str
+    message_id: str = ""
+
+
+@dataclass
+class ToolCallDelta:
+    """Progress on a tool call inside a run step (file_search, function, ...)."""
+    step_id: str
+    tool_type: str
+    index: int = 0
+
+
+@dataclass
+class MessageCompleted:
+    """A finished message, including its annotations (file citations)."""
+    message: object
+
+
+@dataclass
+class StepCompleted:
+    """A finished run step (tool calls or message creation)."""
+    step: object
+
+
+@dataclass
+class RunFinished:
+    """The run reached a terminal (or requires_action) status."""
+    status: str
+    run: object = None
+
+    @property
+    def usage(self):
+        return getattr(self.run, "usage", None)
+
+
+@dataclass
+class StreamError:
+    """An error event sent by the API mid-stream."""
+    message: str
+
+
+def _text_deltas(data) -> Iterable[TextDelta]:
+    for block in getattr(data.delta, "content", None) or []:
+        if block.type == "text" and block.text and block.text.value:
+            yield TextDelta(block.text.value, data.id)
+
+
+def _tool_call_deltas(data) -> Iterable[ToolCallDelta]:
+    details = getattr(data.delta, "step_details", None)
+    if details is not None and details.type == "tool_calls":
+        for call in details.tool_calls or []:
+            yield ToolCallDelta(data.id, call.type, call.index)
+
+
+def _message_completed(data) -> Iterable[MessageCompleted]:
+    yield MessageCompleted(data)
+
+
+def _step_completed(data) -> Iterable[StepCompleted]:
+    yield StepCompleted(data)
+
+
+def _run_started(data) -> Iterable[RunStarted]:
+    yield RunStarted(data)
+
+
+def _run_finished(data) -> Iterable[RunFinished]:
+    yield RunFinished(data.status, data)
+
+
+def _error(data) -> Iterable[StreamError]:
+    yield StreamError(getattr(data, "message", str(data)))
+
+
+# Raw event name -> handler producing typed events; other events are ignored.
+EVENT_HANDLERS: Dict[str, Callable[[object], Iterable[object]]] = {
+    "thread.run.created": _run_started,
+    "thread.message.delta": _text_deltas,
+    "thread.run.step.delta": _tool_call_deltas,
+    "thread.message.completed": _message_completed,
+    "thread.run.step.completed": _step_completed,
+    "thread.run.completed": _run_finished,
+    "thread.run.incomplete": _run_finished,
+    "thread.run.failed": _run_finished,
+    "thread.run.cancelled": _run_finished,
+    "thread.run.expired": _run_finished,
+    "thread.run.requires_action": _run_finished,
+    "error": _error,
+}
+
+
+class TextBuffer:
+    """Append-only text accumulator backed by io.StringIO."""
+
+    def __init__(self):
+        self._buffer = io.StringIO()
+        self.chunks = 0
+
+    def append(self, text: str):
+        self._buffer.write(text)
+        self.chunks += 1
+
+    def getvalue(self) -> str:
+        return self._buffer.getvalue()
+
+    def __len__(self) -> int:
+        return self._buffer.tell()
+
+
+@dataclass
+class StreamStats:
+    """Timing and throughput of one stream (seconds, monotonic clock)."""
+    started_at: float = 0.0
+    first_token_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    deltas: int = 0
+    completion_tokens: Optional[int] = None  # exact count from run usage, when reported
+
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        return None if self.first_token_at is None else self.first_token_at - self.started_at
+
+    @property
+    def tokens(self) -> int:
+        # Each text delta carries roughly one token; prefer the billed count.
+        return self.completion_tokens if self.completion_tokens is not None else self.deltas
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        if self.first_token_at is None or self.finished_at is None:
+            return None
+        generation_time = self.finished_at - self.first_token_at
+        return self.tokens / generation_time if generation_time > 0 else None
+
+    def print_summary(self):
+        ttft = self.time_to_first_token
+        rate = self.tokens_per_second
+        ttft_text = f"{ttft:.2f}s" if ttft is not None else "n/a"
+        rate_text = f" at {rate:.1f} tokens/s" if rate is not None else ""
+        print(f"⚡ Time to first token: {ttft_text}, {self.tokens} tokens{rate_text}")
+
+
+@dataclass
+class StreamResult:
+    """What a finished stream produced."""
+    text: str
+    stats: StreamStats
+    run: object = None
+    status: Optional[str] = None
+    errors: List[str] = field(default_factory=list)
+    messages: List[object] = field(default_factory=list)  # completed messages, in stream order
+    steps: List[object] = field(default_factory=list)     # completed run steps, in stream order
+
+    @property
+    def thread_id(self) -> Optional[str]:
+        return getattr(self.run, "thread_id", None)
+
+
+async def stdout_consumer():
+    """Print assistant text as it arrives."""
+    while True:
+        event = yield
+        if isinstance(event, TextDelta):
+            print(event.text, end="", flush=True)
+
+
+async def file_sink(path: Path):
+    """Write assistant text to `path` as it arrives (the file is closed when the stream ends)."""
+    with open(path, "w") as f:
+        while True:
+            event = yield
+            if isinstance(event, TextDelta):
+                f.write(event.text)
+                f.flush()
+
+
+async def token_counter(stats: StreamStats):
+    """Stamp the first token and count deltas / billed completion tokens into `stats`."""
+    while True:
+        event = yield
+        if isinstance(event, TextDelta):
+            if stats.first_token_at is None:
+                stats.first_token_at = time.monotonic()
+            stats.deltas += 1
+        elif isinstance(event, RunFinished) and event.usage is not None:
+            stats.completion_tokens = event.usage.completion_tokens
+
+
+def event_payload(event) -> dict:
+    """JSON-friendly form of a typed event (for SSE / WebSocket clients)."""
+    if isinstance(event, TextDelta):
+        return {"type": "text", "text": event.text, "message_id": event.message_id}
+    if isinstance(event, ToolCallDelta):
+        return {"type": "tool_call", "step_id": event.step_id, "tool": event.tool_type}
+    if isinstance(event, RunStarted):
+        return {"type": "run_started", "run_id": getattr(event.run, "id", None)}
+    if isinstance(event, RunFinished):
+        return {"type": "run_finished", "status": event.status}
+    if isinstance(event, MessageCompleted):
+        return {"type": "message_completed", "message_id": getattr(event.message, "id", None)}
+    if isinstance(event, StepCompleted):
+        return {"type": "step_completed", "step_id": getattr(event.step, "id", None),
+                "step_type": getattr(event.step, "type", None)}
+    return {"type": "error", "message": getattr(event, "message", str(event))}
+
+
+def sse_format(payload: dict) -> str:
+    """Encode a payload as one Server-Sent Events message."""
+    return f"event: {payload['type']}\ndata: {json.dumps(payload)}\n\n"
+
+
+class Broadcaster:
+    """
+    Fan one stream out to any number of subscribers (SSE responses, WebSockets).
+
+    Each subscriber gets its own bounded queue; a subscriber that falls
+    `max_backlog` events behind is dropped instead of stalling the stream.
+    """
+
+    _CLOSED = object()
+
+    def __init__(self, max_backlog: int = 1000):
+        self.max_backlog = max_backlog
+        self._queues: List[asyncio.Queue] = []
+
+    def subscribe(self, sse: bool = True):
+        """
+        Register a subscriber now; returns an async iterator of SSE strings
+        (or payload dicts with sse=False) that ends with the stream.
+        """
+        queue: asyncio.Queue = asyncio.Queue(self.max_backlog)
+        self._queues.append(queue)
+        return self._drain(queue, sse)
+
+    async def _drain(self, queue: asyncio.Queue, sse: bool):
+        try:
+            while True:
+                payload = await queue.get()
+                if payload is self._CLOSED:
+                    return
+                yield sse_format(payload) if sse else payload
+        finally:
+            if queue in self._queues:
+                self._queues.remove(queue)
+
+    def publish(self, payload: dict):
+        for queue in list(self._queues):
+            try:
+                queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                self._drop(queue)
+                print("⚠️  Dropped a slow stream subscriber", file=sys.stderr)
+
+    def _drop(self, queue: asyncio.Queue):
+        self._queues.remove(queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(self._CLOSED)
+
+    def close(self):
+        for queue in list(self._queues):
+            if queue.full():
+                self._drop(queue)
+            else:
+                queue.put_nowait(self._CLOSED)
+
+
+async def fanout_consumer(broadcaster: Broadcaster):
+    """Publish every event to a Broadcaster; subscribers are closed when the stream ends."""
+    try:
+        while True:
+            event = yield
+            broadcaster.publish(event_payload(event))
+    finally:
+        broadcaster.close()
+
+
+class StreamPipeline:
+    """Dispatch one run event stream to typed events, a text buffer and consumers."""
+
+    def __init__(self, consumers: Iterable[Consumer] = ()):
+        self.stats = StreamStats()
+        self.buffer = TextBuffer()
+        self.consumers: List[Consumer] = [token_counter(self.stats), *consumers]
+
+    async def _send(self, event):
+        for consumer in list(self.consumers):
+            try:
+                await consumer.asend(event)
+            except StopAsyncIteration:
+                self.consumers.remove(consumer)  # consumer chose to stop early
+
+    async def run(self, stream, started_at: Optional[float] = None) -> StreamResult:
+        """
+        Consume `stream` (an SDK AsyncStream of assistant events) to the end.
+
+        `started_at` should be taken just before the request was sent so the
+        time to first token includes the request round trip.
+        """
+        self.stats.started_at = started_at if started_at is not None else time.monotonic()
+        result = StreamResult(text="", stats=self.stats)
+        for consumer in self.consumers:
+            await consumer.asend(None)  # prime up to the first `yield`
+        try:
+            async for raw in stream:
+                handler = EVENT_HANDLERS.get(raw.event)
+                if handler is None:
+                    continue
+                for event in handler(raw.data):
+                    if isinstance(event, TextDelta):
+                        self.buffer.append(event.text)
+                    elif isinstance(event, RunStarted):
+                        result.run = event.run
+                    elif isinstance(event, RunFinished):
+                        result.run, result.status = event.run, event.status
+                    elif isinstance(event, MessageCompleted):
+                        result.messages.append(event.message)
+                    elif isinstance(event, StepCompleted):
+                        result.steps.append(event.step)
+                    elif isinstance(event, StreamError):
+                        result.errors.append(event.message)
+                    await self._send(event)
+        except StreamAborted as e:
+            result.status = "aborted"
+            result.errors.append(str(e))
+            close = getattr(stream, "close", None)
+            if close is not None:
+                await close()  # drop the connection instead of reading the rest
+        finally:
+            self.stats.finished_at = time.monotonic()
+            for consumer in self.consumers:
+                await consumer.aclose()
+        result.text = self.buffer.getvalue()
+        return result
+
+
+async def _stream(create, consumers: Iterable[Consumer], create_kwargs: dict, client) -> StreamResult:
+    pipeline = StreamPipeline(consumers)
+    started_at = time.monotonic()
+    stream = await create(stream=True, **create_kwargs)
+    result = await pipeline.run(stream, started_at=started_at)
+    if result.status == "aborted" and result.run is not None:
+        try:
+            await client.beta.threads.runs.cancel(run_id=result.run.id, thread_id=result.thread_id)
+        except Exception as e:  # the run may already be finished
+            result.errors.append(f"cancel failed: {e}")
+    return result
+
+
+async def stream_run(client, consumers: Iterable[Consumer] = (), **create_kwargs) -> StreamResult:
+    """Start a streaming run with an AsyncOpenAI client and feed it through a StreamPipeline."""
+    return await _stream(client.beta.threads.runs.create, consumers, create_kwargs, client)
+
+
+async def stream_create_and_run(client, consumers: Iterable[Consumer] = (), **create_kwargs) -> StreamResult:
+    """Create a thread and stream a run on it in one request (create_kwargs as for threads.create_and_run)."""
+    return await _stream(client.beta.threads.create_and_run, consumers, create_kwargs, client)
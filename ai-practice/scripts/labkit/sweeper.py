@@ -0,0 +1,329 @@
+"""
+Paginated, parallel, resumable deletion of stale API resources.
+
+Used by 99_cleanup.py for threads, files and vector stores. For each kind:
+  * the full listing is walked with cursor pagination, oldest first, so the
+    sweep stops at the first object younger than the age cutoff,
+  * the next page is fetched before the current page's objects are deleted,
+    so the `after` cursor always names an object that still exists,
+  * deletes run on a bounded thread pool behind a shared token-bucket rate
+    limit (`rate` caps it; the client's labkit.rate_limits scheduler also
+    paces it under the account's reported limits); 429s are retried with
+    backoff (honouring retry-after), 404s count as already gone,
+  * after every page the cursor is saved in .sweep_state.json, so an
+    interrupted sweep resumes where it stopped instead of re-listing,
+  * dry_run=True only lists and returns the plan (counts, age range, samples).
+
+Threads have no public list endpoint; list_threads() tries GET /threads and
+the sweep reports it as unsupported when the API refuses. ledger_kind() walks
+the local resource ledger (labkit.ledger) instead of the account listing, so
+a sweep costs O(resources we created) and covers threads too.
+
+The openai package is imported on first use, so `99_cleanup.py --help` and
+the CLI start without it.
+"""
+
+from __future__ import annotations
+
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, List, Optional
+
+from labkit.ledger import ResourceLedger
+
+if TYPE_CHECKING:
+    import openai
+    from openai.pagination import SyncCursorPage
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+SWEEP_STATE_FILE = PROJECT_ROOT / ".sweep_state.json"
+PAGE_SIZE = 100
+
+
+class RateLimiter:
+    """Token bucket shared by the delete workers (`rate` operations per second)."""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Drain the bucket so every worker backs off after a 429."""
+        with self.lock:
+            self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+
+@dataclass
+class SweepKind:
+    """How to list, filter and delete one kind of resource."""
+    name: str
+    list_page: Callable[[Optional[str]], SyncCursorPage]   # after-cursor -> page (oldest first)
+    delete: Callable[[str], object]
+    describe: Callable[[object], str] = lambda obj: obj.id
+    keep: Callable[[object], bool] = lambda obj: False    # never delete these (e.g. the lab assistant's store)
+
+
+@dataclass
+class SweepResult:
+    kind: str
+    listed: int = 0
+    eligible: int = 0
+    deleted: int = 0
+    missing: int = 0
+    failed: int = 0
+    retries: int = 0
+    pages: int = 0
+    oldest: Optional[int] = None
+    newest: Optional[int] = None
+    samples: List[str] = field(default_factory=list)
+    unsupported: Optional[str] = None
+    seconds: float = 0.0
+
+    def note(self, obj, describe):
+        created = getattr(obj, "created_at", None)
+        if created is not None:
+            self.oldest = created if self.oldest is None else min(self.oldest, created)
+            self.newest = created if self.newest is None else max(self.newest, created)
+        if len(self.samples) < 5:
+            self.samples.append(describe(obj))
+
+
+class SweepState:
+    """Per-kind cursors of unfinished sweeps, persisted as JSON."""
+
+    def __init__(self, path: Optional[Path] = SWEEP_STATE_FILE):
+        self.path = path
+        self.data = {}
+        if path is not None and path.exists():
+            try:
+                self.data = json.loads(path.read_text())
+            except (ValueError, OSError):
+                self.data = {}
+
+    def cursor(self, kind: str, cutoff: int) -> Optional[str]:
+        entry = self.data.get(kind)
+        # A cursor is only valid for a sweep with the same cutoff or a later one.
+        if entry and entry.get("cutoff", 0) <= cutoff:
+            return entry.get("after")
+        return None
+
+    def save(self, kind: str, after: Optional[str], cutoff: int):
+        if after is None:
+            self.data.pop(kind, None)
+        else:
+            self.data[kind] = {"after": after, "cutoff": cutoff, "updated_at": int(time.time())}
+        if self.path is not None:
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            tmp.write_text(json.dumps(self.data, indent=2))
+            tmp.replace(self.path)
+
+
+def _retry_after(error: openai.APIStatusError, attempt: int) -> float:
+    headers = error.response.headers if error.response is not None else {}
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        try:
+            return float(headers[name]) * scale
+        except (KeyError, TypeError, ValueError):
+            continue
+    return min(30.0, 0.5 * 2 ** attempt) * random.uniform(0.8, 1.2)
+
+
+class Sweeper:
+    """Delete everything older than a cutoff, `workers` at a time under a `rate` limit."""
+
+    def __init__(self, workers: int = 8, rate: float = 20.0, max_attempts: int = 6,
+                 state: Optional[SweepState] = None, verbose: bool = False):
+        self.workers = workers
+        self.limiter = RateLimiter(rate)
+        self.max_attempts = max_attempts
+        self.state = state if state is not None else SweepState()
+        self.verbose = verbose
+        self.lock = threading.Lock()
+
+    def _delete(self, kind: SweepKind, obj, result: SweepResult):
+        import openai
+
+        for attempt in range(self.max_attempts):
+            self.limiter.acquire()
+            try:
+                kind.delete(obj.id)
+                outcome = "deleted"
+            except openai.NotFoundError:
+                outcome = "missing"
+            except openai.RateLimitError as e:
+                self.limiter.pause(_retry_after(e, attempt))  # the next acquire() waits it out
+                with self.lock:
+                    result.retries += 1
+                continue
+            except openai.APIError as e:
+                print(f"  ⚠️ Could not delete {kind.name[:-1]} {obj.id}: {e}")
+                outcome = "failed"
+            with self.lock:
+                setattr(result, outcome, getattr(result, outcome) + 1)
+            if self.verbose and outcome == "deleted":
+                print(f"  🗑️ Deleted {kind.describe(obj)}")
+            return
+        print(f"  ⚠️ Gave up on {kind.name[:-1]} {obj.id} after {self.max_attempts} rate-limited attempts")
+        with self.lock:
+            result.failed += 1
+
+    def sweep(self, kind: SweepKind, max_age_hours: float, dry_run: bool = False, resume: bool = True) -> SweepResult:
+        """Walk the listing oldest first and delete (or, with dry_run, count) objects older than max_age_hours."""
+        import openai
+
+        result = SweepResult(kind.name)
+        start = time.monotonic()
+        cutoff = int(time.time() - max_age_hours * 3600)
+        after = self.state.cursor(kind.name, cutoff) if resume and not dry_run else None
+        if after:
+            print(f"  ↪️  Resuming {kind.name} sweep after {after}")
+        try:
+            page = self._first_page(kind, after)
+        except (openai.NotFoundError, openai.PermissionDeniedError, openai.AuthenticationError,
+                openai.BadRequestError) as e:
+            result.unsupported = f"cannot list {kind.name}: {e.message if hasattr(e, 'message') else e}"
+            return result
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while page is not None:
+                result.pages += 1
+                items = page.data
+                result.listed += len(items)
+                young_reached = False
+                eligible = []
+                for obj in items:
+                    if (getattr(obj, "created_at", None) or 0) > cutoff:
+                        young_reached = True  # oldest first: everything after this is younger too
+                        break
+                    if not kind.keep(obj):
+                        eligible.append(obj)
+                        result.note(obj, kind.describe)
+                result.eligible += len(eligible)
+                # List the next page before deleting this one, so the cursor object still exists.
+                next_page = None
+                if items and not young_reached and page.has_next_page():
+                    next_page = kind.list_page(items[-1].id)
+                if not dry_run:
+                    list(pool.map(lambda obj: self._delete(kind, obj, result), eligible))
+                    self.state.save(kind.name, items[-1].id if next_page is not None else None, cutoff)
+                    if result.pages % 10 == 0:
+                        print(f"  ... {kind.name}: {result.deleted} deleted, {result.listed} listed")
+                page = next_page
+        result.seconds = time.monotonic() - start
+        return result
+
+    def _first_page(self, kind: SweepKind, after: Optional[str]) -> SyncCursorPage:
+        import openai
+
+        if after is None:
+            return kind.list_page(None)
+        try:
+            return kind.list_page(after)
+        except openai.APIStatusError:
+            # The saved cursor object is gone; restarting is cheap because old objects were deleted.
+            print(f"  ↪️  Saved {kind.name} cursor is no longer valid; starting from the oldest")
+            return kind.list_page(None)
+
+
+def list_threads(client, after: Optional[str] = None) -> SyncCursorPage:
+    """GET /threads (not in the SDK; only some keys may list threads)."""
+    from openai.pagination import SyncCursorPage
+    from openai.types.beta import Thread
+
+    params = {"limit": PAGE_SIZE, "order": "asc"}
+    if after:
+        params["after"] = after
+    return client.get_api_list("/threads", model=Thread, page=SyncCursorPage[Thread], options={"params": params})
+
+
+def _page_kwargs(after: Optional[str]) -> dict:
+    return {"limit": PAGE_SIZE, "order": "asc", **({"after": after} if after else {})}
+
+
+# Deletes go through a client without SDK retries: 429s are handled by the sweeper's limiter.
+
+def thread_kind(client) -> SweepKind:
+    deleter = client.with_options(max_retries=0)
+    return SweepKind("threads", lambda after: list_threads(client, after), deleter.beta.threads.delete)
+
+
+def file_kind(client, purpose: str = "assistants") -> SweepKind:
+    deleter = client.with_options(max_retries=0)
+    return SweepKind(
+        "files",
+        lambda after: client.files.list(purpose=purpose, **_page_kwargs(after)),
+        deleter.files.delete,
+        describe=lambda f: f"{f.id} ({f.filename})",
+    )
+
+
+def vector_store_kind(client, keep_ids=()) -> SweepKind:
+    keep_ids = set(keep_ids)
+    deleter = client.with_options(max_retries=0)
+    return SweepKind(
+        "vector_stores",
+        lambda after: client.vector_stores.list(**_page_kwargs(after)),
+        deleter.vector_stores.delete,
+        describe=lambda vs: f"{vs.id} ({vs.name or 'N/A'})",
+        keep=lambda vs: vs.id in keep_ids,
+    )
+
+
+def ledger_kind(ledger: ResourceLedger, kind: SweepKind, purpose: Optional[str] = None) -> SweepKind:
+    """Sweep `kind` from the local ledger: same deletes and filters, no account listing."""
+
+    def delete(resource_id: str):
+        import openai
+
+        try:
+            kind.delete(resource_id)
+        except openai.NotFoundError:
+            ledger.mark_deleted(resource_id)
+            raise
+        ledger.mark_deleted(resource_id)  # also when the client's ledger hook is off
+
+    return SweepKind(
+        kind.name,
+        lambda after: ledger.page(kind.name, after, limit=PAGE_SIZE, purpose=purpose),
+        delete,
+        describe=lambda entry: entry.describe(),
+        keep=kind.keep,
+    )
+
+
+def print_sweep_result(result: SweepResult, max_age_hours: float, dry_run: bool):
+    if result.unsupported:
+        print(f"ℹ️  Skipped {result.kind}: {result.unsupported}")
+        return
+    age = lambda ts: f"{(time.time() - ts) / 3600:.1f}h" if ts else "n/a"
+    if dry_run:
+        print(f"📝 Plan for {result.kind}: {result.eligible} of {result.listed} listed older than {max_age_hours}h "
+              f"(ages {age(result.newest)} to {age(result.oldest)}), {result.pages} page(s)")
+        for sample in result.samples:
+            print(f"    • {sample}")
+        return
+    print(f"✅ {result.kind}: deleted {result.deleted} of {result.eligible} older than {max_age_hours}h "
+          f"in {result.seconds:.1f}s ({result.missing} already gone, {result.failed} failed, "
+          f"{result.retries} rate-limit retries, {result.pages} page(s))")
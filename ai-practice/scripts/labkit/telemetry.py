@@ -0,0 +1,264 @@
+"""
+Latency and token telemetry for every OpenAI API call.
+
+The shared clients in labkit.client wrap their HTTP transport with
+TelemetryTransport (labkit.transports), so each request the SDK sends (threads, runs, messages,
+steps, files, vector stores, ...) is recorded without touching call sites:
+  * wall time, in a log-bucketed Histogram (constant memory, O(log n) insert),
+  * retry attempt (the SDK's x-stainless-retry-count request header),
+  * HTTP status (or "error" when no response arrived),
+  * token usage, when the JSON response carries a `usage` object.
+
+Requests are grouped by operation, e.g. "POST /threads/{id}/runs". For
+streamed responses the wall time covers the request up to the response
+headers; the stream itself is measured by labkit.streaming. File downloads
+are not buffered either, so callers can stream large batch results.
+
+Exports: print_summary() (p50/p95/p99 per operation, slowest total first),
+JSONL (one record per call plus one summary line per operation) and the
+Prometheus text exposition format. report_telemetry() prints the summary and,
+when OPENAI_TELEMETRY_DIR is set, writes calls.jsonl, summary.jsonl and
+metrics.prom into that directory.
+"""
+
+import bisect
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+_ID_SEGMENT = re.compile(r"[0-9A-Z-]")
+_TOKEN_KINDS = ("prompt_tokens", "completion_tokens", "total_tokens")
+_MAX_USAGE_BODY = 256 * 1024  # don't parse large bodies (file downloads) looking for usage
+
+
+def operation_name(method: str, path: str) -> str:
+    """'POST /v1/threads/thread_a1/runs' -> 'POST /threads/{id}/runs'."""
+    segments = [s for s in path.split("/") if s and s != "v1"]
+    return method + " /" + "/".join("{id}" if _ID_SEGMENT.search(s) else s for s in segments)
+
+
+class Histogram:
+    """
+    Log-bucketed latency histogram.
+
+    Buckets grow by 2**(1/4) (~19%) from 1 ms to ~17 min, so quantiles are
+    accurate to a few percent with a fixed 80-slot array and no stored samples.
+    """
+
+    BOUNDS: List[float] = [0.001 * 2 ** (i / 4) for i in range(80)]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.BOUNDS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Approximate q-quantile, interpolated inside the bucket and clamped to [min, max]."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = self.BOUNDS[i - 1] if i > 0 else 0.0
+                upper = self.BOUNDS[i] if i < len(self.BOUNDS) else self.max
+                value = lower + (upper - lower) * (rank - seen) / bucket_count
+                return min(max(value, self.min), self.max)
+            seen += bucket_count
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class OperationStats:
+    """Everything recorded for one operation."""
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.statuses: Dict[str, int] = defaultdict(int)
+        self.retries = 0
+        self.tokens: Dict[str, int] = defaultdict(int)
+
+    def as_dict(self, operation: str) -> dict:
+        return {
+            "operation": operation,
+            "count": self.latency.count,
+            "total_s": round(self.latency.total, 4),
+            "mean_s": round(self.latency.mean, 4),
+            "p50_s": round(self.latency.quantile(0.50), 4),
+            "p95_s": round(self.latency.quantile(0.95), 4),
+            "p99_s": round(self.latency.quantile(0.99), 4),
+            "max_s": round(self.latency.max, 4),
+            "retries": self.retries,
+            "statuses": dict(self.statuses),
+            "tokens": dict(self.tokens),
+        }
+
+
+class Telemetry:
+    """Thread-safe per-operation recorder; keeps the last `max_calls` call records for JSONL export."""
+
+    def __init__(self, max_calls: int = 100_000):
+        self._lock = threading.Lock()
+        self.operations: Dict[str, OperationStats] = defaultdict(OperationStats)
+        self.calls = deque(maxlen=max_calls)
+
+    def record(self, operation: str, seconds: float, status: str, retry: int = 0,
+               usage: Optional[Dict[str, int]] = None):
+        with self._lock:
+            stats = self.operations[operation]
+            stats.latency.observe(seconds)
+            stats.statuses[status] += 1
+            if retry:
+                stats.retries += 1
+            for kind, value in (usage or {}).items():
+                stats.tokens[kind] += value
+            self.calls.append({
+                "ts": round(time.time(), 3),
+                "operation": operation,
+                "seconds": round(seconds, 4),
+                "status": status,
+                "retry": retry,
+                **({"usage": usage} if usage else {}),
+            })
+
+    def reset(self):
+        with self._lock:
+            self.operations.clear()
+            self.calls.clear()
+
+    def snapshot(self) -> List[Tuple[str, OperationStats]]:
+        """Operations sorted by total wall time, slowest first."""
+        with self._lock:
+            return sorted(self.operations.items(), key=lambda item: item[1].latency.total, reverse=True)
+
+    def print_summary(self, top: int = 12):
+        rows = self.snapshot()
+        if not rows:
+            return
+        print("📈 API latency by operation (slowest total first):")
+        print(f"   {'operation':<44} {'calls':>5} {'total':>8} {'p50':>7} {'p95':>7} {'p99':>7} {'retries':>7} {'tokens':>8}")
+        for operation, stats in rows[:top]:
+            h = stats.latency
+            print(f"   {operation[:44]:<44} {h.count:>5} {h.total:>7.2f}s {h.quantile(0.5):>6.2f}s "
+                  f"{h.quantile(0.95):>6.2f}s {h.quantile(0.99):>6.2f}s {stats.retries:>7} "
+                  f"{stats.tokens.get('total_tokens', 0):>8}")
+        errors = sum(n for _, s in rows for status, n in s.statuses.items() if not status.startswith("2"))
+        if errors:
+            print(f"   ⚠️  {errors} call(s) returned an error status")
+
+    def write_calls_jsonl(self, path: Path):
+        with self._lock:
+            calls = list(self.calls)
+        with open(path, "w") as f:
+            for call in calls:
+                f.write(json.dumps(call) + "\n")
+
+    def write_summary_jsonl(self, path: Path):
+        with open(path, "w") as f:
+            for operation, stats in self.snapshot():
+                f.write(json.dumps(stats.as_dict(operation)) + "\n")
+
+    def prometheus_text(self) -> str:
+        """Metrics in the Prometheus text exposition format (summary + counters)."""
+        def label(value: str) -> str:
+            return value.replace("\\", "\\\\").replace('"', '\\"')
+
+        rows = self.snapshot()
+        lines = [
+            "# HELP openai_request_duration_seconds Wall time of OpenAI HTTP requests.",
+            "# TYPE openai_request_duration_seconds summary",
+        ]
+        for operation, stats in rows:
+            op = label(operation)
+            for q in (0.5, 0.95, 0.99):
+                lines.append(f'openai_request_duration_seconds{{operation="{op}",quantile="{q}"}} '
+                             f"{stats.latency.quantile(q):.6f}")
+            lines.append(f'openai_request_duration_seconds_sum{{operation="{op}"}} {stats.latency.total:.6f}')
+            lines.append(f'openai_request_duration_seconds_count{{operation="{op}"}} {stats.latency.count}')
+        lines += ["# HELP openai_requests_total OpenAI HTTP requests by status.", "# TYPE openai_requests_total counter"]
+        for operation, stats in rows:
+            for status, n in sorted(stats.statuses.items()):
+                lines.append(f'openai_requests_total{{operation="{label(operation)}",status="{status}"}} {n}')
+        lines += ["# HELP openai_request_retries_total Retried OpenAI HTTP requests.",
+                  "# TYPE openai_request_retries_total counter"]
+        for operation, stats in rows:
+            lines.append(f'openai_request_retries_total{{operation="{label(operation)}"}} {stats.retries}')
+        lines += ["# HELP openai_tokens_total Tokens reported in response usage.", "# TYPE openai_tokens_total counter"]
+        for operation, stats in rows:
+            for kind, n in sorted(stats.tokens.items()):
+                lines.append(f'openai_tokens_total{{operation="{label(operation)}",kind="{kind.replace("_tokens", "")}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, directory: Path):
+        directory.mkdir(parents=True, exist_ok=True)
+        self.write_calls_jsonl(directory / "calls.jsonl")
+        self.write_summary_jsonl(directory / "summary.jsonl")
+        (directory / "metrics.prom").write_text(self.prometheus_text())
+
+
+_telemetry = Telemetry()
+
+
+def get_telemetry() -> Telemetry:
+    """The process-wide recorder fed by the shared clients."""
+    return _telemetry
+
+
+def report_telemetry():
+    """Print the latency summary (and client-side pacing) and export files if OPENAI_TELEMETRY_DIR is set."""
+    from labkit.rate_limits import print_pacing_summary
+
+    telemetry = get_telemetry()
+    telemetry.print_summary()
+    print_pacing_summary()
+    directory = os.getenv("OPENAI_TELEMETRY_DIR")
+    if directory:
+        telemetry.export(Path(directory))
+        print(f"📁 Telemetry written to {directory}/ (calls.jsonl, summary.jsonl, metrics.prom)")
+
+
+def _usage_from(response) -> Optional[Dict[str, int]]:
+    content = response.content
+    if b'"usage"' not in content:
+        return None
+    try:
+        usage = json.loads(content).get("usage")
+    except ValueError:
+        return None
+    if not isinstance(usage, dict):
+        return None
+    return {kind: usage[kind] for kind in _TOKEN_KINDS if isinstance(usage.get(kind), int)}
+
+
+def _retry_attempt(request) -> int:
+    try:
+        return int(request.headers.get("x-stainless-retry-count", 0))
+    except ValueError:
+        return 0
+
+
+def _may_carry_usage(response) -> bool:
+    """Only small JSON bodies are read early; SSE streams, file downloads and bodies of unknown
+    length (chunked or compressed) stay unbuffered."""
+    if "json" not in response.headers.get("content-type", ""):
+        return False
+    length = response.headers.get("content-length")
+    return length is not None and length.isdigit() and int(length) <= _MAX_USAGE_BODY
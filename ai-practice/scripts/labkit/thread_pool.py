@@ -0,0 +1,324 @@
+"""
+Thread pools for one-shot runs (RAG queries, structured-output demos).
+
+Every query used to create its own thread and leave it behind, so a run of
+the lab paid a threads.create per request and left thousands of orphans for
+99_cleanup.py. A pool owns the threads instead:
+  * lease() hands out a pre-created (prefill) or recycled thread and takes
+    it back afterwards; at most `max_threads` are leased at once,
+  * recycled threads are safe when history is not needed: runs on them get
+    truncation_strategy last_messages=1 (RECYCLED_RUN_OPTIONS), so the model
+    only sees the new message,
+  * run() is the one-shot path: with recycle=True it adds the message to a
+    leased thread and runs it; with recycle=False it is a single
+    create_and_run call on a fresh thread,
+  * retire() takes over threads created elsewhere (e.g. by a streamed
+    create_and_run) so they are deleted with the rest,
+  * threads that cannot be reused (stateless runs, runs left active, errors)
+    are retired and deleted in bulk, whenever `max_threads` of them pile up
+    and on close(); a pool built with delete=False keeps every thread for
+    inspection instead.
+
+ThreadPool works with the sync client, AsyncThreadPool with AsyncOpenAI.
+
+Usage:
+    with ThreadPool(client, max_threads=8) as pool:
+        thread_id, run = pool.run(assistant_id, prompt, instructions=...)
+        messages = client.beta.threads.messages.list(thread_id=thread_id, run_id=run.id)
+"""
+
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from typing import List, Tuple
+
+RECYCLED_RUN_OPTIONS = {"truncation_strategy": {"type": "last_messages", "last_messages": 1}}
+SETTLED_RUN_STATUSES = ("completed", "failed", "cancelled", "expired", "incomplete")
+
+
+@dataclass
+class ThreadLease:
+    """A leased thread; call discard() when it must not be handed out again."""
+    thread_id: str
+    reusable: bool = True
+
+    def discard(self):
+        self.reusable = False
+
+
+class _PoolState:
+    """Bookkeeping shared by the sync and async pools (not thread-safe on its own)."""
+
+    def __init__(self, recycle: bool, max_threads: int, delete: bool):
+        self.recycle = recycle
+        self.delete = delete
+        self.max_threads = max(1, max_threads)
+        self.idle = deque()
+        self.retired: List[str] = []
+        self.created = self.reused = self.deleted = self.kept = 0
+
+    @property
+    def run_options(self) -> dict:
+        """Extra runs.create(...) options for runs on pool threads."""
+        return dict(RECYCLED_RUN_OPTIONS) if self.recycle else {}
+
+    def take_idle(self):
+        if self.recycle and self.idle:
+            self.reused += 1
+            return self.idle.popleft()
+        return None
+
+    def give_back(self, lease: ThreadLease) -> bool:
+        """Return a lease; True when the retired threads should be flushed now."""
+        if self.recycle and lease.reusable:
+            self.idle.append(lease.thread_id)
+            return False
+        self.retired.append(lease.thread_id)
+        return self.delete and len(self.retired) >= self.max_threads
+
+    def drain(self, include_idle: bool) -> List[str]:
+        thread_ids = self.retired + (list(self.idle) if include_idle else [])
+        self.retired = []
+        if include_idle:
+            self.idle.clear()
+        return thread_ids
+
+    def stats(self) -> str:
+        mode = "recycled" if self.recycle else "one per run"
+        return (f"🧵 Thread pool ({mode}): {self.created} created, {self.reused} reused, "
+                f"{self.deleted} deleted, {self.kept or len(self.idle) + len(self.retired)} kept")
+
+
+class ThreadPool(_PoolState):
+    """Leases, recycles and bulk-deletes threads for a sync OpenAI client."""
+
+    def __init__(self, client, max_threads: int = 16, recycle: bool = True, delete: bool = True,
+                 prefill: int = 0, delete_workers: int = 8):
+        super().__init__(recycle, max_threads, delete)
+        self.client = client
+        self.delete_workers = delete_workers
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_threads)
+        if prefill:
+            self.prefill(prefill)
+
+    def prefill(self, count: int):
+        """Create `count` empty threads up front (recycling pools only)."""
+        count = min(count, self.max_threads) if self.recycle else 0
+        with ThreadPoolExecutor(max_workers=min(self.delete_workers, count or 1)) as pool:
+            threads = list(pool.map(lambda _: self.client.beta.threads.create(), range(count)))
+        with self._lock:
+            self.created += len(threads)
+            self.idle.extend(thread.id for thread in threads)
+
+    def _new_thread(self, messages=None) -> str:
+        thread = self.client.beta.threads.create(**({"messages": messages} if messages else {}))
+        with self._lock:
+            self.created += 1
+        return thread.id
+
+    def _release(self, lease: ThreadLease):
+        with self._lock:
+            flush = self.give_back(lease)
+        self._slots.release()
+        if flush:
+            self.flush()
+
+    @contextmanager
+    def lease(self, messages=None):
+        """
+        Yield a ThreadLease holding `messages`; the thread goes back to the pool (or is retired) on exit.
+
+        A new thread is created with the messages in one call; a recycled one gets them via messages.create.
+        """
+        self._slots.acquire()
+        lease = None
+        try:
+            with self._lock:
+                thread_id = self.take_idle()
+            lease = ThreadLease(thread_id) if thread_id else None
+            for message in (messages or []) if lease else []:
+                self.client.beta.threads.messages.create(thread_id=lease.thread_id, **message)
+            lease = lease or ThreadLease(self._new_thread(messages))
+            yield lease
+        except BaseException:
+            if lease is not None:
+                lease.discard()  # a run may still be active on it
+            raise
+        finally:
+            if lease is not None:
+                self._release(lease)
+            else:
+                self._slots.release()
+
+    def run(self, assistant_id: str, prompt: str, **run_kwargs) -> Tuple[str, object]:
+        """One-shot run of `prompt`; returns (thread_id, run). Read its messages with run_id=run.id."""
+        message = {"role": "user", "content": prompt}
+        if not self.recycle:
+            self._slots.acquire()
+            try:
+                run = self.client.beta.threads.create_and_run_poll(
+                    assistant_id=assistant_id, thread={"messages": [message]}, **run_kwargs)
+            finally:
+                self._slots.release()
+            self.retire(run.thread_id)
+            return run.thread_id, run
+        with self.lease([message]) as lease:
+            run = self.client.beta.threads.runs.create_and_poll(
+                thread_id=lease.thread_id, assistant_id=assistant_id, **self.run_options, **run_kwargs)
+            if run.status not in SETTLED_RUN_STATUSES:
+                lease.discard()  # e.g. requires_action: the thread still has an active run
+            return lease.thread_id, run
+
+    def retire(self, thread_id: str):
+        """Take ownership of a finished thread created outside the pool; it is deleted with the rest."""
+        with self._lock:
+            self.created += 1
+            flush = self.give_back(ThreadLease(thread_id, reusable=False))
+        if flush:
+            self.flush()
+
+    def _delete(self, thread_id: str):
+        import openai
+
+        try:
+            self.client.beta.threads.delete(thread_id)
+        except openai.NotFoundError:
+            pass
+        except openai.APIError as e:
+            print(f"  ⚠️ Could not delete thread {thread_id}: {e}")
+            return
+        with self._lock:
+            self.deleted += 1
+
+    def flush(self, include_idle: bool = False):
+        """Delete retired threads (and idle ones with include_idle) in parallel."""
+        with self._lock:
+            thread_ids = self.drain(include_idle)
+        if thread_ids:
+            with ThreadPoolExecutor(max_workers=min(self.delete_workers, len(thread_ids))) as pool:
+                list(pool.map(self._delete, thread_ids))
+
+    def close(self):
+        """Delete every thread the pool still holds (or just forget them for a delete=False pool)."""
+        if self.delete:
+            self.flush(include_idle=True)
+        else:
+            with self._lock:
+                self.kept += len(self.drain(include_idle=True))
+
+    def print_stats(self):
+        print(self.stats())
+
+    def __enter__(self) -> "ThreadPool":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class AsyncThreadPool(_PoolState):
+    """Async twin of ThreadPool for an AsyncOpenAI client (one event loop)."""
+
+    def __init__(self, client, max_threads: int = 16, recycle: bool = True, delete: bool = True):
+        super().__init__(recycle, max_threads, delete)
+        self.client = client
+        self._slots = asyncio.Semaphore(self.max_threads)
+        self._flushes = set()
+
+    async def prefill(self, count: int):
+        """Create `count` empty threads up front (recycling pools only)."""
+        count = min(count, self.max_threads) if self.recycle else 0
+        threads = await asyncio.gather(*(self.client.beta.threads.create() for _ in range(count)))
+        self.created += len(threads)
+        self.idle.extend(thread.id for thread in threads)
+
+    async def _new_thread(self, messages=None) -> str:
+        thread = await self.client.beta.threads.create(**({"messages": messages} if messages else {}))
+        self.created += 1
+        return thread.id
+
+    def _give_back(self, lease: ThreadLease):
+        if self.give_back(lease):
+            task = asyncio.ensure_future(self.flush())  # don't hold the caller up on bulk deletes
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    @asynccontextmanager
+    async def lease(self, messages=None):
+        """Yield a ThreadLease holding `messages`; the thread goes back to the pool (or is retired) on exit."""
+        async with self._slots:
+            lease = None
+            try:
+                thread_id = self.take_idle()
+                lease = ThreadLease(thread_id) if thread_id else None
+                for message in (messages or []) if lease else []:
+                    await self.client.beta.threads.messages.create(thread_id=lease.thread_id, **message)
+                lease = lease or ThreadLease(await self._new_thread(messages))
+                yield lease
+            except BaseException:
+                if lease is not None:
+                    lease.discard()  # cancelled or failed mid-run; a run may still be active on it
+                raise
+            finally:
+                if lease is not None:
+                    self._give_back(lease)
+
+    async def run(self, assistant_id: str, prompt: str, **run_kwargs) -> Tuple[str, object]:
+        """One-shot run of `prompt`; returns (thread_id, run). Read its messages with run_id=run.id."""
+        message = {"role": "user", "content": prompt}
+        if not self.recycle:
+            async with self._slots:
+                run = await self.client.beta.threads.create_and_run_poll(
+                    assistant_id=assistant_id, thread={"messages": [message]}, **run_kwargs)
+            self.retire(run.thread_id)
+            return run.thread_id, run
+        async with self.lease([message]) as lease:
+            run = await self.client.beta.threads.runs.create_and_poll(
+                thread_id=lease.thread_id, assistant_id=assistant_id, **self.run_options, **run_kwargs)
+            if run.status not in SETTLED_RUN_STATUSES:
+                lease.discard()
+            return lease.thread_id, run
+
+    def retire(self, thread_id: str):
+        """Take ownership of a finished thread created outside the pool; it is deleted with the rest."""
+        self.created += 1
+        self._give_back(ThreadLease(thread_id, reusable=False))
+
+    async def _delete(self, thread_id: str):
+        import openai
+
+        try:
+            await self.client.beta.threads.delete(thread_id)
+        except openai.NotFoundError:
+            pass
+        except openai.APIError as e:
+            print(f"  ⚠️ Could not delete thread {thread_id}: {e}")
+            return
+        self.deleted += 1
+
+    async def flush(self, include_idle: bool = False):
+        """Delete retired threads (and idle ones with include_idle) concurrently."""
+        thread_ids = self.drain(include_idle)
+        await asyncio.gather(*(self._delete(thread_id) for thread_id in thread_ids))
+
+    async def close(self):
+        """Delete every thread the pool still holds (or just forget them for a delete=False pool)."""
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+        if self.delete:
+            await self.flush(include_idle=True)
+        else:
+            self.kept += len(self.drain(include_idle=True))
+
+    def print_stats(self):
+        print(self.stats())
+
+    async def __aenter__(self) -> "AsyncThreadPool":
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
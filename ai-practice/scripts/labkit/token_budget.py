@@ -0,0 +1,208 @@
+"""
+Token budgets for threads that keep growing.
+
+A thread that is run again and again re-sends its whole history as the
+prompt, so latency and cost grow with every turn. ThreadBudget keeps a local
+count instead of asking the API:
+  * add() counts each message once, when it is posted (tiktoken when it is
+    installed, otherwise ~4 characters per token); assistant turns are
+    counted from run.usage.completion_tokens, so replies never need fetching,
+  * record_run() also compares the run's real prompt_tokens with the
+    prediction and keeps a calibration factor, which absorbs the heuristic's
+    error and the assistant/tool overhead the planner cannot see,
+  * plan() predicts the next run's prompt tokens and prompt cost
+    (labkit.pricing) before it starts; over max_prompt_tokens it adds
+    truncation_strategy last_messages=N, so the model only sees the newest
+    turns that fit,
+  * compact() summarizes the turns that no longer fit with one chat
+    completion and moves the summary plus the recent turns to a new thread,
+    for conversations where the older context still matters.
+
+Usage:
+    budget = ThreadBudget(model="gpt-4o-mini", max_prompt_tokens=4000)
+    budget.add("user", question)
+    plan = budget.plan(instructions)
+    run = client.beta.threads.runs.create_and_poll(..., **plan.run_options)
+    budget.record_run(run, plan)
+"""
+
+import math
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+from labkit.pricing import cost_usd
+
+MESSAGE_OVERHEAD = 4   # role and separator tokens around every message
+PROMPT_OVERHEAD = 3    # tokens that prime the reply
+CHARS_PER_TOKEN = 4.0  # fallback estimate without tiktoken
+SUMMARY_PROMPT = ("Summarize this conversation for its own continuation. Keep the user's goals, the facts "
+                  "and definitions established so far and any open questions; drop pleasantries.")
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Tokens in `text` for `model`: exact with tiktoken, estimated from its length otherwise."""
+    encoding = _encoding(model or "gpt-4o-mini")
+    if encoding is None:
+        return math.ceil(len(text) / CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+@dataclass
+class Turn:
+    role: str
+    tokens: int
+
+
+@dataclass
+class BudgetPlan:
+    """Prediction for the next run and the run options that keep it within budget."""
+    prompt_tokens: int        # calibrated prediction
+    estimated_tokens: int     # raw local count, before calibration
+    kept_messages: int
+    dropped_messages: int
+    cost_usd: Optional[float]
+    run_options: dict = field(default_factory=dict)
+
+    @property
+    def truncated(self) -> bool:
+        return self.dropped_messages > 0
+
+    def describe(self) -> str:
+        cost = f"${self.cost_usd:.5f}" if self.cost_usd is not None else "unknown cost"
+        line = f"🧮 Next prompt ≈ {self.prompt_tokens} tokens ({cost})"
+        if self.truncated:
+            line += f", last {self.kept_messages} messages only ({self.dropped_messages} older ones skipped)"
+        return line
+
+
+class ThreadBudget:
+    """Incremental token count of one thread and the budget its runs must fit."""
+
+    def __init__(self, model: Optional[str] = None, max_prompt_tokens: Optional[int] = None,
+                 min_messages: int = 2, summary_model: str = "gpt-4o-mini"):
+        self.model = model
+        self.max_prompt_tokens = max_prompt_tokens
+        self.min_messages = max(1, min_messages)
+        self.summary_model = summary_model
+        self.turns: List[Turn] = []
+        self.total = 0            # message tokens, overhead included
+        self.calibration = 1.0    # observed / predicted prompt tokens
+        self.compactions = 0
+
+    def add_tokens(self, role: str, tokens: int) -> int:
+        turn = Turn(role, tokens + MESSAGE_OVERHEAD)
+        self.turns.append(turn)
+        self.total += turn.tokens
+        return turn.tokens
+
+    def add(self, role: str, text: str) -> int:
+        """Count one message posted to the thread; returns its tokens."""
+        return self.add_tokens(role, count_tokens(text, self.model))
+
+    def reset(self):
+        self.turns = []
+        self.total = 0
+
+    def _fixed_tokens(self, instructions: str) -> int:
+        return count_tokens(instructions, self.model) + PROMPT_OVERHEAD if instructions else PROMPT_OVERHEAD
+
+    def over_budget(self, instructions: str = "") -> bool:
+        """Whether the whole thread plus `instructions` would exceed max_prompt_tokens."""
+        return (bool(self.max_prompt_tokens)
+                and (self._fixed_tokens(instructions) + self.total) * self.calibration > self.max_prompt_tokens)
+
+    def _kept(self, instructions: str) -> Tuple[int, int]:
+        """(messages kept, their tokens): the newest turns that fit the budget, at least min_messages."""
+        if not self.over_budget(instructions):
+            return len(self.turns), self.total
+        fixed = self._fixed_tokens(instructions)
+        kept = tokens = 0
+        for turn in reversed(self.turns):
+            if kept >= self.min_messages and (fixed + tokens + turn.tokens) * self.calibration > self.max_prompt_tokens:
+                break
+            kept += 1
+            tokens += turn.tokens
+        return kept, tokens
+
+    def plan(self, instructions: str = "") -> BudgetPlan:
+        """Predict the next run's prompt and, over budget, truncate it to the newest turns that fit."""
+        kept, tokens = self._kept(instructions)
+        estimated = self._fixed_tokens(instructions) + tokens
+        prompt_tokens = round(estimated * self.calibration)
+        options = {}
+        if kept < len(self.turns):
+            options["truncation_strategy"] = {"type": "last_messages", "last_messages": kept}
+        return BudgetPlan(prompt_tokens, estimated, kept, len(self.turns) - kept,
+                          cost_usd(self.model, prompt_tokens, 0), options)
+
+    def record_run(self, run, plan: Optional[BudgetPlan] = None):
+        """Count the run's reply and calibrate the estimate with the prompt tokens it really used."""
+        self.model = self.model or getattr(run, "model", None)
+        usage = getattr(run, "usage", None)
+        if usage is None:
+            return
+        if usage.completion_tokens:
+            self.add_tokens("assistant", usage.completion_tokens)
+        if plan is not None and plan.estimated_tokens and usage.prompt_tokens:
+            observed = usage.prompt_tokens / plan.estimated_tokens
+            self.calibration = 0.5 * self.calibration + 0.5 * observed  # smooth out single odd runs
+
+    def compact(self, client, thread_id: str, keep_last: Optional[int] = None, delete_old: bool = True) -> str:
+        """
+        Summarize all but the newest `keep_last` messages into a new thread; returns its id.
+
+        Costs one messages listing, one chat completion and one threads.create (plus the delete).
+        """
+        import openai
+
+        keep_last = keep_last if keep_last is not None else self.min_messages
+        messages = []
+        for message in client.beta.threads.messages.list(thread_id=thread_id, order="asc", limit=100):
+            text = "".join(block.text.value for block in message.content if block.type == "text")
+            messages.append({"role": message.role, "content": text})
+        split = max(0, len(messages) - keep_last)
+        older, recent = messages[:split], messages[split:]
+        if not older:
+            return thread_id
+        transcript = "\n\n".join(f"{m['role'].upper()}: {m['content']}" for m in older)
+        completion = client.chat.completions.create(
+            model=self.summary_model,
+            messages=[{"role": "system", "content": SUMMARY_PROMPT}, {"role": "user", "content": transcript}],
+        )
+        summary = completion.choices[0].message.content or ""
+        seed = [{"role": "assistant", "content": f"Summary of our conversation so far:\n{summary}"}] + recent
+        thread = client.beta.threads.create(messages=seed)
+        if delete_old:
+            try:
+                client.beta.threads.delete(thread_id)
+            except openai.NotFoundError:
+                pass
+        self.reset()
+        for message in seed:
+            self.add(message["role"], message["content"])
+        self.compactions += 1
+        return thread.id
+
+    def enforce(self, client, thread_id: str, compact: bool = False, instructions: str = "") -> str:
+        """Before a run: compact the thread when `compact` is set and the next prompt would exceed the budget."""
+        if compact and self.over_budget(instructions):
+            return self.compact(client, thread_id, keep_last=self.plan(instructions).kept_messages)
+        return thread_id
+
+    def summary(self) -> str:
+        budget = f" of {self.max_prompt_tokens}" if self.max_prompt_tokens else ""
+        return (f"🧮 Thread budget: {len(self.turns)} messages, ≈{round(self.total * self.calibration)}{budget} tokens "
+                f"(calibration ×{self.calibration:.2f}, {self.compactions} compaction(s))")
@@ -0,0 +1,165 @@
+"""
+Registry of strict function-tool schemas compiled from Pydantic models.
+
+Installing a function tool used to cost a model_json_schema() call plus two
+assistants.update round trips per invocation (install, then reset), and two
+processes sharing the assistant could overwrite each other's tools. Instead:
+  * ToolSchemaRegistry compiles a model to a strict tool schema once and
+    caches it by model hash, in memory and in .tool_schemas.json, so later
+    runs skip schema generation entirely until the model changes,
+  * the compiled tool is passed per run (runs.create(tools=[...])), leaving
+    the shared assistant untouched,
+  * ensure_assistant_tools() installs tools on the assistant only when the
+    remote tool set differs, for the cases that do want them there.
+
+Strict mode requires every property to be listed in "required" and
+"additionalProperties": false on every object; optional fields stay
+nullable through their anyOf [..., null] type.
+
+Usage:
+    tool = get_registry().function_tool(LectureSummary, "summarize_lecture_topic", "Summarizes ...")
+    client.beta.threads.runs.create_and_poll(..., tools=[{"type": "file_search"}, tool])
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Type
+
+if TYPE_CHECKING:
+    from pydantic import BaseModel
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+TOOL_SCHEMA_FILE = PROJECT_ROOT / ".tool_schemas.json"
+DEFAULT_TOOLS = [{"type": "file_search"}]
+
+
+def model_hash(model: Type[BaseModel]) -> str:
+    """Hash of a model's field definitions: name, type, default and description."""
+    parts = [f"{model.__module__}.{model.__qualname__}", model.__doc__ or ""]
+    for name, info in model.model_fields.items():
+        parts.append(f"{name}|{info.annotation!r}|{info.is_required()}|{info.default!r}|{info.description}")
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()[:16]
+
+
+def strict_schema(schema: dict) -> dict:
+    """Rewrite a JSON schema for strict mode: every object closed and all properties required."""
+    schema = copy.deepcopy(schema)
+
+    def visit(node):
+        if isinstance(node, dict):
+            node.pop("default", None)
+            node.pop("title", None)
+            if node.get("type") == "object" and "properties" in node:
+                node["required"] = list(node["properties"])
+                node["additionalProperties"] = False
+            for key, value in node.items():
+                if key in ("properties", "$defs"):
+                    for prop in value.values():  # property/definition names are data, not schema keywords
+                        visit(prop)
+                else:
+                    visit(value)
+        elif isinstance(node, list):
+            for item in node:
+                visit(item)
+
+    visit(schema)
+    return schema
+
+
+class ToolSchemaRegistry:
+    """Strict function-tool schemas keyed by model hash, persisted as JSON."""
+
+    def __init__(self, path: Optional[Path] = TOOL_SCHEMA_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.schemas: Dict[str, dict] = {}
+        self.compiled = 0
+        if path is not None and path.exists():
+            try:
+                self.schemas = json.loads(path.read_text())
+            except (ValueError, OSError):
+                self.schemas = {}
+
+    def parameters(self, model: Type[BaseModel]) -> dict:
+        """The strict parameters schema for `model`, compiled on first use only."""
+        key = model_hash(model)
+        with self.lock:
+            schema = self.schemas.get(key)
+            if schema is None:
+                schema = strict_schema(model.model_json_schema())
+                self.schemas[key] = schema
+                self.compiled += 1
+                self._save()
+        return schema
+
+    def function_tool(self, model: Type[BaseModel], name: str, description: str) -> dict:
+        """A {"type": "function", ...} tool definition ready for runs.create(tools=...)."""
+        return {
+            "type": "function",
+            "function": {
+                "name": name,
+                "description": description,
+                "strict": True,
+                "parameters": self.parameters(model),
+            },
+        }
+
+    def _save(self):
+        if self.path is None:
+            return
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(self.schemas, indent=2, sort_keys=True))
+        tmp.replace(self.path)
+
+
+_registry: Optional[ToolSchemaRegistry] = None
+
+
+def get_registry() -> ToolSchemaRegistry:
+    """The process-wide registry backed by .tool_schemas.json."""
+    global _registry
+    if _registry is None:
+        _registry = ToolSchemaRegistry()
+    return _registry
+
+
+def set_registry(registry: ToolSchemaRegistry):
+    """Replace the process-wide registry (e.g. an in-memory one for benchmarks)."""
+    global _registry
+    _registry = registry
+
+
+def tool_signature(tool) -> dict:
+    """The parts of a tool definition that matter when comparing local and remote tool sets."""
+    if not isinstance(tool, dict):
+        tool = tool.model_dump(exclude_none=True)
+    signature = {"type": tool["type"]}
+    if tool["type"] == "function":
+        function = tool["function"]
+        signature.update(
+            name=function["name"],
+            description=function.get("description"),
+            strict=bool(function.get("strict")),
+            parameters=function.get("parameters") or {},
+        )
+    return signature
+
+
+def tools_match(remote_tools: Iterable, tools: Iterable) -> bool:
+    """True when both tool lists define the same tools (order-insensitive)."""
+    canonical = lambda ts: sorted(json.dumps(tool_signature(t), sort_keys=True) for t in ts)
+    return canonical(remote_tools) == canonical(tools)
+
+
+def ensure_assistant_tools(client, assistant_id: str, tools: List[dict]) -> bool:
+    """Install `tools` on the assistant unless it already has exactly them; returns True if it updated."""
+    assistant = client.beta.assistants.retrieve(assistant_id)
+    if tools_match(assistant.tools, tools):
+        return False
+    client.beta.assistants.update(assistant_id=assistant_id, tools=tools)
+    return True
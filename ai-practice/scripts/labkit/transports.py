@@ -0,0 +1,182 @@
+"""
+httpx transport wrappers behind the shared clients.
+
+labkit.client stacks them around its connection pool when it builds a
+client: TelemetryTransport innermost (labkit.telemetry), then
+RateLimitTransport (labkit.rate_limits), then LedgerTransport
+(labkit.ledger) outermost. They are kept apart from the recorders they feed
+so that importing those modules, e.g. for `99_cleanup.py --help`, does not
+import httpx; only building a client imports this module.
+"""
+
+import sqlite3
+import time
+from typing import Optional
+
+import httpx
+
+from labkit.ledger import ResourceLedger, _observe, _record_created, get_ledger
+from labkit.rate_limits import RateLimitScheduler, estimate_tokens, get_scheduler
+from labkit.telemetry import Telemetry, _may_carry_usage, _retry_attempt, _usage_from, get_telemetry, operation_name
+
+
+class TelemetryTransport(httpx.BaseTransport):
+    """Records every request sent through the wrapped sync transport."""
+
+    def __init__(self, inner: httpx.BaseTransport, telemetry: Telemetry):
+        self._inner = inner
+        self._telemetry = telemetry
+
+    def handle_request(self, request):
+        operation = operation_name(request.method, request.url.path)
+        start = time.perf_counter()
+        try:
+            response = self._inner.handle_request(request)
+        except Exception:
+            self._telemetry.record(operation, time.perf_counter() - start, "error", _retry_attempt(request))
+            raise
+        usage = None
+        if _may_carry_usage(response):
+            response.read()
+            usage = _usage_from(response)
+        self._telemetry.record(operation, time.perf_counter() - start, str(response.status_code),
+                               _retry_attempt(request), usage)
+        return response
+
+    def close(self):
+        self._inner.close()
+
+
+class AsyncTelemetryTransport(httpx.AsyncBaseTransport):
+    """Async twin of TelemetryTransport."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, telemetry: Telemetry):
+        self._inner = inner
+        self._telemetry = telemetry
+
+    async def handle_async_request(self, request):
+        operation = operation_name(request.method, request.url.path)
+        start = time.perf_counter()
+        try:
+            response = await self._inner.handle_async_request(request)
+        except Exception:
+            self._telemetry.record(operation, time.perf_counter() - start, "error", _retry_attempt(request))
+            raise
+        usage = None
+        if _may_carry_usage(response):
+            await response.aread()
+            usage = _usage_from(response)
+        self._telemetry.record(operation, time.perf_counter() - start, str(response.status_code),
+                               _retry_attempt(request), usage)
+        return response
+
+    async def aclose(self):
+        await self._inner.aclose()
+
+
+def instrument(transport: httpx.BaseTransport, telemetry: Optional[Telemetry] = None) -> TelemetryTransport:
+    """Wrap a sync httpx transport so its requests are recorded."""
+    return TelemetryTransport(transport, telemetry or get_telemetry())
+
+
+def instrument_async(transport: httpx.AsyncBaseTransport,
+                     telemetry: Optional[Telemetry] = None) -> AsyncTelemetryTransport:
+    """Wrap an async httpx transport so its requests are recorded."""
+    return AsyncTelemetryTransport(transport, telemetry or get_telemetry())
+
+
+class RateLimitTransport(httpx.BaseTransport):
+    """Paces requests sent through the wrapped sync transport."""
+
+    def __init__(self, inner: httpx.BaseTransport, scheduler: RateLimitScheduler):
+        self._inner = inner
+        self._scheduler = scheduler
+
+    def handle_request(self, request):
+        self._scheduler.acquire(estimate_tokens(request))
+        response = self._inner.handle_request(request)
+        self._scheduler.observe(response.status_code, response.headers)
+        return response
+
+    def close(self):
+        self._inner.close()
+
+
+class AsyncRateLimitTransport(httpx.AsyncBaseTransport):
+    """Async twin of RateLimitTransport."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, scheduler: RateLimitScheduler):
+        self._inner = inner
+        self._scheduler = scheduler
+
+    async def handle_async_request(self, request):
+        await self._scheduler.acquire_async(estimate_tokens(request))
+        response = await self._inner.handle_async_request(request)
+        self._scheduler.observe(response.status_code, response.headers)
+        return response
+
+    async def aclose(self):
+        await self._inner.aclose()
+
+
+def pace(transport: httpx.BaseTransport, scheduler: Optional[RateLimitScheduler] = None) -> RateLimitTransport:
+    """Wrap a sync httpx transport so its requests are paced."""
+    return RateLimitTransport(transport, scheduler or get_scheduler())
+
+
+def pace_async(transport: httpx.AsyncBaseTransport,
+               scheduler: Optional[RateLimitScheduler] = None) -> AsyncRateLimitTransport:
+    """Wrap an async httpx transport so its requests are paced."""
+    return AsyncRateLimitTransport(transport, scheduler or get_scheduler())
+
+
+class LedgerTransport(httpx.BaseTransport):
+    """Records resources created and deleted through the wrapped sync transport."""
+
+    def __init__(self, inner: httpx.BaseTransport, ledger: ResourceLedger):
+        self._inner = inner
+        self._ledger = ledger
+
+    def handle_request(self, request):
+        response = self._inner.handle_request(request)
+        try:
+            if _observe(self._ledger, request, response):
+                response.read()
+                _record_created(self._ledger, request, response)
+        except sqlite3.Error as e:
+            print(f"⚠️  Resource ledger not updated: {e}")
+        return response
+
+    def close(self):
+        self._inner.close()
+
+
+class AsyncLedgerTransport(httpx.AsyncBaseTransport):
+    """Async twin of LedgerTransport."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport, ledger: ResourceLedger):
+        self._inner = inner
+        self._ledger = ledger
+
+    async def handle_async_request(self, request):
+        response = await self._inner.handle_async_request(request)
+        try:
+            if _observe(self._ledger, request, response):
+                await response.aread()
+                _record_created(self._ledger, request, response)
+        except sqlite3.Error as e:
+            print(f"⚠️  Resource ledger not updated: {e}")
+        return response
+
+    async def aclose(self):
+        await self._inner.aclose()
+
+
+def track(transport: httpx.BaseTransport, ledger: Optional[ResourceLedger] = None) -> LedgerTransport:
+    """Wrap a sync httpx transport so created resources are recorded."""
+    return LedgerTransport(transport, ledger or get_ledger())
+
+
+def track_async(transport: httpx.AsyncBaseTransport, ledger: Optional[ResourceLedger] = None) -> AsyncLedgerTransport:
+    """Wrap an async httpx transport so created resources are recorded."""
+    return AsyncLedgerTransport(transport, ledger or get_ledger())
@@ -0,0 +1,115 @@
+"""
+Content-addressed upload cache.
+
+Keeps a local manifest (.upload_manifest.json at the project root) keyed by
+each document's SHA-256. An entry remembers the OpenAI file ID the content was
+uploaded as and the vector store it was embedded into, so unchanged documents
+are never uploaded or embedded twice: only new or modified files hit the API.
+
+Manifest layout:
+    {
+      "files": {"<sha256>": {"file_id": ..., "filename": ..., "size": ...,
+                             "uploaded_at": ..., "vector_store_id": ...}},
+      "stores": {"<vector store name>": "<vector store id>"}
+    }
+"""
+
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+UPLOAD_MANIFEST_FILE = PROJECT_ROOT / ".upload_manifest.json"
+
+
+def sha256_file(path: Path, chunk_size: int = 1 << 20) -> str:
+    """Hash a file in fixed-size chunks so large documents are never fully loaded."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class UploadedDocument:
+    """A local document and the OpenAI file ID its content lives under."""
+    id: str
+    path: Path
+    sha256: str
+    cached: bool = False
+
+    @property
+    def filename(self) -> str:
+        return self.path.name
+
+
+class UploadManifest:
+    """SHA-256 → remote file / vector store mapping persisted as JSON."""
+
+    def __init__(self, path: Path = UPLOAD_MANIFEST_FILE):
+        self.path = path
+        self.files: Dict[str, dict] = {}
+        self.stores: Dict[str, str] = {}
+        if path.exists():
+            try:
+                data = json.loads(path.read_text())
+                self.files = data.get("files", {})
+                self.stores = data.get("stores", {})
+            except (ValueError, OSError):
+                print(f"⚠️  Ignoring unreadable upload manifest: {path}")
+                self.files = {}
+
+    def save(self):
+        """Write the manifest atomically (temp file + rename)."""
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp_path.write_text(json.dumps({"files": self.files, "stores": self.stores}, indent=2, sort_keys=True))
+        os.replace(tmp_path, self.path)
+
+    def get(self, sha256: str) -> Optional[dict]:
+        return self.files.get(sha256)
+
+    def record_upload(self, sha256: str, local_path: Path, file_id: str):
+        self.files[sha256] = {
+            "file_id": file_id,
+            "filename": local_path.name,
+            "size": local_path.stat().st_size,
+            "uploaded_at": int(time.time()),
+            "vector_store_id": None,
+        }
+
+    def set_vector_store(self, sha256s: Iterable[str], vector_store_id: Optional[str]):
+        for sha in sha256s:
+            if sha in self.files:
+                self.files[sha]["vector_store_id"] = vector_store_id
+
+    def shared_vector_store(self, sha256s: List[str]) -> Optional[str]:
+        """Vector store ID holding exactly these documents, if the manifest knows one."""
+        store_ids = {self.files.get(sha, {}).get("vector_store_id") for sha in sha256s}
+        if len(store_ids) != 1:
+            return None
+        store_id = store_ids.pop()
+        if store_id is None:
+            return None
+        members = {sha for sha, entry in self.files.items() if entry.get("vector_store_id") == store_id}
+        return store_id if members == set(sha256s) else None
+
+    def sha_for_file_id(self, file_id: str) -> Optional[str]:
+        for sha, entry in self.files.items():
+            if entry["file_id"] == file_id:
+                return sha
+        return None
+
+    def forget_file_ids(self, file_ids: Iterable[str]):
+        file_ids = set(file_ids)
+        self.files = {sha: e for sha, e in self.files.items() if e["file_id"] not in file_ids}
+
+    def forget_vector_store(self, vector_store_id: str):
+        self.stores = {name: vs_id for name, vs_id in self.stores.items() if vs_id != vector_store_id}
+        for entry in self.files.values():
+            if entry.get("vector_store_id") == vector_store_id:
+                entry["vector_store_id"] = None
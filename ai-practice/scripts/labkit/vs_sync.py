@@ -0,0 +1,143 @@
+"""
+Incremental sync of a local document set into a named, long-lived vector store.
+
+Instead of creating a fresh timestamped store per run, sync_vector_store()
+diffs the documents on disk (by SHA-256, via the upload manifest) against the
+files already in the store and then:
+  * adds documents that are new or whose content changed,
+  * removes store files whose content no longer exists locally (deleted
+    documents and the old version of changed ones).
+Re-ingest cost therefore scales with the size of the change, not the corpus.
+
+Only files the manifest maps to a content hash are ever removed: store files
+it does not know (attached by hand, or recorded in a lost manifest) are left
+in place and reported. Removal detaches a file from the store; deleting the
+underlying account file as well is opt-in (delete_removed_files).
+
+Docs: https://platform.openai.com/docs/api-reference/vector-stores-files
+"""
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from labkit.ingest import IngestCheckpoint, bulk_ingest
+from labkit.upload_cache import UploadManifest, sha256_file
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent
+
+
+@dataclass
+class SyncPlan:
+    """What a sync will change in the vector store."""
+    add: List[Path] = field(default_factory=list)
+    remove: List[str] = field(default_factory=list)  # vector store file IDs
+    unknown: List[str] = field(default_factory=list)  # store files the manifest has no hash for; kept
+    unchanged: int = 0
+
+    @property
+    def is_noop(self) -> bool:
+        return not self.add and not self.remove
+
+
+def find_vector_store(client, name: str, manifest: UploadManifest):
+    """Return the live vector store called `name`, preferring the ID remembered in the manifest."""
+    vector_store_id = manifest.stores.get(name)
+    if vector_store_id:
+        try:
+            vector_store = client.vector_stores.retrieve(vector_store_id=vector_store_id)
+            if vector_store.status != "expired":
+                return vector_store
+        except Exception:
+            pass
+        manifest.forget_vector_store(vector_store_id)
+
+    for vector_store in client.vector_stores.list(limit=100):  # auto-paginates
+        if vector_store.name == name and vector_store.status != "expired":
+            manifest.stores[name] = vector_store.id
+            return vector_store
+    return None
+
+
+def list_vector_store_file_ids(client, vector_store_id: str) -> Set[str]:
+    """All file IDs currently in the vector store (every page)."""
+    return {f.id for f in client.vector_stores.files.list(vector_store_id=vector_store_id, limit=100)}
+
+
+def plan_sync(local_paths: Iterable[Path], remote_file_ids: Set[str], manifest: UploadManifest) -> SyncPlan:
+    """Diff local documents (by content hash) against the files in the store."""
+    sha_by_file_id: Dict[str, str] = {entry["file_id"]: sha for sha, entry in manifest.files.items()}
+    remote_shas = {sha_by_file_id[file_id] for file_id in remote_file_ids if file_id in sha_by_file_id}
+
+    plan = SyncPlan()
+    local_shas = set()
+    for path in local_paths:
+        sha = sha256_file(path)
+        if sha in local_shas:
+            continue  # duplicate content under another name
+        local_shas.add(sha)
+        if sha in remote_shas:
+            plan.unchanged += 1
+        else:
+            plan.add.append(path)
+
+    for file_id in sorted(remote_file_ids):
+        sha = sha_by_file_id.get(file_id)
+        if sha is None:
+            plan.unknown.append(file_id)
+        elif sha not in local_shas:
+            plan.remove.append(file_id)
+    return plan
+
+
+def sync_vector_store(client, name: str, local_paths: List[Path], manifest: UploadManifest,
+                      max_workers: int = 8, batch_size: int = 100, delete_removed_files: bool = False,
+                      dry_run: bool = False):
+    """
+    Bring the named vector store in line with `local_paths`; returns (vector_store, plan).
+
+    The store is created without an expiry policy when it does not exist yet.
+    Removed files are only detached from the store unless delete_removed_files
+    is set, which also deletes them from the account.
+    """
+    vector_store = find_vector_store(client, name, manifest)
+    if vector_store is None:
+        if dry_run:
+            return None, SyncPlan(add=list(local_paths))
+        vector_store = client.vector_stores.create(name=name)
+        print(f"🗂️  Created long-lived Vector Store '{name}' ({vector_store.id})")
+    manifest.stores[name] = vector_store.id
+
+    remote_file_ids = list_vector_store_file_ids(client, vector_store.id)
+    plan = plan_sync(local_paths, remote_file_ids, manifest)
+    print(f"🔄 Sync plan for '{name}': +{len(plan.add)} to add, -{len(plan.remove)} to remove, {plan.unchanged} unchanged")
+    if plan.unknown:
+        print(f"  ⚠️ Leaving {len(plan.unknown)} file(s) in '{name}' that the upload manifest does not know "
+              f"(attached by hand or from a lost manifest)")
+    if dry_run or plan.is_noop:
+        manifest.save()
+        return vector_store, plan
+
+    if plan.add:
+        checkpoint = IngestCheckpoint(PROJECT_ROOT / f".sync_checkpoint_{vector_store.id}.jsonl")
+        report = bulk_ingest(client, plan.add, vector_store.id, checkpoint, manifest,
+                             max_workers=max_workers, batch_size=batch_size)
+        if report.failed == 0:
+            checkpoint.clear()
+        print(f"  ➕ Added {report.uploaded + report.skipped} document(s) ({report.uploaded} uploaded, {report.failed} failed)")
+
+    removed = []
+    for file_id in plan.remove:
+        try:
+            client.vector_stores.files.delete(file_id=file_id, vector_store_id=vector_store.id)
+            if delete_removed_files:
+                client.files.delete(file_id)
+            removed.append(file_id)
+        except Exception as e:
+            print(f"  ⚠️ Could not remove {file_id} from '{name}': {e}")
+    if removed:
+        manifest.forget_file_ids(removed)
+        print(f"  ➖ Removed {len(removed)} stale file(s)")
+
+    manifest.save()
+    return client.vector_stores.retrieve(vector_store_id=vector_store.id), plan